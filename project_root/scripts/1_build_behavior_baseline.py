@@ -1,134 +1,156 @@
-import os
+import argparse
+
 import pandas as pd
 
 from utils.paths import (
+    BASELINES_DIR,
     DATA_DIR,
-    OUTPUTS_DIR,
-)
-
-from utils.translate import translate_series
-
-# ======================================================
-# Setup
-# ======================================================
-os.makedirs("../outputs", exist_ok=True)
-
-# Load reference ethogram
-ethogram = pd.read_csv(DATA_DIR / "ethogram_reference.csv")
-ethogram_clean = ethogram[["Behavior", "Category"]]
-
-# Load group scans
-scans = pd.read_csv(DATA_DIR / "group_scan_observations.csv")
-scans["Behavior"] = scans["Behavior"].str.strip()
-
-# ======================================================
-# 1. BUILD CATEGORY BASELINE
-# ======================================================
-# Total counts per behavior
-baseline_counts = (
-    scans
-    .groupby("Behavior")["Count"]
-    .sum()
-)
-
-total_events = baseline_counts.sum()
-
-baseline_df = (
-    baseline_counts
-    .reset_index()
-    .merge(ethogram_clean, on="Behavior", how="left")
-)
-
-baseline_df["Proportion"] = baseline_df["Count"] / total_events
-
-# All categories from ethogram (including event-only ones)
-all_categories = (
-    ethogram_clean["Category"]
-    .dropna()
-    .unique()
+    GROUP_SCANS_DIR,
+    ensure_output_dirs,
 )
 
-category_baseline = (
-    baseline_df
-    .groupby("Category")["Proportion"]
-    .sum()
-    .reindex(all_categories, fill_value=0)
-    .reset_index()
-    .sort_values("Proportion", ascending=False)
+from utils.baseline import (
+    STATE_PATH,
+    WEIGHTS_PATH,
+    BaselineState,
+    file_hash,
+    key_days,
 )
-
-# ------------------------------------------------------
-# Save baseline
-# ------------------------------------------------------
-OUTPUTS_BASELINES_DIR = OUTPUTS_DIR / "baselines"
-OUTPUTS_BASELINES_DIR.mkdir(parents=True, exist_ok=True)
-
-category_baseline.to_csv(
-    OUTPUTS_BASELINES_DIR / "category_baseline.csv",
-    index=False
+from utils.ingest import CHUNK_ROWS
+from utils.categories import SOCIAL_CATEGORIES
+from utils.store import (
+    columnar_enabled,
+    columnar_path,
+    write_columnar,
+    write_table,
 )
-
-# ------------------------------------------------------
-# PRINT baseline
-# ------------------------------------------------------
-print("\nSaved category baseline:")
-
-category_baseline_print = category_baseline.copy()
-category_baseline_print["Category"] = translate_series(
-    category_baseline_print["Category"],
-    kind="category"
-)
-
-print(category_baseline_print.round(3))
+from utils.trace import span, trace_script
+from utils.translate import translate_series
 
 # ======================================================
-# 2. BUILD SCAN-LEVEL CATEGORY PROPORTIONS (ALL DAYS)
+# Setup
 # ======================================================
-# Attach categories
-scans_cat = scans.merge(
-    ethogram_clean,
-    on="Behavior",
-    how="left"
-)
 
-# Aggregate by day, scan, category
-scans_category = (
-    scans_cat
-    .groupby(["Day", "Scan", "Category"])["Count"]
-    .sum()
-    .reset_index()
+BASELINE_PATH = BASELINES_DIR / "category_baseline.csv"
+SCANS_CATEGORY_PATH = (
+    GROUP_SCANS_DIR / "scans_category_proportions_all_days.csv"
 )
 
-# Totals per scan
-scan_totals = (
-    scans_category
-    .groupby(["Day", "Scan"])["Count"]
-    .sum()
-    .reset_index(name="Total")
-)
 
-scans_category = scans_category.merge(
-    scan_totals,
-    on=["Day", "Scan"]
-)
-
-# Proportions
-scans_category["Proportion"] = (
-    scans_category["Count"] / scans_category["Total"]
-)
-
-# Keep only what we need
-scans_category = scans_category[
-    ["Day", "Scan", "Category", "Proportion"]
-].sort_values(["Day", "Scan"])
-
-# ------------------------------------------------------
-# Save scan-level proportions (Spanish, untouched)
-# ------------------------------------------------------
-OUTPUTS_GROUP_SCANS_DIR = OUTPUTS_DIR / "group scans"
-OUTPUTS_GROUP_SCANS_DIR.mkdir(parents=True, exist_ok=True)
-
-scans_category.to_csv(
-    OUTPUTS_GROUP_SCANS_DIR / "scans_category_proportions_all_days.csv",
-    index=False
-)
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Build (or incrementally update) the category baseline."
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Discard the saved baseline state and re-read all scans."
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=CHUNK_ROWS,
+        help="Scan rows parsed per chunk while streaming the scan file."
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    trace_script()
+    ensure_output_dirs()
+
+    # Load reference ethogram
+    ethogram = pd.read_csv(DATA_DIR / "ethogram_reference.csv")
+    ethogram_clean = ethogram[["Behavior", "Category"]]
+
+    # Load persistent baseline state (running counts from previous runs).
+    # It is discarded automatically when the ethogram changes.
+    ethogram_hash = file_hash(DATA_DIR / "ethogram_reference.csv")
+
+    if args.rebuild:
+        state = BaselineState(ethogram_clean, ethogram_hash)
+    else:
+        state = BaselineState.load(STATE_PATH, ethogram_clean, ethogram_hash)
+
+    # Only scans appended since the last run are parsed, streamed in
+    # bounded-size chunks so memory does not grow with the archive
+    with span("baseline.ingest") as ingest:
+        n_new_rows, touched_scans = state.update(
+            DATA_DIR / "group_scan_observations.csv",
+            chunksize=args.chunk_rows
+        )
+        ingest.rows = n_new_rows
+
+    print(
+        f"Ingested {n_new_rows} new scan rows "
+        f"({len(touched_scans)} scans updated)"
+    )
+
+    # ======================================================
+    # 1. BUILD CATEGORY BASELINE
+    # ======================================================
+    # Running counts per behavior -> category proportions
+    with span("baseline.category_baseline"):
+        category_baseline = state.category_baseline()
+
+    # ------------------------------------------------------
+    # Save baseline
+    # ------------------------------------------------------
+    write_table(
+        category_baseline,
+        BASELINE_PATH
+    )
+
+    # Rarity weights for the social systems (used by 5_social_summary.py)
+    write_table(
+        state.category_weights(SOCIAL_CATEGORIES),
+        WEIGHTS_PATH
+    )
+
+    # ------------------------------------------------------
+    # PRINT baseline
+    # ------------------------------------------------------
+    print("\nSaved category baseline:")
+
+    category_baseline_print = category_baseline.copy()
+    category_baseline_print["Category"] = translate_series(
+        category_baseline_print["Category"],
+        kind="category"
+    )
+
+    print(category_baseline_print.round(3))
+
+    # ======================================================
+    # 2. BUILD SCAN-LEVEL CATEGORY PROPORTIONS (ALL DAYS)
+    # ======================================================
+    # Day | Scan | Category | Proportion, sorted by Day and Scan.
+    # Only the scans touched by the new rows (and any after them)
+    # are rewritten; earlier scans are left as they are on disk.
+
+    # ------------------------------------------------------
+    # Save scan-level proportions (Spanish, untouched)
+    # ------------------------------------------------------
+    with span("baseline.write_scan_proportions", rows=len(touched_scans)):
+        state.write_scan_proportions(SCANS_CATEGORY_PATH, touched_scans)
+
+    # Columnar copy: only the Day partitions touched by new rows are rewritten
+    if columnar_enabled():
+        if columnar_path(SCANS_CATEGORY_PATH).exists():
+            touched_days = key_days(touched_scans)
+        else:
+            touched_days = key_days(state.keys)
+
+        if touched_days:
+            write_columnar(
+                state.scan_proportions(state.scan_keys_for_days(touched_days)),
+                SCANS_CATEGORY_PATH,
+                days=touched_days
+            )
+
+    state.save(STATE_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,8 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 
-from utils.paths import (
-    BASELINES_DIR,
-    GROUP_SCANS_DIR,
-)
-
-
+from utils.deviation import DeviationTensor
+from utils.render import FigureJob, render_figures
+from utils.trace import trace_script, traced
 from utils.translate import translate_category
 
 # ======================================================
@@ -18,72 +13,20 @@ COLOR_MAP = "coolwarm"
 VMIN = -0.40
 VMAX = 0.40
 
-# ======================================================
-# Load data
-# ======================================================
-
-baseline = pd.read_csv(BASELINES_DIR / "category_baseline.csv")
-baseline = baseline.rename(columns={"Proportion": "Baseline_Proportion"})
-
-all_categories = baseline["Category"].tolist()
-
-scans = pd.read_csv(
-    GROUP_SCANS_DIR / "scans_category_proportions_all_days.csv"
-)
+# Days to plot (None = every day in the data)
+DAYS = None
 
 # ======================================================
 # FUNCTION: BUILD HEATMAP FOR ONE DAY
 # ======================================================
 
-def plot_day_heatmap(day):
+@traced()
+def plot_day_heatmap(day, heatmap_df):
+    import matplotlib.pyplot as plt
 
-    day_data = scans[scans["Day"] == day]
-
-    if day_data.empty:
-        print(f"No data for Day {day}")
-        return
-
-    scan_ids = sorted(day_data["Scan"].unique())
-
-    # --------------------------------------------------
-    # Build full Scan × Category grid
-    # --------------------------------------------------
-    full_index = pd.MultiIndex.from_product(
-        [scan_ids, all_categories],
-        names=["Scan", "Category"]
-    )
-
-    day_full = (
-        day_data
-        .set_index(["Scan", "Category"])
-        .reindex(full_index, fill_value=0)
-        .reset_index()
-    )
-
-    # --------------------------------------------------
-    # Merge baseline + compute deviation
-    # --------------------------------------------------
-    day_full = day_full.merge(
-        baseline,
-        on="Category",
-        how="left"
-    )
-
-    day_full["Deviation"] = (
-        day_full["Proportion"] - day_full["Baseline_Proportion"]
-    )
-
-    # --------------------------------------------------
-    # Pivot for heatmap
-    # --------------------------------------------------
-    heatmap_df = day_full.pivot(
-        index="Category",
-        columns="Scan",
-        values="Deviation"
-    )
-
-    # Keep category order consistent with baseline
-    heatmap_df = heatmap_df.loc[all_categories]
+    # Category × Scan slice of the deviation tensor
+    all_categories = heatmap_df.index.tolist()
+    scan_ids = heatmap_df.columns.tolist()
 
     # --------------------------------------------------
     # Translate category labels (PRESENTATION ONLY)
@@ -120,11 +63,74 @@ def plot_day_heatmap(day):
     )
 
     plt.tight_layout()
-    plt.show()
+
+# ======================================================
+# CROSS-DAY COMPARISON
+# ======================================================
+
+def plot_day_means(means_df):
+    """Day × Category mean deviation (one row per day)."""
+    import matplotlib.pyplot as plt
+
+    category_labels_en = [translate_category(c) for c in means_df.columns]
+    days = means_df.index.tolist()
+
+    plt.figure(figsize=(14, 2 + 0.6 * len(days)))
+    im = plt.imshow(
+        means_df,
+        aspect="auto",
+        cmap=COLOR_MAP,
+        vmin=VMIN,
+        vmax=VMAX
+    )
+
+    plt.colorbar(im, label="Mean deviation from baseline")
+
+    plt.title("Mean category deviation per day")
+    plt.xlabel("Behavioral category")
+    plt.ylabel("Day")
+
+    plt.xticks(
+        ticks=np.arange(len(category_labels_en)),
+        labels=category_labels_en,
+        rotation=45,
+        ha="right"
+    )
+
+    plt.yticks(
+        ticks=np.arange(len(days)),
+        labels=days
+    )
+
+    plt.tight_layout()
 
 # ======================================================
 # RUN: ALL DAYS
 # ======================================================
 
-for day in sorted(scans["Day"].unique()):
-    plot_day_heatmap(day)
+def main():
+    trace_script()
+
+    # Day × Scan × Category deviations from baseline, built in one pass
+    # and cached next to the scan proportions until either input changes
+    tensor = DeviationTensor.open(days=DAYS)
+
+    jobs = [
+        FigureJob(
+            f"deviation_heatmap_day_{day}",
+            plot_day_heatmap,
+            day,
+            tensor.day_heatmap(day)
+        )
+        for day in tensor.days
+    ]
+
+    jobs.append(
+        FigureJob("mean_deviation_by_day", plot_day_means, tensor.day_means())
+    )
+
+    render_figures(__file__, jobs)
+
+
+if __name__ == "__main__":
+    main()
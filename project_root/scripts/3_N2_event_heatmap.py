@@ -1,12 +1,24 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import argparse
+from pathlib import Path
+
 import numpy as np
+import pandas as pd
 
 from utils.paths import (
     DATA_DIR,
     BASELINES_DIR,
 )
 
+from utils.focal import (
+    focal_deviations,
+    focal_files,
+    focal_id,
+    stored_focal_deviations,
+)
+from utils.observations import ObservationDB, observation_db_enabled
+from utils.render import FigureJob, render_figures
+from utils.store import read_table
+from utils.trace import trace_script
 from utils.translate import translate_category
 
 # ======================================================
@@ -17,162 +29,147 @@ COLOR_MAP = "coolwarm"
 VMIN = -0.40
 VMAX = 0.40
 
-# Event-based annotations (vertical markers BETWEEN events)
-EVENT_MARKERS = {
-    3.5: "Students enter",
-    4.5: "Restrained",
-    5.5: "Invasive procedure",
-    11.5: "Released",
-    13.5: "Redirected agonism"
-}
+# Focal observations: <ID>_individual_observation.csv in DATA_DIR, with
+# event markers (vertical lines BETWEEN events) in <ID>_event_markers.csv
 
 # ======================================================
-# LOAD DATA
-# ======================================================
-
-baseline = pd.read_csv(
-    BASELINES_DIR / "category_baseline.csv"
-)
-baseline = baseline.rename(columns={"Proportion": "Baseline_Proportion"})
-
-all_categories = baseline["Category"].tolist()
-
-focal = pd.read_csv(
-    DATA_DIR / "N2_individual_observation.csv"
-)
-
-ethogram = pd.read_csv(
-    DATA_DIR / "ethogram_reference.csv"
-)
-
-# ======================================================
-# MAP BEHAVIOR → CATEGORY USING ETHOGRAM
-# ======================================================
-
-behavior_to_category = dict(
-    zip(ethogram["Behavior"], ethogram["Category"])
-)
-
-focal["Category"] = focal["Behavior"].map(behavior_to_category)
-
-# Drop anything unmapped (defensive, but good practice)
-focal = focal.dropna(subset=["Category"])
-
-# ======================================================
-# BUILD EVENT × CATEGORY PROPORTIONS
+# PLOT
 # ======================================================
 
-events = sorted(focal["Event"].unique())
+def plot_event_heatmap(individual, heatmap_df, markers):
+    import matplotlib.pyplot as plt
 
-full_index = pd.MultiIndex.from_product(
-    [events, all_categories],
-    names=["Event", "Category"]
-)
-
-event_cat = (
-    focal
-    .groupby(["Event", "Category"])["Count"]
-    .sum()
-    .reindex(full_index, fill_value=0)
-    .reset_index()
-)
+    events = heatmap_df.columns.tolist()
 
-# Normalize to proportions PER EVENT
-event_totals = (
-    event_cat
-    .groupby("Event")["Count"]
-    .transform("sum")
-)
+    # Translate category labels (PRESENTATION ONLY)
+    category_labels_en = [translate_category(c) for c in heatmap_df.index]
 
-event_cat["Proportion"] = np.where(
-    event_totals > 0,
-    event_cat["Count"] / event_totals,
-    0
-)
+    plt.figure(figsize=(16, 9))
 
-# ======================================================
-# MERGE BASELINE + COMPUTE DEVIATION
-# ======================================================
+    im = plt.imshow(
+        heatmap_df,
+        aspect="auto",
+        cmap=COLOR_MAP,
+        vmin=VMIN,
+        vmax=VMAX
+    )
 
-event_cat = event_cat.merge(
-    baseline,
-    on="Category",
-    how="left"
-)
+    plt.colorbar(im, label="Deviation from baseline")
 
-event_cat["Deviation"] = (
-    event_cat["Proportion"] - event_cat["Baseline_Proportion"]
-)
+    plt.title(f"Event deviation heatmap — {individual}")
 
-# ======================================================
-# PIVOT FOR HEATMAP
-# ======================================================
+    plt.xlabel("Event sequence (behavior-driven)")
+    plt.ylabel("Behavioral category")
 
-heatmap_df = event_cat.pivot(
-    index="Category",
-    columns="Event",
-    values="Deviation"
-)
+    plt.xticks(
+        ticks=np.arange(len(events)),
+        labels=events
+    )
 
-heatmap_df = heatmap_df.loc[all_categories]
+    plt.yticks(
+        ticks=np.arange(len(category_labels_en)),
+        labels=category_labels_en
+    )
 
-# --------------------------------------------------
-# Translate category labels (PRESENTATION ONLY)
-# --------------------------------------------------
-heatmap_df.index = heatmap_df.index.map(translate_category)
-category_labels_en = [translate_category(c) for c in all_categories]
+    # ------------------------------------------------------
+    # EVENT ANNOTATIONS
+    # ------------------------------------------------------
+
+    ax = plt.gca()
+
+    for x_pos, label in markers.items():
+        ax.axvline(
+            x=x_pos - 1,  # align with imshow index
+            color="black",
+            linestyle="--",
+            alpha=0.6
+        )
+        ax.text(
+            x_pos - 1,
+            -0.8,
+            label,
+            rotation=90,
+            verticalalignment="bottom",
+            horizontalalignment="right",
+            fontsize=9
+        )
+
+    plt.tight_layout()
 
 # ======================================================
-# PLOT
+# MAIN
 # ======================================================
 
-plt.figure(figsize=(16, 9))
+def main():
+    trace_script()
 
-im = plt.imshow(
-    heatmap_df,
-    aspect="auto",
-    cmap=COLOR_MAP,
-    vmin=VMIN,
-    vmax=VMAX
-)
-
-plt.colorbar(im, label="Deviation from baseline")
-
-plt.xlabel("Event sequence (behavior-driven)")
-plt.ylabel("Behavioral category")
-
-plt.xticks(
-    ticks=np.arange(len(events)),
-    labels=events
-)
-
-plt.yticks(
-    ticks=np.arange(len(all_categories)),
-    labels=category_labels_en
-)
-
-# ------------------------------------------------------
-# EVENT ANNOTATIONS
-# ------------------------------------------------------
+    parser = argparse.ArgumentParser(
+        description="Event × Category deviation heatmaps for focal animals."
+    )
+    parser.add_argument(
+        "focal_files",
+        nargs="*",
+        type=Path,
+        help="Focal observation CSVs (default: every "
+             "*_individual_observation.csv in data/)."
+    )
+    parser.add_argument(
+        "--markers",
+        nargs="*",
+        type=Path,
+        default=[],
+        help="Marker CSVs (Position,Label), one per focal file in the "
+             "same order (default: <ID>_event_markers.csv next to it)."
+    )
+    args = parser.parse_args()
 
-ax = plt.gca()
+    paths = args.focal_files or focal_files(DATA_DIR)
+    if args.markers and len(args.markers) != len(paths):
+        parser.error("--markers needs one file per focal file")
 
-for x_pos, label in EVENT_MARKERS.items():
-    ax.axvline(
-        x=x_pos - 1,  # align with imshow index
-        color="black",
-        linestyle="--",
-        alpha=0.6
-    )
-    ax.text(
-        x_pos - 1,
-        -0.8,
-        label,
-        rotation=90,
-        verticalalignment="bottom",
-        horizontalalignment="right",
-        fontsize=9
+    baseline = read_table(
+        BASELINES_DIR / "category_baseline.csv",
+        columns=["Category", "Proportion"]
     )
 
-plt.tight_layout()
-plt.show()
+    if observation_db_enabled() and not args.focal_files:
+        # Event × Category sums queried from the observation database
+        with ObservationDB.open() as db:
+            deviations = stored_focal_deviations(
+                db,
+                baseline,
+                markers={
+                    focal_id(path): markers
+                    for path, markers in zip(paths, args.markers)
+                }
+            )
+    else:
+        # Behavior → Category via the ethogram (labels as recorded)
+        ethogram = pd.read_csv(DATA_DIR / "ethogram_reference.csv")
+        behavior_to_category = dict(
+            zip(ethogram["Behavior"], ethogram["Category"])
+        )
+
+        # One vectorized Event × Category pass per animal, animals in
+        # parallel
+        deviations = focal_deviations(
+            paths,
+            behavior_to_category,
+            baseline,
+            markers=dict(zip(paths, args.markers))
+        )
+
+    render_figures(__file__, [
+        FigureJob(
+            f"{individual}_event_heatmap",
+            plot_event_heatmap,
+            individual,
+            heatmap_df,
+            markers
+        )
+        for individual, heatmap_df, markers in deviations
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,117 +1,209 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
+import argparse
 
-from utils.paths import BASELINES_DIR, GROUP_SCANS_DIR
+from utils.bands import category_bands, deviation_series
+from utils.paths import BASELINES_DIR, GROUP_SCANS_DIR, ensure_output_dirs
+from utils.render import FigureJob, render_figures
+from utils.store import read_table, write_table
+from utils.trace import trace_script
 from utils.translate import translate_category
 
 # ======================================================
 # Setup
 # ======================================================
 
+# Per-category plot settings (internal Spanish labels). Categories not
+# listed get an automatic limit and a color from default_colors().
 CAT_CONFIG = {
     "Rumiación": {"limit": 0.30, "color": "#1f77b4"},
     "Comer": {"limit": 0.75, "color": "#d62728"},
     "Afiliativa": {"limit": 0.15, "color": "#2ca02c"},
 }
 
-CATEGORY = "Rumiación"   # Internal label (Spanish, data-consistent)
-DAY = 3
+DEFAULT_PALETTE = "tab20"
 
-LIMIT = CAT_CONFIG.get(CATEGORY, {"limit": 0.30})["limit"]
-PLOT_COLOR = CAT_CONFIG.get(CATEGORY, {"color": "#1f77b4"})["color"]
+BASELINE_PATH = BASELINES_DIR / "category_baseline.csv"
+SCANS_PATH = GROUP_SCANS_DIR / "scans_category_proportions_all_days.csv"
 
-# Translated label for presentation only
-CATEGORY_EN = translate_category(CATEGORY)
+BANDS_PATH = GROUP_SCANS_DIR / "category_baseline_bands.csv"
+SERIES_PATH = GROUP_SCANS_DIR / "scans_band_deviation_all_days.csv"
 
 # ======================================================
 # LOAD AND PREPARE DATA
 # ======================================================
 
-baseline = pd.read_csv(BASELINES_DIR / "category_baseline.csv")
-scans = pd.read_csv(GROUP_SCANS_DIR / "scans_category_proportions_all_days.csv")
+def default_colors():
+    """Hex colors of DEFAULT_PALETTE (matplotlib loaded on first use)."""
+    from matplotlib import colormaps
+    from matplotlib.colors import to_hex
 
-# 1. Baseline mean for the selected category
-baseline_mean = baseline.loc[
-    baseline["Category"] == CATEGORY, "Proportion"
-].values[0]
+    return [to_hex(c) for c in colormaps[DEFAULT_PALETTE].colors]
 
-# 2. Category variability (IQR) across all days
-category_all_scans = scans.loc[
-    scans["Category"] == CATEGORY, "Proportion"
-]
 
-q1_dev = category_all_scans.quantile(0.25) - baseline_mean
-q3_dev = category_all_scans.quantile(0.75) - baseline_mean
+def build_bands(baseline, scans):
+    """
+    All bands and deviation series in one pass: the IQR band of every
+    category (over all days) and each scan's deviation, flagged when it
+    falls outside its category's band.
+    """
+    series = deviation_series(scans, baseline)
+    bands = category_bands(series, CAT_CONFIG)
 
-# 3. Data for the selected day
-day_data = scans[
-    (scans["Day"] == DAY) & (scans["Category"] == CATEGORY)
-].copy()
+    palette = default_colors()
+    colors = {
+        category: CAT_CONFIG.get(category, {}).get(
+            "color", palette[i % len(palette)]
+        )
+        for i, category in enumerate(baseline["Category"])
+    }
+    bands["Color"] = bands["Category"].map(colors)
+
+    edges = series[["Category"]].merge(bands, on="Category", how="left")
+    series["Outside_Band"] = (
+        (series["Deviation"] < edges["Q1_Deviation"])
+        | (series["Deviation"] > edges["Q3_Deviation"])
+    )
 
-day_data = day_data.sort_values("Scan")
-day_data["Deviation"] = day_data["Proportion"] - baseline_mean
+    return bands, series
 
 # ======================================================
 # VISUALIZATION
 # ======================================================
 
-fig, ax = plt.subplots(figsize=(12, 6))
-
-# Baseline and normal range (IQR)
-ax.axhline(
-    0,
-    color="black",
-    linestyle="--",
-    linewidth=1,
-    alpha=0.7,
-    label="Global mean (0)"
-)
-
-ax.fill_between(
-    day_data["Scan"],
-    q1_dev,
-    q3_dev,
-    color="gray",
-    alpha=0.15,
-    label=f"Normal range (IQR, {CATEGORY_EN})"
-)
-
-# Observed deviations
-ax.plot(
-    day_data["Scan"],
-    day_data["Deviation"],
-    marker="o",
-    linewidth=2.5,
-    markersize=8,
-    color=PLOT_COLOR,
-    label=f"Deviation on Day {DAY}"
-)
-
-# Aesthetics and scale
-ax.set_ylim(-LIMIT, LIMIT)
-ax.set_title(
-    f"Deviation Analysis: {CATEGORY_EN} (Day {DAY})",
-    fontsize=15,
-    pad=20
-)
-ax.set_xlabel("Scan (time intervals)", fontsize=12)
-ax.set_ylabel("Deviation from baseline", fontsize=12)
-
-# Annotate extreme points for readability
-for _, row in day_data.iterrows():
-    if abs(row["Deviation"]) > (LIMIT * 0.7):
+def plot_baseline_band(category, day, day_data, band):
+    import matplotlib.pyplot as plt
+
+    category_en = translate_category(category)
+    limit = band["Limit"]
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+
+    # Baseline and normal range (IQR)
+    ax.axhline(
+        0,
+        color="black",
+        linestyle="--",
+        linewidth=1,
+        alpha=0.7,
+        label="Global mean (0)"
+    )
+
+    ax.fill_between(
+        day_data["Scan"],
+        band["Q1_Deviation"],
+        band["Q3_Deviation"],
+        color="gray",
+        alpha=0.15,
+        label=f"Normal range (IQR, {category_en})"
+    )
+
+    # Observed deviations
+    ax.plot(
+        day_data["Scan"],
+        day_data["Deviation"],
+        marker="o",
+        linewidth=2.5,
+        markersize=8,
+        color=band["Color"],
+        label=f"Deviation on Day {day}"
+    )
+
+    # Aesthetics and scale
+    ax.set_ylim(-limit, limit)
+    ax.set_title(
+        f"Deviation Analysis: {category_en} (Day {day})",
+        fontsize=15,
+        pad=20
+    )
+    ax.set_xlabel("Scan (time intervals)", fontsize=12)
+    ax.set_ylabel("Deviation from baseline", fontsize=12)
+
+    # Annotate extreme points for readability
+    extreme = day_data[day_data["Deviation"].abs() > (limit * 0.7)]
+    for scan, deviation in zip(extreme["Scan"], extreme["Deviation"]):
         ax.annotate(
-            f"{row['Deviation']:.2f}",
-            (row["Scan"], row["Deviation"]),
+            f"{deviation:.2f}",
+            (scan, deviation),
             textcoords="offset points",
             xytext=(0, 10),
             ha="center",
             fontsize=9
         )
 
-ax.grid(axis="y", linestyle=":", alpha=0.6)
-ax.legend(loc="upper left", frameon=True)
+    ax.grid(axis="y", linestyle=":", alpha=0.6)
+    ax.legend(loc="upper left", frameon=True)
+
+    plt.tight_layout()
+
+# ======================================================
+# MAIN
+# ======================================================
+
+def band_figure_name(category, day):
+    name = translate_category(category).lower().replace(" ", "_")
+    return f"{name}_baseline_band_day_{day}"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Baseline band plots for every category and day."
+    )
+    parser.add_argument(
+        "--categories",
+        nargs="+",
+        metavar="CATEGORY",
+        help="Only plot these categories (internal labels, e.g. Rumiación)"
+    )
+    parser.add_argument(
+        "--days",
+        nargs="+",
+        type=int,
+        metavar="DAY",
+        help="Only plot these days"
+    )
+    return parser.parse_args()
+
+
+def main():
+    trace_script()
+    ensure_output_dirs()
+
+    args = parse_args()
+
+    baseline = read_table(BASELINE_PATH, columns=["Category", "Proportion"])
+    scans = read_table(
+        SCANS_PATH,
+        columns=["Day", "Scan", "Category", "Proportion"],
+        categorical=True
+    )
+
+    # Bands always use every day; the tables cover all categories
+    bands, series = build_bands(baseline, scans)
+
+    write_table(bands, BANDS_PATH)
+    write_table(series, SERIES_PATH)
+
+    plotted = series
+    if args.categories:
+        plotted = plotted[plotted["Category"].isin(args.categories)]
+    if args.days:
+        plotted = plotted[plotted["Day"].isin(args.days)]
+
+    bands_by_category = bands.set_index("Category")
+
+    render_figures(__file__, [
+        FigureJob(
+            band_figure_name(category, day),
+            plot_baseline_band,
+            category,
+            day,
+            day_data,
+            bands_by_category.loc[category]
+        )
+        for (category, day), day_data in plotted.groupby(
+            ["Category", "Day"], sort=False
+        )
+    ])
+
 
-plt.tight_layout()
-plt.show()
+if __name__ == "__main__":
+    main()
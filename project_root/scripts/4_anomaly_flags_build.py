@@ -1,116 +1,81 @@
-import pandas as pd
-
 from utils.paths import (
-    BASELINES_DIR,
     GROUP_SCANS_DIR,
     ANOMALIES_DIR,
+    ensure_output_dirs,
 )
 
+from utils.flags import (
+    category_thresholds,
+    flag_with_severity,
+)
+from utils.store import read_table, write_table
+from utils.trace import trace_script
 from utils.translate import translate_series
 
-# ======================================================
-# Load scan-level proportions
-# ======================================================
-
-scan_category = pd.read_csv(
+SCANS_CATEGORY_PATH = (
     GROUP_SCANS_DIR / "scans_category_proportions_all_days.csv"
 )
+FLAGS_PATH = ANOMALIES_DIR / "scan_anomaly_flags_with_severity.csv"
 
-# Expected columns:
-# Day | Scan | Category | Proportion
 
-# ======================================================
-# Compute per-category quantile thresholds
-# ======================================================
+def main():
+    trace_script()
+    ensure_output_dirs()
 
-QUANTILES = {
-    "low": [0.01, 0.02, 0.05],
-    "high": [0.95, 0.98, 0.99],
-}
+    # ======================================================
+    # Load scan-level proportions
+    # ======================================================
 
-category_stats = (
-    scan_category
-    .groupby("Category")["Proportion"]
-    .quantile(
-        QUANTILES["low"] + QUANTILES["high"]
+    scan_category = read_table(
+        SCANS_CATEGORY_PATH,
+        columns=["Day", "Scan", "Category", "Proportion"],
+        categorical=True
     )
-    .unstack()
-)
-
-category_stats.columns = [
-    "p01", "p02", "p05",
-    "p95", "p98", "p99",
-]
-
-# ======================================================
-# Flag + severity logic
-# ======================================================
-
-def flag_with_severity(row):
-    cat = row["Category"]
-    val = row["Proportion"]
-
-    if cat not in category_stats.index:
-        return None, None
-
-    stats = category_stats.loc[cat]
 
-    # HIGH severity
-    if val > stats["p99"]:
-        return "HIGH_OUTLIER", "HIGH"
-    if val < stats["p01"]:
-        return "LOW_OUTLIER", "HIGH"
+    # Expected columns:
+    # Day | Scan | Category | Proportion
 
-    # MEDIUM severity
-    if val > stats["p98"]:
-        return "HIGH_OUTLIER", "MEDIUM"
-    if val < stats["p02"]:
-        return "LOW_OUTLIER", "MEDIUM"
+    # ======================================================
+    # Compute per-category quantile thresholds
+    # ======================================================
 
-    # LOW severity
-    if val > stats["p95"]:
-        return "HIGH_OUTLIER", "LOW"
-    if val < stats["p05"]:
-        return "LOW_OUTLIER", "LOW"
+    category_stats = category_thresholds(scan_category)
 
-    return None, None
+    # ======================================================
+    # Flag + severity logic
+    # ======================================================
 
-
-scan_category[["Flag", "Severity"]] = (
-    scan_category
-    .apply(
-        lambda r: pd.Series(flag_with_severity(r)),
-        axis=1
+    # Rules are matched once over all rows as small integer codes; only
+    # the flagged rows get Flag / Severity labels
+    labels = flag_with_severity(
+        scan_category, category_stats, flagged_only=True
     )
-)
+    flags = scan_category.loc[labels.index].copy()
 
-flags = scan_category[scan_category["Flag"].notnull()]
+    flags[["Flag", "Severity"]] = labels
 
-flags.to_csv(
-    ANOMALIES_DIR / "scan_anomaly_flags_with_severity.csv",
-    index=False
-)
+    write_table(flags, FLAGS_PATH)
 
+    # ======================================================
+    # Print output (English, translated copy)
+    # ======================================================
 
-# ======================================================
-# Print output (English, translated copy)
-# ======================================================
-
-from utils.translate import translate_series
+    print("\n=== Scan-level anomaly flags (with severity) ===")
 
-print("\n=== Scan-level anomaly flags (with severity) ===")
+    flags_print = flags.copy()
 
-flags_print = flags.copy()
+    # Translate category labels for display only
+    flags_print["Category"] = translate_series(
+        flags_print["Category"],
+        kind="category"
+    )
 
-# Translate category labels for display only
-flags_print["Category"] = translate_series(
-    flags_print["Category"],
-    kind="category"
-)
+    print(
+        flags_print
+        .sort_values(["Day", "Scan", "Severity"])
+        .round(3)
+    )
 
-print(
-    flags_print
-    .sort_values(["Day", "Scan", "Severity"])
-    .round(3)
-)
 
+if __name__ == "__main__":
+    main()
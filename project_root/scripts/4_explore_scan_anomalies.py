@@ -1,46 +1,6 @@
-import pandas as pd
-
-from utils.paths import (
-    DATA_DIR,
-    ANOMALIES_DIR,
-)
-
+from utils.alerts import AlertStore
 from utils.translate import translate_category
 
-# ======================================================
-# Load data
-# ======================================================
-
-flags = pd.read_csv(
-    ANOMALIES_DIR / "scan_anomaly_flags_with_severity.csv"
-)
-
-scan_observations = pd.read_csv(
-    DATA_DIR / "group_scan_observations.csv"
-)
-
-ethogram = pd.read_csv(
-    DATA_DIR / "ethogram_reference.csv"
-)[["Behavior", "Category"]]
-
-# ======================================================
-# Severity ordering
-# ======================================================
-
-SEVERITY_ORDER = {
-    "HIGH": 0,
-    "MEDIUM": 1,
-    "LOW": 2,
-}
-
-flags["SeverityRank"] = flags["Severity"].map(SEVERITY_ORDER)
-
-alerts = (
-    flags
-    .sort_values(["SeverityRank", "Day", "Scan"])
-    .reset_index(drop=True)
-)
-
 # ======================================================
 # Helper: print alert list grouped by Day (ENGLISH VIEW)
 # ======================================================
@@ -71,49 +31,46 @@ def show_alerts(alerts_df):
 # Interactive investigation loop
 # ======================================================
 
-while True:
-    show_alerts(alerts)
+def main():
+    # Flags sorted by severity, Day, Scan, plus the precomputed
+    # (Day, Scan, Category) → behavior counts index for drill-down
+    store = AlertStore()
 
-    choice = input(
-        "\nSelect alert number to inspect "
-        "(Enter to exit): "
-    ).strip()
+    alerts = store.alerts
 
-    if not choice:
-        print("Exiting explorer.")
-        break
+    while True:
+        show_alerts(alerts)
 
-    idx = int(choice) - 1
-    selected = alerts.iloc[idx]
+        choice = input(
+            "\nSelect alert number to inspect "
+            "(Enter to exit): "
+        ).strip()
 
-    day = selected.Day
-    scan = selected.Scan
-    category = selected.Category              # Spanish (for filtering)
-    category_en = translate_category(category)  # English (for display)
+        if not choice:
+            print("Exiting explorer.")
+            break
 
-    drill = (
-        scan_observations
-        .merge(ethogram, on="Behavior", how="left")
-        .query(
-            "Day == @day and Scan == @scan and Category == @category"
-        )
-        .groupby("Behavior")["Count"]
-        .sum()
-        .reset_index()
-        .sort_values("Count", ascending=False)
-    )
+        idx = int(choice) - 1
+        selected = alerts.iloc[idx]
 
-    total = drill["Count"].sum()
-    drill["Proportion"] = drill["Count"] / total
+        day = selected.Day
+        scan = selected.Scan
+        category = selected.Category              # Spanish (for filtering)
+        category_en = translate_category(category)  # English (for display)
+
+        drill = store.drilldown_table(idx + 1)
+
+        print("\n=== Alert Investigation ===")
+        print(
+            f"Severity: {selected.Severity}\n"
+            f"Day {day} | Scan {scan} | "
+            f"Category: {category_en}\n"
+        )
 
-    print("\n=== Alert Investigation ===")
-    print(
-        f"Severity: {selected.Severity}\n"
-        f"Day {day} | Scan {scan} | "
-        f"Category: {category_en}\n"
-    )
+        print(drill.round(3))
 
-    print(drill.round(3))
+        input("\nPress Enter to return to alert list...")
 
-    input("\nPress Enter to return to alert list...")
 
+if __name__ == "__main__":
+    main()
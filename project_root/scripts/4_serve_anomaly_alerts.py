@@ -0,0 +1,272 @@
+"""
+Local HTTP service for anomaly alerts (non-interactive counterpart of
+4_explore_scan_anomalies.py).
+
+Endpoints (JSON):
+    GET /alerts?severity=HIGH,MEDIUM&day_min=1&day_max=3
+               &category=Rumiación&offset=0&limit=50
+    GET /alerts/<id>        alert + behavior drill-down
+    GET /health
+
+Flags and the drill-down index are loaded once and kept in memory; the
+flags file is only re-read when it changes on disk. Serialized responses
+are cached until then. One asyncio event loop serves all clients, with
+HTTP/1.1 keep-alive; the store work behind each response (reloads,
+drill-down index rebuilds, database syncs and queries) runs on a single
+worker thread, so a slow rebuild does not stall the loop.
+
+Usage:
+    python 4_serve_anomaly_alerts.py --host 127.0.0.1 --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from utils.alerts import CACHE_SIZE, DEFAULT_PAGE_SIZE, AlertStore
+
+# ======================================================
+# Setup
+# ======================================================
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Seconds an idle keep-alive connection stays open
+IDLE_TIMEOUT = 30
+
+MAX_HEADER_LINES = 100
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+# ======================================================
+# Request handling
+# ======================================================
+
+def _list_param(params, name):
+    values = []
+    for value in params.get(name, []):
+        values.extend(v.strip() for v in value.split(",") if v.strip())
+    return values or None
+
+
+def _int_param(params, name, default=None):
+    if name not in params:
+        return default
+    try:
+        return int(params[name][-1])
+    except ValueError:
+        raise BadRequest(f"'{name}' must be an integer")
+
+
+class AlertService:
+    """Routes requests to the AlertStore and caches encoded bodies."""
+
+    def __init__(self, store):
+        self.store = store
+        self._bodies = OrderedDict()
+
+    def respond(self, method, target):
+        if method != "GET":
+            return 405, b'{"error": "only GET is supported"}'
+
+        # Pick up a regenerated flags file; drops cached bodies
+        if self.store.refresh():
+            self._bodies.clear()
+
+        if target in self._bodies:
+            self._bodies.move_to_end(target)
+            return 200, self._bodies[target]
+
+        status, payload = self._route(target)
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+        if status == 200:
+            self._bodies[target] = body
+            if len(self._bodies) > CACHE_SIZE:
+                self._bodies.popitem(last=False)
+        return status, body
+
+    def _route(self, target):
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        parts = [p for p in url.path.split("/") if p]
+
+        try:
+            if parts == ["health"]:
+                return 200, {"status": "ok", "alerts": len(self.store.alerts)}
+
+            if parts == ["alerts"]:
+                return 200, self.store.query(
+                    severity=_list_param(params, "severity"),
+                    day_min=_int_param(params, "day_min"),
+                    day_max=_int_param(params, "day_max"),
+                    category=_list_param(params, "category"),
+                    offset=_int_param(params, "offset", 0),
+                    limit=_int_param(params, "limit", DEFAULT_PAGE_SIZE),
+                )
+
+            if len(parts) == 2 and parts[0] == "alerts":
+                try:
+                    alert_id = int(parts[1])
+                except ValueError:
+                    raise BadRequest("alert id must be an integer")
+
+                result = self.store.drilldown(alert_id)
+                if result is None:
+                    return 404, {"error": f"no alert {alert_id}"}
+                return 200, result
+        except BadRequest as e:
+            return 400, {"error": str(e)}
+
+        return 404, {"error": f"unknown path {url.path}"}
+
+
+async def handle_connection(service, worker, reader, writer):
+    try:
+        while True:
+            try:
+                request_line = await asyncio.wait_for(
+                    reader.readline(), IDLE_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                break
+
+            if not request_line:
+                break
+
+            try:
+                method, target, version = (
+                    request_line.decode("latin-1").split()
+                )
+            except ValueError:
+                await _send(writer, 400, b'{"error": "malformed request"}',
+                            keep_alive=False)
+                break
+
+            # The blank line ending the headers may follow the last one
+            headers = {}
+            for _ in range(MAX_HEADER_LINES + 1):
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip().lower()
+            else:
+                # The rest of the request cannot be told apart from the
+                # next one: reject it and drop the connection
+                await _send(writer, 431, b'{"error": "too many headers"}',
+                            keep_alive=False)
+                break
+
+            # Request bodies are not used; discard them. Without a valid
+            # length the body cannot be skipped: drop the connection
+            try:
+                length = int(headers.get("content-length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                await _send(writer, 400, b'{"error": "bad Content-Length"}',
+                            keep_alive=False)
+                break
+            if length:
+                await reader.readexactly(length)
+
+            keep_alive = (
+                version == "HTTP/1.1"
+                and headers.get("connection") != "close"
+            )
+
+            loop = asyncio.get_running_loop()
+            try:
+                status, body = await loop.run_in_executor(
+                    worker, service.respond, method, target
+                )
+            except Exception as e:
+                # The request was read in full: the connection stays usable
+                traceback.print_exc()
+                status, body = 500, json.dumps(
+                    {"error": f"internal error: {type(e).__name__}"}
+                ).encode("utf-8")
+            await _send(writer, status, body, keep_alive)
+
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _send(writer, status, body, keep_alive):
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+# ======================================================
+# MAIN
+# ======================================================
+
+async def serve(host, port):
+    # One thread owns the store (and its SQLite connection): requests
+    # reach it one at a time, off the event loop
+    with ThreadPoolExecutor(max_workers=1) as worker:
+        store = await asyncio.get_running_loop().run_in_executor(
+            worker, AlertStore
+        )
+        service = AlertService(store)
+
+        server = await asyncio.start_server(
+            lambda r, w: handle_connection(service, worker, r, w),
+            host,
+            port
+        )
+
+        print(f"Serving anomaly alerts on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve anomaly alerts and drill-downs over HTTP."
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+# ======================================================
+# ENTRY POINT
+# ======================================================
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Live anomaly alerts for incoming scan-level category proportions.
+
+Reads `Day,Scan,Category,Proportion` rows from stdin (a header line is
+optional), scores each against per-category quantile sketches and writes
+flagged rows to stdout as they arrive, in the same layout as
+scan_anomaly_flags_with_severity.csv. Malformed rows (including NaN or
+infinite proportions) are reported on stderr and skipped.
+
+The detector is warm-started from scans_category_proportions_all_days.csv
+the first time (or with --reset) and its sketches are saved on exit.
+Saved sketches keep the --k and --min-observations they were built
+with; passing different values needs --reset.
+
+Example:
+    tail -f new_scan_proportions.csv | python 4_stream_anomaly_flags.py
+"""
+
+import argparse
+import csv
+import math
+import sys
+
+from utils.paths import GROUP_SCANS_DIR
+from utils.online_flags import (
+    MIN_OBSERVATIONS,
+    STATE_PATH,
+    OnlineAnomalyDetector,
+)
+from utils.sketch import DEFAULT_K
+from utils.store import read_table
+
+# ======================================================
+# Setup
+# ======================================================
+
+OUTPUT_COLUMNS = ["Day", "Scan", "Category", "Proportion", "Flag", "Severity"]
+
+# Save sketches every N events so a crash loses little history
+SAVE_EVERY = 1000
+
+
+def build_detector(args, parser):
+    if STATE_PATH.exists() and not args.reset:
+        detector = OnlineAnomalyDetector.load(STATE_PATH)
+
+        for option, value, saved in [
+            ("--k", args.k, detector.k),
+            ("--min-observations", args.min_observations,
+             detector.min_observations),
+        ]:
+            if value is not None and value != saved:
+                parser.error(
+                    f"{option} {value} differs from the saved sketches "
+                    f"({saved}); pass --reset to rebuild them"
+                )
+        return detector
+
+    history = read_table(
+        GROUP_SCANS_DIR / "scans_category_proportions_all_days.csv",
+        columns=["Category", "Proportion"],
+        categorical=True
+    )
+    return OnlineAnomalyDetector.from_history(
+        history,
+        k=DEFAULT_K if args.k is None else args.k,
+        min_observations=(
+            MIN_OBSERVATIONS if args.min_observations is None
+            else args.min_observations
+        )
+    )
+
+
+# ======================================================
+# MAIN
+# ======================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Stream scan proportions in, anomaly flags out."
+    )
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="Ignore saved sketches and warm-start from the proportions CSV."
+    )
+    parser.add_argument(
+        "--k",
+        type=int,
+        help=f"Sketch size (memory vs. quantile accuracy; default "
+             f"{DEFAULT_K}). Fixed once sketches are saved."
+    )
+    parser.add_argument(
+        "--min-observations",
+        type=int,
+        help=f"History needed before a category can raise alerts "
+             f"(default {MIN_OBSERVATIONS}). Fixed once sketches are saved."
+    )
+    args = parser.parse_args()
+
+    detector = build_detector(args, parser)
+
+    writer = csv.writer(sys.stdout, lineterminator="\n")
+    writer.writerow(OUTPUT_COLUMNS)
+    sys.stdout.flush()
+
+    processed = 0
+    reader = csv.reader(sys.stdin)
+    try:
+        for row in reader:
+            if not row or row[0] == "Day":
+                continue
+
+            # A malformed row is reported and skipped; the stream goes on
+            try:
+                day, scan, category, proportion = row[:4]
+                proportion = float(proportion)
+                if not math.isfinite(proportion):
+                    raise ValueError(proportion)
+            except ValueError:
+                print(
+                    f"[skip] line {reader.line_num}: malformed row {row!r}",
+                    file=sys.stderr,
+                    flush=True
+                )
+                continue
+
+            flag, severity = detector.process(category, proportion)
+            processed += 1
+
+            if flag is not None:
+                writer.writerow(
+                    [day, scan, category, proportion, flag, severity]
+                )
+                sys.stdout.flush()
+
+            if processed % SAVE_EVERY == 0:
+                detector.save(STATE_PATH)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        detector.save(STATE_PATH)
+
+
+# ======================================================
+# ENTRY POINT
+# ======================================================
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,25 @@
+import argparse
+
 import pandas as pd
 import numpy as np
 
 from utils.paths import (
     DATA_DIR,
     SOCIAL_ROLES_DIR,
+    ensure_output_dirs,
 )
 
+from utils.baseline import load_category_weights
+from utils.categories import SOCIAL_CATEGORIES
+from utils.social_graph import (
+    SocialLedgerState,
+    load_registry,
+    save_registry,
+)
+from utils.observations import ObservationDB, observation_db_enabled
+from utils.store import append_table, columnar_enabled, write_table
+from utils.temporal_graph import WINDOW_COLUMNS, TemporalLedger
+from utils.trace import trace_script, traced
 from utils.translate import translate_category
 
 
@@ -13,183 +27,297 @@ from utils.translate import translate_category
 # Setup
 # ======================================================
 
-SOCIAL_CATEGORIES = ["Agonista", "Apaciguamiento", "Afiliativa"]
-
-CATEGORY_PROPORTIONS = {
-    "Agonista": 0.004123711340206186,
-    "Apaciguamiento": 0.006185567010309278,
-    "Afiliativa": 0.016494845360824743
-}
+INTERACTIONS_PATH = DATA_DIR / "directed_social_interactions.csv"
+EDGES_PATH = SOCIAL_ROLES_DIR / "directed_social_edges.csv"
+WINDOW_ROLES_PATH = SOCIAL_ROLES_DIR / "individual_roles_by_window.csv"
 
-CATEGORY_WEIGHTS = {
-    k: 1 / v for k, v in CATEGORY_PROPORTIONS.items()
-}
-
-ALL_INDIVIDUALS = ["N1", "N2", "N3", "N4", "N5", "N6", "N7", "N8"]
+# Sliding windows for the time-indexed roles table (in days; the
+# interaction log has no scan column)
+WINDOW_DAYS = 1
+WINDOW_STEP = 1
 
 # ------------------------------------------------------------
 # LOAD DATA
 # ------------------------------------------------------------
 
 def load_data():
-    ethogram = pd.read_csv(
-        DATA_DIR / "ethogram_reference.csv"
-    )
-    group_scans = pd.read_csv(
-        DATA_DIR / "group_scan_observations.csv"
-    )
-    social = pd.read_csv(
-        DATA_DIR / "directed_social_interactions.csv"
-    )
-    return ethogram, group_scans, social
+    # Only the social systems are kept (see build_edge_list); with the
+    # observation database the filter runs there
+    if observation_db_enabled():
+        with ObservationDB.open() as db:
+            return db.interactions(categories=SOCIAL_CATEGORIES)
+    return pd.read_csv(INTERACTIONS_PATH)
 
 # ------------------------------------------------------------
 # BUILD INDIVIDUAL REGISTRY
 # ------------------------------------------------------------
 
 def get_all_individuals():
-    return ALL_INDIVIDUALS
+    # Registry file, extended with individuals discovered in the data
+    return load_registry()
 
 # ------------------------------------------------------------
 # BUILD SOCIAL LEDGERS
 # ------------------------------------------------------------
 
-def build_ledgers(social_df, individuals):
-    index = pd.MultiIndex.from_product(
-        [individuals, SOCIAL_CATEGORIES],
-        names=["Individual", "Category"]
-    )
-
-    ledger = pd.DataFrame(
-        index=index,
-        columns=["OUT", "IN"],
-        data=0
-    )
-
-    for _, row in social_df.iterrows():
-        actor = row["Actor"]
-        target = row["Target"]
-        category = row["Category"]
-        count = row["Count"]
-
-        if category not in SOCIAL_CATEGORIES:
-            continue
-
-        ledger.loc[(actor, category), "OUT"] += count
-        ledger.loc[(target, category), "IN"] += count
-
-    ledger["NET"] = ledger["OUT"] - ledger["IN"]
-    return ledger.reset_index()
+@traced()
+def build_ledgers(adjacency, days=None):
+    # OUT / IN are row / column sums of each system's sparse matrix
+    return adjacency.ledger(days)
 
 # ------------------------------------------------------------
 # APPLY RARITY WEIGHTING
 # ------------------------------------------------------------
 
-def apply_weights(ledger):
-    ledger["WEIGHT"] = ledger["Category"].map(CATEGORY_WEIGHTS)
+def check_weights(weights):
+    """
+    Stop if a social system has no rarity weight: a NaN W_NET would
+    fail every quartile comparison and silently make its individuals
+    Peripheral.
+    """
+    missing = [
+        category for category in SOCIAL_CATEGORIES
+        if not np.isfinite(weights.get(category, np.nan))
+    ]
+    if missing:
+        raise SystemExit(
+            "No rarity weight for social system(s) "
+            f"{', '.join(missing)}: the category has no scan "
+            "observations in the behavior baseline. Check the ethogram "
+            "and scan data, then re-run 1_build_behavior_baseline.py."
+        )
+
+
+def apply_weights(ledger, weights):
+    ledger["WEIGHT"] = ledger["Category"].map(weights)
     ledger["W_NET"] = ledger["NET"] * ledger["WEIGHT"]
     ledger["TOTAL"] = ledger["OUT"] + ledger["IN"]
-    ledger["BIAS"] = ledger.apply(
-        lambda r: r["NET"] / r["TOTAL"] if r["TOTAL"] > 0 else 0,
-        axis=1
-    )
+
+    total = ledger["TOTAL"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bias = ledger["NET"].to_numpy() / total
+    ledger["BIAS"] = np.where(total > 0, bias, 0.0)
     return ledger
 
 # ------------------------------------------------------------
 # BUILD DIRECTED EDGE LIST
 # ------------------------------------------------------------
 
-def build_edge_list(social_df):
-    edges = []
-
-    for _, row in social_df.iterrows():
-        category = row["Category"]
-        if category not in SOCIAL_CATEGORIES:
-            continue
+def build_edge_list(social_df, weights):
+    social_df = social_df[social_df["Category"].isin(SOCIAL_CATEGORIES)]
 
-        edges.append({
-            "Source": row["Actor"],
-            "Target": row["Target"],
-            "Category": category,
-            "Raw_Count": row["Count"],
-            "Weighted_Intensity": (
-                row["Count"] * CATEGORY_WEIGHTS[category]
-            )
-        })
-
-    return pd.DataFrame(edges)
+    return pd.DataFrame({
+        "Source": social_df["Actor"].to_numpy(),
+        "Target": social_df["Target"].to_numpy(),
+        "Category": social_df["Category"].to_numpy(),
+        "Raw_Count": social_df["Count"].to_numpy(),
+        "Weighted_Intensity": (
+            social_df["Count"]
+            * social_df["Category"].map(weights)
+        ).to_numpy(),
+    })
 
 # ------------------------------------------------------------
 # ROLE ASSIGNMENT
 # ------------------------------------------------------------
 
-def assign_roles(category_df):
-    roles = []
+@traced()
+def assign_roles(ledger, group_keys=("Category",)):
+    """
+    Role per ledger row, with W_NET quartiles taken within each group
+    (one system, or one system in one window). All groups are classified
+    in a single grouped pass.
+    """
+    groups = ledger.groupby(list(group_keys), sort=False)["W_NET"]
+    high = groups.transform("quantile", 0.75)
+    low = groups.transform("quantile", 0.25)
+
+    w_net = ledger["W_NET"]
+
+    # First matching condition wins
+    ledger["Role"] = np.select(
+        [
+            ledger["TOTAL"] == 0,
+            w_net >= high,
+            w_net > 0,
+            w_net <= low,
+        ],
+        [
+            "Isolated",
+            "Primary_Actor",
+            "Secondary_Actor",
+            "Primary_Receiver",
+        ],
+        default="Peripheral"
+    ).astype(object)
+    return ledger
 
-    dom_values = category_df["W_NET"]
-    high = dom_values.quantile(0.75)
-    low = dom_values.quantile(0.25)
+# ------------------------------------------------------------
+# TIME-WINDOWED ROLES
+# ------------------------------------------------------------
 
-    for _, row in category_df.iterrows():
-        if row["TOTAL"] == 0:
-            role = "Isolated"
-        elif row["W_NET"] >= high:
-            role = "Primary_Actor"
-        elif row["W_NET"] > 0:
-            role = "Secondary_Actor"
-        elif row["W_NET"] <= low:
-            role = "Primary_Receiver"
-        else:
-            role = "Peripheral"
+def build_window_roles(temporal, weights, window_days, window_step,
+                       min_end=None):
+    # Window ledgers are differences of cumulative per-day counts; only
+    # windows ending on or after min_end are built
+    ledgers = temporal.window_ledgers(window_days, window_step, min_end)
+    ledgers = apply_weights(ledgers, weights)
+
+    roles = assign_roles(ledgers, ["Window_End", "Category"])
+    roles["System"] = roles["Category"]
+
+    # Window-major, then system-major as in the static roles table
+    return roles.sort_values(
+        WINDOW_COLUMNS + ["System"],
+        key=system_sort_key,
+        kind="stable"
+    )
 
-        roles.append(role)
 
-    category_df["Role"] = roles
-    return category_df
+def system_sort_key(column):
+    if column.name == "System":
+        return column.map(SOCIAL_CATEGORIES.index)
+    return column
+
+
+def write_window_roles(state, weights, window_days, window_step, new_days):
+    """
+    Rewrite the window roles table from the first window containing a
+    day with new interactions; the whole table when the window settings,
+    weights or herd changed (or the file was modified).
+    """
+    temporal = TemporalLedger(state.adjacency)
+    starts, ends = temporal.window_bounds(window_days, window_step)
+
+    settings = {
+        "window_days": window_days,
+        "window_step": window_step,
+        "weights": weights,
+        "individuals": len(state.individuals),
+        # Grid of the windows: first start and actual length
+        "first_start": int(starts[0]) if len(starts) else None,
+        "span": int(ends[0] - starts[0] + 1) if len(starts) else None,
+        # Switching the store format rewrites the columnar copy too
+        "columnar": columnar_enabled(),
+    }
+
+    min_end = int(min(new_days)) if len(new_days) else None
+    first = state.windows.first_stale(WINDOW_ROLES_PATH, settings, min_end)
+
+    # With the grid unchanged the saved windows are a prefix of the
+    # current ones: rewrite from the first stale one, including the
+    # windows added after the last saved day
+    if first is None:
+        min_end = None
+    elif first == len(ends):
+        return
+    else:
+        min_end = int(ends[first])
+
+    window_roles = build_window_roles(
+        temporal, weights, window_days, window_step, min_end
+    )
+    state.windows.write(
+        window_roles,
+        WINDOW_ROLES_PATH,
+        len(state.individuals) * len(SOCIAL_CATEGORIES),
+        settings,
+        first
+    )
 
 # ------------------------------------------------------------
 # MAIN PIPELINE
 # ------------------------------------------------------------
 
 def main():
-    ethogram, group_scans, social = load_data()
+    trace_script()
+
+    parser = argparse.ArgumentParser(
+        description="Build social ledgers, edges and roles."
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Discard the saved interaction counts and re-read all rows."
+    )
+    parser.add_argument(
+        "--window-days",
+        type=int,
+        default=WINDOW_DAYS,
+        help="Length in days of the windows in the time-indexed roles table."
+    )
+    parser.add_argument(
+        "--window-step",
+        type=int,
+        default=WINDOW_STEP,
+        help="Days between the starts of consecutive windows."
+    )
+    args = parser.parse_args()
+
+    ensure_output_dirs()
+
+    # Rarity weights come from the behavior baseline (stage 1)
+    weights = load_category_weights()
+    check_weights(weights)
 
     individuals = get_all_individuals()
 
-    ledger = build_ledgers(social, individuals)
-    ledger = apply_weights(ledger)
+    # Sparse actor × target counts per system and Day, carried over
+    # from the previous run; only newly appended interactions are read
+    if args.rebuild:
+        state = SocialLedgerState(individuals, SOCIAL_CATEGORIES)
+    else:
+        state = SocialLedgerState.load(individuals)
 
-    edge_list = build_edge_list(social)
+    new_social = state.update(INTERACTIONS_PATH)
 
-    role_tables = []
+    if state.individuals != individuals:
+        save_registry(state.individuals)
 
-    for category in SOCIAL_CATEGORIES:
-        cat_df = ledger[ledger["Category"] == category].copy()
-        cat_df = assign_roles(cat_df)
-        cat_df["System"] = category
-        role_tables.append(cat_df)
+    ledger = build_ledgers(state.adjacency)
+    ledger = apply_weights(ledger, weights)
 
-    roles_final = pd.concat(role_tables)
+    roles_final = assign_roles(ledger.copy())
+    roles_final["System"] = roles_final["Category"]
+    roles_final = roles_final.sort_values(
+        "System",
+        key=system_sort_key,
+        kind="stable"
+    )
 
     # --------------------------------------------------------
     # OUTPUT FILES
     # --------------------------------------------------------
 
-    ledger.to_csv(
-        SOCIAL_ROLES_DIR / "individual_social_ledgers.csv",
-        index=False
+    write_table(
+        ledger,
+        SOCIAL_ROLES_DIR / "individual_social_ledgers.csv"
     )
 
-    edge_list.to_csv(
-        SOCIAL_ROLES_DIR / "directed_social_edges.csv",
-        index=False
+    # Edges are one row per interaction: append the new rows unless the
+    # weights changed (or the export is missing), then rewrite it all
+    if state.edge_weights == weights and EDGES_PATH.exists():
+        if len(new_social):
+            append_table(build_edge_list(new_social, weights), EDGES_PATH)
+    else:
+        write_table(build_edge_list(load_data(), weights), EDGES_PATH)
+
+    write_table(
+        roles_final,
+        SOCIAL_ROLES_DIR / "individual_roles_by_category.csv"
     )
 
-    roles_final.to_csv(
-        SOCIAL_ROLES_DIR / "individual_roles_by_category.csv",
-        index=False
+    write_window_roles(
+        state,
+        weights,
+        args.window_days,
+        args.window_step,
+        new_social.get("Day", [])
     )
 
+    state.edge_weights = weights
+    state.save()
+
     # --------------------------------------------------------
     # PRINT ROLE TABLES
     # --------------------------------------------------------
@@ -1,11 +1,19 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import networkx as nx
+import argparse
 
+from utils.graph_render import (
+    FAST_EDGE_THRESHOLD,
+    aggregate_edges,
+    draw_edge_collection,
+    fit_limits,
+)
+from utils.layout import cached_layout
 from utils.paths import (
     SOCIAL_ROLES_DIR,
 )
 
+from utils.render import FigureJob, render_figures
+from utils.store import read_table
+from utils.trace import trace_script, traced
 from utils.translate import translate_category
 
 # ======================================================
@@ -29,6 +37,9 @@ INDIVIDUAL_COLORS = {
     "N8": "#7f7f7f"
 }
 
+# Individuals without an assigned color (large herds)
+DEFAULT_NODE_COLOR = "#d9d9d9"
+
 NODE_SIZE = 900
 EDGE_ALPHA = 0.85
 EDGE_SCALE = 1 / 800
@@ -38,16 +49,24 @@ ARROW_STYLE = "-|>"
 ARROW_SIZE = 18
 NODE_MARGIN = 18
 
+# Curvature of the layered (multi-system) views
+CURVE_RAD = 0.18
+
+# Node labels are skipped above this many individuals
+LABEL_LIMIT = 200
+
 # ======================================================
 # LOAD DATA
 # ======================================================
 
 def load_data():
-    edges = pd.read_csv(
-        SOCIAL_ROLES_DIR / "directed_social_edges.csv"
+    edges = read_table(
+        SOCIAL_ROLES_DIR / "directed_social_edges.csv",
+        columns=["Source", "Target", "Category", "Weighted_Intensity"]
     )
-    ledger = pd.read_csv(
-        SOCIAL_ROLES_DIR / "individual_social_ledgers.csv"
+    ledger = read_table(
+        SOCIAL_ROLES_DIR / "individual_social_ledgers.csv",
+        columns=["Individual"]
     )
 
     individuals = sorted(ledger["Individual"].unique())
@@ -57,28 +76,38 @@ def load_data():
 # BUILD FIXED NODE POSITIONS
 # ------------------------------------------------------------
 
+@traced()
 def compute_node_positions(individuals, edges):
-    G = nx.DiGraph()
-    G.add_nodes_from(individuals)
-
-    for _, row in edges.iterrows():
-        G.add_edge(row["Source"], row["Target"])
-
-    pos = nx.spring_layout(G, seed=42)
-    return pos
+    # Spring layout, cached on disk and warm-started when the graph
+    # changes, so positions stay put from one run to the next
+    return cached_layout(individuals, edges)
 
 # ------------------------------------------------------------
 # CORE PLOTTING FUNCTION
 # ------------------------------------------------------------
 
-def plot_graph(edges, individuals, pos, allowed_categories, title, curved=False):
+def plot_graph(edges, individuals, pos, allowed_categories, title,
+               curved=False, fast=None):
+    """
+    fast: draw edges as batched collections (aggregated per pair).
+    None picks it automatically for large edge lists.
+    """
+    edges = edges[edges["Category"].isin(allowed_categories)]
+    if fast is None:
+        fast = len(edges) > FAST_EDGE_THRESHOLD
+
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
     plt.figure(figsize=(10, 10))
 
     G = nx.DiGraph()
     G.add_nodes_from(individuals)
 
     # Node colors by individual
-    node_colors = [INDIVIDUAL_COLORS[n] for n in individuals]
+    node_colors = [
+        INDIVIDUAL_COLORS.get(n, DEFAULT_NODE_COLOR) for n in individuals
+    ]
 
     nx.draw_networkx_nodes(
         G,
@@ -90,16 +119,23 @@ def plot_graph(edges, individuals, pos, allowed_categories, title, curved=False)
     )
 
     # Node labels
-    nx.draw_networkx_labels(
-        G,
-        pos,
-        font_size=9,
-        font_weight="bold",
-        font_color="black"
-    )
+    if len(individuals) <= LABEL_LIMIT:
+        nx.draw_networkx_labels(
+            G,
+            pos,
+            font_size=9,
+            font_weight="bold",
+            font_color="black"
+        )
+
+    if fast:
+        plot_edges_fast(edges, pos, allowed_categories, title, curved)
+        return
 
     # Edge curvature
-    connectionstyle = "arc3,rad=0.18" if curved else "arc3,rad=0.0"
+    connectionstyle = (
+        f"arc3,rad={CURVE_RAD}" if curved else "arc3,rad=0.0"
+    )
 
     for category in allowed_categories:
         cat_edges = edges[edges["Category"] == category]
@@ -128,23 +164,50 @@ def plot_graph(edges, individuals, pos, allowed_categories, title, curved=False)
     plt.title(title)
     plt.axis("off")
     plt.tight_layout()
-    plt.show()
+
+
+def plot_edges_fast(edges, pos, allowed_categories, title, curved):
+    import matplotlib.pyplot as plt
+
+    # Layout and limits first: arrow sizes and node margins are converted
+    # from points to data units
+    ax = plt.gca()
+    plt.title(title)
+    plt.axis("off")
+    plt.tight_layout()
+    fit_limits(ax, pos)
+
+    edges = aggregate_edges(edges)
+
+    for category in allowed_categories:
+        draw_edge_collection(
+            ax,
+            pos,
+            edges[edges["Category"] == category],
+            color=EDGE_COLORS[category],
+            width_scale=EDGE_SCALE,
+            rad=CURVE_RAD if curved else 0.0,
+            alpha=EDGE_ALPHA,
+            margin_points=NODE_MARGIN,
+            arrow_points=ARROW_SIZE
+        )
 
 # ------------------------------------------------------------
 # GRAPH WRAPPERS (ENGLISH)
 # ------------------------------------------------------------
 
-def plot_agonista(edges, individuals, pos):
+def plot_agonista(edges, individuals, pos, fast=None):
     plot_graph(
         edges,
         individuals,
         pos,
         allowed_categories=["Agonista"],
         title=f"{translate_category('Agonista')} interactions (pressure)",
-        curved=False
+        curved=False,
+        fast=fast
     )
 
-def plot_agonista_apaciguamiento(edges, individuals, pos):
+def plot_agonista_apaciguamiento(edges, individuals, pos, fast=None):
     plot_graph(
         edges,
         individuals,
@@ -155,27 +218,30 @@ def plot_agonista_apaciguamiento(edges, individuals, pos):
             f"{translate_category('Apaciguamiento')} "
             "(pressure and de-escalation)"
         ),
-        curved=True
+        curved=True,
+        fast=fast
     )
 
-def plot_afiliativa(edges, individuals, pos):
+def plot_afiliativa(edges, individuals, pos, fast=None):
     plot_graph(
         edges,
         individuals,
         pos,
         allowed_categories=["Afiliativa"],
         title=f"{translate_category('Afiliativa')} interactions (bonding)",
-        curved=False
+        curved=False,
+        fast=fast
     )
 
-def plot_all(edges, individuals, pos):
+def plot_all(edges, individuals, pos, fast=None):
     plot_graph(
         edges,
         individuals,
         pos,
         allowed_categories=["Agonista", "Apaciguamiento", "Afiliativa"],
         title="Full social system (all interaction types)",
-        curved=True
+        curved=True,
+        fast=fast
     )
 
 # ------------------------------------------------------------
@@ -183,13 +249,34 @@ def plot_all(edges, individuals, pos):
 # ------------------------------------------------------------
 
 def main():
+    trace_script()
+
+    parser = argparse.ArgumentParser(
+        description="Plot the directed social interaction graphs."
+    )
+    parser.add_argument(
+        "--fast",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Draw edges as batched collections (default: automatic "
+             f"above {FAST_EDGE_THRESHOLD} edges)."
+    )
+    args = parser.parse_args()
+
     edges, individuals = load_data()
     pos = compute_node_positions(individuals, edges)
 
-    plot_agonista(edges, individuals, pos)
-    plot_agonista_apaciguamiento(edges, individuals, pos)
-    plot_afiliativa(edges, individuals, pos)
-    plot_all(edges, individuals, pos)
+    views = [
+        ("agonistic", plot_agonista),
+        ("agonistic_appeasement", plot_agonista_apaciguamiento),
+        ("affiliative", plot_afiliativa),
+        ("all_systems", plot_all),
+    ]
+
+    render_figures(__file__, [
+        FigureJob(name, plot, edges, individuals, pos, args.fast)
+        for name, plot in views
+    ])
 
 # ------------------------------------------------------------
 # ENTRY POINT
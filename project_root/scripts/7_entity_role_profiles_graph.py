@@ -1,11 +1,15 @@
+import argparse
+
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 
 from utils.paths import (
     SOCIAL_ROLES_DIR,
 )
 
+from utils.render import FIGURES_DIR, FigureJob, headless, render_figures
+from utils.store import read_table
+from utils.trace import trace_script
 from utils.translate import translate_category
 
 # ======================================================
@@ -17,6 +21,10 @@ BIAS_VMIN = -1
 BIAS_VMAX = 1
 
 FIGSIZE_HEATMAP = (10, 6)
+FIGSIZE_TIMELINE = (14, 6)
+
+# Milliseconds per window in the animated fingerprint
+ANIMATION_INTERVAL = 800
 
 # Internal system labels (Spanish, logic-safe)
 SYSTEM_ORDER = ["Agonista", "Apaciguamiento", "Afiliativa"]
@@ -25,34 +33,77 @@ SYSTEM_ORDER = ["Agonista", "Apaciguamiento", "Afiliativa"]
 # LOAD DATA
 # ======================================================
 
-roles = pd.read_csv(
-    SOCIAL_ROLES_DIR / "individual_roles_by_category.csv"
-)
+def load_roles():
+    """Overall and time-indexed roles (written by 5_social_summary.py)."""
+    roles = read_table(
+        SOCIAL_ROLES_DIR / "individual_roles_by_category.csv",
+        columns=["Individual", "System", "BIAS"]
+    )
 
-# Ensure consistent ordering
-roles["System"] = pd.Categorical(
-    roles["System"],
-    categories=SYSTEM_ORDER,
-    ordered=True
-)
+    # Ensure consistent ordering
+    roles["System"] = pd.Categorical(
+        roles["System"],
+        categories=SYSTEM_ORDER,
+        ordered=True
+    )
+
+    window_roles = read_table(
+        SOCIAL_ROLES_DIR / "individual_roles_by_window.csv",
+        columns=["Window_Start", "Window_End", "Individual", "System", "BIAS"]
+    )
+
+    return roles, window_roles
+
+
+def role_individuals(roles):
+    return sorted(roles["Individual"].unique())
+
+
+def role_windows(window_roles):
+    """(start_day, end_day) of each window, in time order."""
+    return list(
+        window_roles[["Window_Start", "Window_End"]]
+        .drop_duplicates()
+        .sort_values("Window_End")
+        .itertuples(index=False, name=None)
+    )
+
+
+def window_label(start, end):
+    return f"Day {end}" if start == end else f"Days {start}–{end}"
 
-individuals = sorted(roles["Individual"].unique())
+
+def bias_matrix(roles_df, individuals):
+    """Individual × System BIAS (NaN for pairs absent from `roles_df`)."""
+    return (
+        roles_df
+        .pivot(index="Individual", columns="System", values="BIAS")
+        .reindex(index=individuals, columns=SYSTEM_ORDER)
+    )
 
 # ======================================================
 # ROLE DEVIATION HEATMAP
 # ======================================================
 
-def plot_role_deviation_heatmap():
+def plot_role_deviation_heatmap(roles, window_roles, window_end=None):
     """
     Entity × System heatmap using directional bias (BIAS).
     Interpretable as a role fingerprint across interaction systems.
+    With `window_end`, only the window ending on that day is shown.
     """
 
-    heatmap_df = roles.pivot(
-        index="Individual",
-        columns="System",
-        values="BIAS"
-    ).loc[individuals, SYSTEM_ORDER]
+    import matplotlib.pyplot as plt
+
+    title = "Entity Role Deviation Matrix"
+    individuals = role_individuals(roles)
+
+    if window_end is None:
+        heatmap_df = bias_matrix(roles, individuals)
+    else:
+        selected = window_roles[window_roles["Window_End"] == window_end]
+        heatmap_df = bias_matrix(selected, individuals)
+        start = selected["Window_Start"].iloc[0]
+        title += f" — {window_label(start, window_end)}"
 
     # Translate system labels for presentation
     system_labels_en = [translate_category(s) for s in SYSTEM_ORDER]
@@ -72,7 +123,7 @@ def plot_role_deviation_heatmap():
         label="Directional bias (actor ↔ receiver)"
     )
 
-    plt.title("Entity Role Deviation Matrix")
+    plt.title(title)
     plt.xlabel("Interaction system")
     plt.ylabel("Entity")
 
@@ -87,14 +138,171 @@ def plot_role_deviation_heatmap():
     )
 
     plt.tight_layout()
-    plt.show()
+
+# ======================================================
+# ROLE TIMELINE
+# ======================================================
+
+def plot_role_timeline(roles, window_roles):
+    """
+    One Entity × Window heatmap of BIAS per interaction system:
+    how each individual's role drifts from window to window.
+    """
+    import matplotlib.pyplot as plt
+
+    individuals = role_individuals(roles)
+    windows = role_windows(window_roles)
+    labels = [window_label(start, end) for start, end in windows]
+
+    fig, axes = plt.subplots(
+        1,
+        len(SYSTEM_ORDER),
+        figsize=FIGSIZE_TIMELINE,
+        sharey=True
+    )
+
+    for ax, system in zip(axes, SYSTEM_ORDER):
+        timeline_df = (
+            window_roles[window_roles["System"] == system]
+            .pivot(index="Individual", columns="Window_End", values="BIAS")
+            .reindex(index=individuals, columns=[end for _, end in windows])
+        )
+
+        im = ax.imshow(
+            timeline_df,
+            cmap=COLOR_MAP,
+            vmin=BIAS_VMIN,
+            vmax=BIAS_VMAX,
+            aspect="auto"
+        )
+
+        ax.set_title(translate_category(system))
+        ax.set_xlabel("Window")
+        ax.set_xticks(np.arange(len(labels)))
+        ax.set_xticklabels(labels, rotation=45, ha="right")
+
+    axes[0].set_ylabel("Entity")
+    axes[0].set_yticks(np.arange(len(individuals)))
+    axes[0].set_yticklabels(individuals)
+
+    fig.colorbar(
+        im,
+        ax=axes,
+        label="Directional bias (actor ↔ receiver)"
+    )
+    fig.suptitle("Entity Role Timeline")
+
+
+def animate_role_fingerprint(roles, window_roles):
+    """Role fingerprint (Entity × System BIAS) stepping through windows."""
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+
+    individuals = role_individuals(roles)
+    system_labels_en = [translate_category(s) for s in SYSTEM_ORDER]
+    frames = [
+        (window_label(start, end),
+         bias_matrix(
+             window_roles[window_roles["Window_End"] == end], individuals
+         ))
+        for start, end in role_windows(window_roles)
+    ]
+
+    fig, ax = plt.subplots(figsize=FIGSIZE_HEATMAP)
+
+    im = ax.imshow(
+        frames[0][1],
+        cmap=COLOR_MAP,
+        vmin=BIAS_VMIN,
+        vmax=BIAS_VMAX,
+        aspect="auto"
+    )
+
+    fig.colorbar(im, label="Directional bias (actor ↔ receiver)")
+    ax.set_xlabel("Interaction system")
+    ax.set_ylabel("Entity")
+    ax.set_xticks(np.arange(len(system_labels_en)))
+    ax.set_xticklabels(system_labels_en)
+    ax.set_yticks(np.arange(len(individuals)))
+    ax.set_yticklabels(individuals)
+
+    def update(frame):
+        label, heatmap_df = frame
+        im.set_data(heatmap_df)
+        ax.set_title(f"Entity Role Deviation Matrix — {label}")
+        return [im]
+
+    # Keep a reference: the animation stops if it is garbage-collected
+    animation = FuncAnimation(
+        fig,
+        update,
+        frames=frames,
+        interval=ANIMATION_INTERVAL
+    )
+
+    plt.tight_layout()
+
+    if headless():
+        out_dir = FIGURES_DIR / "7_entity_role_profiles_graph"
+        out_dir.mkdir(parents=True, exist_ok=True)
+        animation.save(out_dir / "role_fingerprint.gif", writer="pillow")
+        plt.close(fig)
+    else:
+        plt.show()
+    return animation
 
 # ======================================================
 # MAIN
 # ======================================================
 
 def main():
-    plot_role_deviation_heatmap()
+    trace_script()
+
+    parser = argparse.ArgumentParser(
+        description="Plot entity role profiles across interaction systems."
+    )
+    parser.add_argument(
+        "--window-end",
+        type=int,
+        help="Show the role fingerprint of the window ending on this day."
+    )
+    parser.add_argument(
+        "--animate",
+        action="store_true",
+        help="Step the role fingerprint through every window."
+    )
+    args = parser.parse_args()
+
+    roles, window_roles = load_roles()
+
+    if args.animate:
+        animate_role_fingerprint(roles, window_roles)
+        return
+
+    if args.window_end is not None:
+        windows = role_windows(window_roles)
+        if args.window_end not in {end for _, end in windows}:
+            raise SystemExit(f"No window ends on day {args.window_end}")
+
+        jobs = [FigureJob(
+            f"role_fingerprint_window_{args.window_end}",
+            plot_role_deviation_heatmap,
+            roles,
+            window_roles,
+            args.window_end
+        )]
+    else:
+        jobs = [
+            FigureJob(
+                "role_fingerprint",
+                plot_role_deviation_heatmap,
+                roles,
+                window_roles
+            ),
+            FigureJob("role_timeline", plot_role_timeline, roles, window_roles),
+        ]
+
+    render_figures(__file__, jobs)
 
 # ======================================================
 # ENTRY POINT
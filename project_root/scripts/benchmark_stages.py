@@ -0,0 +1,344 @@
+"""
+Scaling benchmarks for the data stages on synthetic herds.
+
+For every scale, a synthetic herd nominally SCALE times the shipped data is
+written (utils/synthetic.py) and stages 1, 4 and 5 run on it from
+scratch, each in its own process with BEHAVIOR_PROJECT_ROOT pointing at
+the herd. Wall time, CPU time and peak RSS of every stage are appended
+to benchmarks/stage_benchmarks.csv, and compared with the previous
+result for the same stage, scale and host.
+
+SCALE is the herd generator's nominal scale. Stages do not all see
+that much more data (the scan table grows more slowly than the
+interaction log), so each result also records Data_Scale: the stage's
+input rows over those of the same file in the shipped data.
+
+Usage:
+    python benchmark_stages.py                      # 10x, 1000x, 100000x
+    python benchmark_stages.py --scales 10 1000
+    python benchmark_stages.py --workdir /tmp/herds    # keep herds
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+from utils.paths import DATA_DIR, ROOT, ROOT_ENV
+from utils.synthetic import HerdConfig, write_herd
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+RESULTS_PATH = ROOT / "benchmarks" / "stage_benchmarks.csv"
+
+DEFAULT_SCALES = [10, 1000, 100_000]
+
+# Stage -> (extra arguments, synthetic input file its row count refers to)
+BENCHMARK_STAGES = {
+    "1_build_behavior_baseline": (
+        ["--rebuild"], "data/group_scan_observations.csv"
+    ),
+    "4_anomaly_flags_build": (
+        [], "outputs/group scans/scans_category_proportions_all_days.csv"
+    ),
+    "5_social_summary": (
+        ["--rebuild"], "data/directed_social_interactions.csv"
+    ),
+}
+
+# A stage is reported as a regression when its wall time or peak memory
+# exceeds the previous result by this factor
+DEFAULT_TOLERANCE = 1.5
+
+RESULT_COLUMNS = [
+    "Timestamp", "Commit", "Host", "Scale", "Stage", "Input_Rows",
+    "Data_Scale", "Wall_s", "CPU_s", "Peak_RSS_MB", "Status",
+]
+
+# ======================================================
+# Herds
+# ======================================================
+
+def prepare_herd(workdir, scale, seed):
+    """Synthetic project root for `scale`, reused if already written."""
+    root = workdir / f"scale_{scale}"
+    config = HerdConfig.scaled(scale, seed=seed)
+    marker = root / "herd.json"
+
+    if marker.exists() and json.loads(marker.read_text()) == config.as_dict():
+        print(f"[herd] {scale}x (reused)")
+        return root
+
+    shutil.rmtree(root, ignore_errors=True)
+    started = time.perf_counter()
+    # Written in a worker process: a stage started from this process
+    # would otherwise report its peak RSS (inherited across fork/exec)
+    # as the stage's own
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        rows = pool.submit(
+            write_herd, root, config, DATA_DIR / "ethogram_reference.csv"
+        ).result()
+    print(
+        f"[herd] {scale}x: {rows} "
+        f"({time.perf_counter() - started:.1f} s)"
+    )
+
+    marker.write_text(json.dumps(config.as_dict()))
+    return root
+
+
+def count_rows(path):
+    """Data rows of a CSV (lines minus the header)."""
+    if not path.exists():
+        return None
+
+    lines, last = 0, b"\n"
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+
+    # A last line without a line break is a row too
+    if last != b"\n":
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def shipped_rows(stages):
+    """Input rows of each stage in the shipped data (None if missing)."""
+    return {
+        stage: count_rows(ROOT / BENCHMARK_STAGES[stage][1])
+        for stage in stages
+    }
+
+# ======================================================
+# Measurement
+# ======================================================
+
+def run_measured(stage, args, root):
+    """
+    Run one stage script on the herd at `root`.
+    Returns (wall s, CPU s, peak RSS MB, exit code, stderr tail).
+    """
+    env = dict(os.environ, **{ROOT_ENV: str(root)})
+
+    with tempfile.TemporaryFile() as stderr:
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, str(SCRIPTS_DIR / f"{stage}.py"), *args],
+            cwd=SCRIPTS_DIR,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr,
+        )
+
+        # wait4 reports the resource usage of this child alone
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - started
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+        stderr.seek(0)
+        tail = stderr.read().decode("utf-8", "replace")[-2000:]
+
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    peak_mb = usage.ru_maxrss * rss_unit / 2**20
+
+    return (
+        wall,
+        usage.ru_utime + usage.ru_stime,
+        peak_mb,
+        process.returncode,
+        tail,
+    )
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SCRIPTS_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def benchmark_scale(root, scale, stages, commit, shipped):
+    records = []
+
+    for stage in stages:
+        args, rows_file = BENCHMARK_STAGES[stage]
+        input_rows = count_rows(root / rows_file)
+
+        data_scale = None
+        if input_rows is not None and shipped.get(stage):
+            data_scale = round(input_rows / shipped[stage], 1)
+
+        wall, cpu, peak_mb, code, tail = run_measured(stage, args, root)
+
+        status = "ok" if code == 0 else f"exit {code}"
+        print(
+            f"[{status:>4}] {scale}x {stage}: {input_rows} rows "
+            f"({data_scale}x shipped), "
+            f"{wall:.2f} s wall, {cpu:.2f} s CPU, {peak_mb:.0f} MB peak"
+        )
+        if code != 0:
+            print(tail)
+
+        records.append({
+            "Timestamp": datetime.now(timezone.utc).isoformat(
+                timespec="seconds"
+            ),
+            "Commit": commit,
+            "Host": platform.node(),
+            "Scale": scale,
+            "Stage": stage,
+            "Input_Rows": input_rows,
+            "Data_Scale": data_scale,
+            "Wall_s": round(wall, 3),
+            "CPU_s": round(cpu, 3),
+            "Peak_RSS_MB": round(peak_mb, 1),
+            "Status": status,
+        })
+
+    return records
+
+# ======================================================
+# Results
+# ======================================================
+
+def load_results(path):
+    if not path.exists():
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.read_csv(path)
+
+
+def find_regressions(previous, current, tolerance):
+    """
+    Current results slower or larger than `tolerance` × the last
+    successful result for the same host, stage and scale.
+    """
+    ok = previous[previous["Status"] == "ok"]
+    last = ok.groupby(["Host", "Stage", "Scale"]).tail(1)
+
+    compared = current[current["Status"] == "ok"].merge(
+        last, on=["Host", "Stage", "Scale"], suffixes=("", "_prev")
+    )
+
+    regressed = (
+        (compared["Wall_s"] > tolerance * compared["Wall_s_prev"])
+        | (compared["Peak_RSS_MB"] > tolerance * compared["Peak_RSS_MB_prev"])
+    )
+
+    return compared.loc[regressed, [
+        "Stage", "Scale",
+        "Wall_s_prev", "Wall_s",
+        "Peak_RSS_MB_prev", "Peak_RSS_MB",
+    ]]
+
+
+def record_results(path, current):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    current[RESULT_COLUMNS].to_csv(
+        path, mode="a", header=not path.exists(), index=False
+    )
+
+# ======================================================
+# MAIN
+# ======================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time and memory-profile stages 1, 4 and 5 on "
+                    "synthetic herds of increasing size."
+    )
+    parser.add_argument(
+        "--scales",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SCALES,
+        help="Herd sizes relative to the shipped data."
+    )
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=list(BENCHMARK_STAGES),
+        default=list(BENCHMARK_STAGES),
+    )
+    parser.add_argument(
+        "--workdir",
+        type=Path,
+        help="Keep synthetic herds here and reuse them in later runs "
+             "(default: a temporary directory, removed afterwards)."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Slowdown/memory factor reported as a regression."
+    )
+    parser.add_argument(
+        "--no-record",
+        action="store_true",
+        help=f"Do not append results to {RESULTS_PATH.name}."
+    )
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="Exit with status 1 if any regression is found."
+    )
+    args = parser.parse_args()
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="herds_"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    commit = current_commit()
+    shipped = shipped_rows(args.stages)
+
+    records = []
+    try:
+        for scale in args.scales:
+            root = prepare_herd(workdir, scale, args.seed)
+            records += benchmark_scale(
+                root, scale, args.stages, commit, shipped
+            )
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    current = pd.DataFrame(records, columns=RESULT_COLUMNS)
+    regressions = find_regressions(
+        load_results(RESULTS_PATH), current, args.tolerance
+    )
+
+    if not args.no_record:
+        record_results(RESULTS_PATH, current)
+        print(f"\nResults appended to {RESULTS_PATH}")
+
+    if regressions.empty:
+        print("No regressions against previous results.")
+    else:
+        print(f"\nRegressions (> {args.tolerance}x previous):")
+        print(regressions.to_string(index=False))
+
+    failed = (current["Status"] != "ok").any()
+    if failed or (args.fail_on_regression and not regressions.empty):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,47 +20,53 @@ from utils.paths import (
     DATA_DIR,
     GROUP_SCANS_DIR,
 )
+from utils.ingest import read_scan_chunks, reduce_scan_counts
+from utils.observations import ObservationDB, observation_db_enabled
 
 # ======================================================
 # Setup
 # ======================================================
 
-ethogram = pd.read_csv(
-    DATA_DIR / "ethogram_reference.csv"
-)
-ethogram_clean = ethogram[["Behavior", "Category"]]
+EXPLORATORY_DIR = GROUP_SCANS_DIR / "exploratory"
 
-scans = pd.read_csv(
-    DATA_DIR / "group_scan_observations.csv"
-)
-scans["Behavior"] = scans["Behavior"].str.strip()
 
-# Ensure exploratory output folder exists
-EXPLORATORY_DIR = GROUP_SCANS_DIR / "exploratory"
-EXPLORATORY_DIR.mkdir(parents=True, exist_ok=True)
+def load_scan_counts():
+    # Aggregated by the observation database when it is enabled
+    if observation_db_enabled():
+        with ObservationDB.open() as db:
+            return db.scan_counts()
+
+    ethogram = pd.read_csv(
+        DATA_DIR / "ethogram_reference.csv"
+    )
+    ethogram_clean = ethogram[["Behavior", "Category"]]
+
+    behavior_to_category = dict(
+        zip(ethogram_clean["Behavior"], ethogram_clean["Category"])
+    )
+
+    # Stream scans in bounded chunks and reduce straight to
+    # Day | Scan | Category counts (the raw file never sits in memory)
+    return reduce_scan_counts(
+        read_scan_chunks(DATA_DIR / "group_scan_observations.csv"),
+        behavior_to_category
+    )
 
 # ======================================================
 # Analysis function
 # ======================================================
 
-def analyze_day(day: int):
+def analyze_day(scan_counts, day: int):
     print(f"\n=== Processing Day {day} ===")
 
-    # Filter day
-    day_data = scans[scans["Day"] == day]
-
-    # Attach categories
-    scans_cat = day_data.merge(
-        ethogram_clean,
-        on="Behavior",
-        how="left"
-    )
+    if day not in scan_counts.index.unique(level="Day"):
+        print(f"No scans recorded for Day {day}, skipped.")
+        return
 
-    # Aggregate by scan and category
+    # Aggregate by scan and category (already reduced while streaming)
     scan_category = (
-        scans_cat
-        .groupby(["Scan", "Category"])["Count"]
-        .sum()
+        scan_counts
+        .loc[day]
         .reset_index()
     )
 
@@ -120,6 +126,16 @@ def analyze_day(day: int):
 # Explicit calls (Pattern 2)
 # ======================================================
 
-analyze_day(1)
-analyze_day(2)
-analyze_day(3)
+def main():
+    scan_counts = load_scan_counts()
+
+    # Ensure exploratory output folder exists
+    EXPLORATORY_DIR.mkdir(parents=True, exist_ok=True)
+
+    analyze_day(scan_counts, 1)
+    analyze_day(scan_counts, 2)
+    analyze_day(scan_counts, 3)
+
+
+if __name__ == "__main__":
+    main()
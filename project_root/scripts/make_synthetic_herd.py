@@ -0,0 +1,59 @@
+"""
+Write a synthetic herd (scans, directed interactions and one focal
+animal) with the schemas of the files in data/, for testing how the
+stages scale.
+
+Usage:
+    python make_synthetic_herd.py OUT_ROOT --days 300 --animals 20
+    python make_synthetic_herd.py OUT_ROOT --scale 1000
+
+Point the stages at it with BEHAVIOR_PROJECT_ROOT=OUT_ROOT.
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from utils.paths import DATA_DIR
+from utils.synthetic import HerdConfig, write_herd
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic herd data/ tree."
+    )
+    parser.add_argument("root", type=Path, help="Output project root.")
+    parser.add_argument(
+        "--scale",
+        type=int,
+        help="About SCALE times the shipped data: --animals and --days "
+             "each grow by sqrt(SCALE), --interactions-per-day with "
+             "the herd, and the herd is scanned in groups of --animals."
+    )
+    parser.add_argument("--animals", type=int, default=8)
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--scans-per-day", type=int, default=12)
+    parser.add_argument("--interactions-per-day", type=int, default=10)
+    parser.add_argument("--focal-events", type=int, default=28)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    herd = dict(
+        animals=args.animals,
+        scans_per_day=args.scans_per_day,
+        interactions_per_day=args.interactions_per_day,
+        focal_events=args.focal_events,
+        seed=args.seed
+    )
+    if args.scale is None:
+        config = HerdConfig(days=args.days, **herd)
+    else:
+        config = HerdConfig.scaled(args.scale, days=args.days, **herd)
+
+    rows = write_herd(args.root, config, DATA_DIR / "ethogram_reference.csv")
+
+    print(json.dumps({"config": config.as_dict(), "rows": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Run the data stages (baseline, anomaly flags, social roles) for many
+herds at once and merge their results.
+
+Every sub-folder of HERDS_DIR with a data/ tree like the shipped one is
+a herd. Each herd runs run_pipeline.py in its own process with
+BEHAVIOR_PROJECT_ROOT pointing at it, so it gets its own outputs/ tree
+(and its own up-to-date checks); up to --jobs herds run at the same
+time. The cross-herd summary tables are then written to
+HERDS_DIR/cross_herd/.
+
+Usage:
+    python run_herds.py HERDS_DIR
+    python run_herds.py HERDS_DIR --jobs 8
+    python run_herds.py HERDS_DIR --herds herd_a herd_b --force
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from utils.herds import HERD_SUMMARIES, discover_herds
+from utils.paths import ROOT_ENV
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+SUMMARY_DIRNAME = "cross_herd"
+
+# Pipeline output of each herd, kept next to its outputs
+HERD_LOG = "outputs/run_herds.log"
+
+# ======================================================
+# Execution
+# ======================================================
+
+def run_herd(root, force=False):
+    """
+    Run the data stages for the herd at `root` in a child process.
+    Stages of one herd run one after another; herds run in parallel.
+    Returns (exit code, seconds, pipeline output).
+    """
+    command = [
+        sys.executable, str(SCRIPTS_DIR / "run_pipeline.py"), "--jobs", "1",
+    ]
+    if force:
+        command.append("--force")
+
+    started = time.perf_counter()
+    result = subprocess.run(
+        command,
+        cwd=SCRIPTS_DIR,
+        env=dict(os.environ, **{ROOT_ENV: str(root)}),
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+    )
+    seconds = time.perf_counter() - started
+
+    output = result.stdout + result.stderr
+    log_path = root / HERD_LOG
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    log_path.write_text(output, encoding="utf-8")
+
+    return result.returncode, seconds, output
+
+
+def run_herds(herds, force=False, jobs=None):
+    """Run every herd; returns the names of the herds that failed."""
+    failed = []
+
+    # Each herd is its own process; the pool only waits on them
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        futures = {
+            pool.submit(run_herd, root, force): herd
+            for herd, root in herds.items()
+        }
+
+        for future in as_completed(futures):
+            herd = futures[future]
+            returncode, seconds, output = future.result()
+
+            if returncode != 0:
+                print(f"[fail] {herd} (exit code {returncode})")
+                print(output.rstrip()[-2000:])
+                failed.append(herd)
+                continue
+
+            print(f"[done] {herd} ({seconds:.1f} s)")
+
+    return failed
+
+
+def write_summaries(herds, out_dir):
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    for filename, summarize in HERD_SUMMARIES.items():
+        summarize(herds).to_csv(out_dir / filename, index=False)
+        print(f"[save] {out_dir / filename}")
+
+# ======================================================
+# ENTRY POINT
+# ======================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the data stages per herd in parallel and merge "
+                    "the results across herds."
+    )
+    parser.add_argument(
+        "herds_dir",
+        type=Path,
+        help="Folder with one project root (data/ tree) per herd."
+    )
+    parser.add_argument(
+        "--herds",
+        nargs="+",
+        help="Herds to run (default: every herd in HERDS_DIR). The "
+             "summaries always cover every herd."
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Herds running at once (default: number of CPUs)."
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rerun the stages even if a herd's outputs are up to date."
+    )
+    args = parser.parse_args()
+
+    herds = discover_herds(args.herds_dir)
+    if not herds:
+        parser.error(f"no herd data trees under {args.herds_dir}")
+
+    selected = herds
+    if args.herds:
+        unknown = set(args.herds) - set(herds)
+        if unknown:
+            parser.error(f"unknown herds: {', '.join(sorted(unknown))}")
+        selected = {herd: herds[herd] for herd in args.herds}
+
+    print(f"Running {len(selected)} herds")
+    failed = run_herds(selected, force=args.force, jobs=args.jobs)
+
+    # Failed herds are left out rather than merged with stale outputs
+    write_summaries(
+        {herd: root for herd, root in herds.items() if herd not in failed},
+        args.herds_dir / SUMMARY_DIRNAME
+    )
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+Single entry point for the numbered analysis scripts.
+
+Each stage declares the files it reads and writes (paths from
+utils/paths.py). A stage is skipped when the content hashes of its
+inputs, of its own script and of the utils modules, and the store
+format (BEHAVIOR_STORE_FORMAT), match the previous run and its outputs
+are still the files that run produced. Stages whose inputs do not
+depend on each other (e.g. the anomaly branch 4_* and the social branch
+5_*–7_*) run in parallel worker processes.
+
+Usage:
+    python run_pipeline.py                  # data stages
+    python run_pipeline.py --figures        # data + figure stages
+    python run_pipeline.py --force 4_anomaly_flags_build
+    python run_pipeline.py --figures --headless png,svg
+    python run_pipeline.py --trace chrome   # timing/memory trace
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from utils.paths import (
+    DATA_DIR,
+    OUTPUTS_DIR,
+    BASELINES_DIR,
+    GROUP_SCANS_DIR,
+    ANOMALIES_DIR,
+    SOCIAL_ROLES_DIR,
+)
+from utils.render import FORMATS_ENV, utils_hash
+from utils.trace import TRACE_ENV, run_dir, span, trace_script
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+MANIFEST_PATH = OUTPUTS_DIR / "pipeline_manifest.json"
+
+# ======================================================
+# Stage declarations
+# ======================================================
+
+ETHOGRAM = DATA_DIR / "ethogram_reference.csv"
+GROUP_SCANS = DATA_DIR / "group_scan_observations.csv"
+FOCAL_N2 = DATA_DIR / "N2_individual_observation.csv"
+FOCAL_N2_MARKERS = DATA_DIR / "N2_event_markers.csv"
+INTERACTIONS = DATA_DIR / "directed_social_interactions.csv"
+
+CATEGORY_BASELINE = BASELINES_DIR / "category_baseline.csv"
+SOCIAL_WEIGHTS = BASELINES_DIR / "social_category_weights.csv"
+INDIVIDUAL_REGISTRY = BASELINES_DIR / "individual_registry.csv"
+SCANS_CATEGORY = GROUP_SCANS_DIR / "scans_category_proportions_all_days.csv"
+CATEGORY_BANDS = GROUP_SCANS_DIR / "category_baseline_bands.csv"
+SCANS_BAND_DEVIATION = GROUP_SCANS_DIR / "scans_band_deviation_all_days.csv"
+ANOMALY_FLAGS = ANOMALIES_DIR / "scan_anomaly_flags_with_severity.csv"
+SOCIAL_LEDGERS = SOCIAL_ROLES_DIR / "individual_social_ledgers.csv"
+SOCIAL_EDGES = SOCIAL_ROLES_DIR / "directed_social_edges.csv"
+SOCIAL_ROLES = SOCIAL_ROLES_DIR / "individual_roles_by_category.csv"
+SOCIAL_WINDOW_ROLES = SOCIAL_ROLES_DIR / "individual_roles_by_window.csv"
+
+# Figure stages show plots (or save them with --headless); they run
+# with --figures.
+# 4_explore_scan_anomalies.py is interactive and is not a stage.
+STAGES = {
+    "1_build_behavior_baseline": {
+        "inputs": [GROUP_SCANS, ETHOGRAM],
+        "outputs": [CATEGORY_BASELINE, SCANS_CATEGORY, SOCIAL_WEIGHTS],
+    },
+    "2_group_deviantions_heatmaps": {
+        "inputs": [CATEGORY_BASELINE, SCANS_CATEGORY],
+        "outputs": [],
+        "figure": True,
+    },
+    "3_N2_event_heatmap": {
+        "inputs": [CATEGORY_BASELINE, FOCAL_N2, FOCAL_N2_MARKERS, ETHOGRAM],
+        "outputs": [],
+        "figure": True,
+    },
+    "3_rumination_baseline_band_day3": {
+        "inputs": [CATEGORY_BASELINE, SCANS_CATEGORY],
+        "outputs": [CATEGORY_BANDS, SCANS_BAND_DEVIATION],
+        "figure": True,
+    },
+    "4_anomaly_flags_build": {
+        "inputs": [SCANS_CATEGORY],
+        "outputs": [ANOMALY_FLAGS],
+    },
+    # The registry is read and extended by the stage: tracked as an
+    # output only, so an edit to it still reruns the stage
+    "5_social_summary": {
+        "inputs": [INTERACTIONS, SOCIAL_WEIGHTS],
+        "outputs": [
+            SOCIAL_LEDGERS, SOCIAL_EDGES, SOCIAL_ROLES, SOCIAL_WINDOW_ROLES,
+            INDIVIDUAL_REGISTRY,
+        ],
+    },
+    "6_plot_social_graphs": {
+        "inputs": [SOCIAL_EDGES, SOCIAL_LEDGERS],
+        "outputs": [],
+        "figure": True,
+    },
+    "7_entity_role_profiles_graph": {
+        "inputs": [SOCIAL_ROLES, SOCIAL_WINDOW_ROLES],
+        "outputs": [],
+        "figure": True,
+    },
+}
+
+
+def stage_script(name):
+    return SCRIPTS_DIR / f"{name}.py"
+
+
+def stage_dependencies(name):
+    """Stages producing any of this stage's inputs."""
+    inputs = set(STAGES[name]["inputs"])
+    return {
+        other
+        for other, spec in STAGES.items()
+        if other != name and inputs & set(spec["outputs"])
+    }
+
+
+# ======================================================
+# Content hashing
+# ======================================================
+
+def file_hash(path):
+    if not path.exists():
+        return None
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_files(paths):
+    return {str(p.relative_to(OUTPUTS_DIR.parent)): file_hash(p) for p in paths}
+
+
+def load_manifest():
+    if not MANIFEST_PATH.exists():
+        return {}
+    with open(MANIFEST_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest):
+    tmp_path = MANIFEST_PATH.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    tmp_path.replace(MANIFEST_PATH)
+
+
+def stage_fingerprint(name):
+    # utils.store imports pandas; the runner itself does not need it
+    from utils.store import columnar_enabled
+
+    spec = STAGES[name]
+    return {
+        "script": file_hash(stage_script(name)),
+        "utils": utils_hash(),
+        "inputs": hash_files(spec["inputs"]),
+        # Switching the store format must (re)write the columnar copies
+        "columnar": columnar_enabled(),
+    }
+
+
+def is_up_to_date(name, manifest):
+    """
+    Inputs, script, utils modules and store format unchanged, outputs
+    present and untouched.
+    """
+    spec = STAGES[name]
+    record = manifest.get(name)
+
+    if record is None or spec.get("figure"):
+        return False
+
+    return (
+        record["fingerprint"] == stage_fingerprint(name)
+        and record["outputs"] == hash_files(spec["outputs"])
+        and all(p.exists() for p in spec["outputs"])
+    )
+
+
+# ======================================================
+# Execution
+# ======================================================
+
+def run_stage(name):
+    """Run one stage script in its own process (cwd = scripts/)."""
+    # The stage traces its own CPU time and memory; this span is the
+    # stage as seen from the pipeline (process start to exit)
+    with span(name, kind="stage"):
+        result = subprocess.run(
+            [sys.executable, str(stage_script(name))],
+            cwd=SCRIPTS_DIR,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+        )
+    return result.returncode, result.stdout + result.stderr
+
+
+def run_pipeline(selected, force=False, jobs=None):
+    manifest = load_manifest()
+
+    pending = {name: stage_dependencies(name) & set(selected) for name in selected}
+    done, failed = set(), set()
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        while pending or running:
+            ready = [
+                name for name, deps in pending.items()
+                if deps <= done
+            ]
+
+            for name in ready:
+                del pending[name]
+
+                # Downstream of a rebuilt stage, the hash check decides
+                if not force and is_up_to_date(name, manifest):
+                    print(f"[skip] {name} (up to date)")
+                    done.add(name)
+                    continue
+
+                print(f"[run ] {name}")
+                fingerprint = stage_fingerprint(name)
+                running[pool.submit(run_stage, name)] = (name, fingerprint)
+
+            if ready and not running:
+                continue
+
+            # Stages blocked by a failed dependency
+            for name, deps in list(pending.items()):
+                if deps & failed:
+                    print(f"[fail] {name} (dependency failed)")
+                    del pending[name]
+                    failed.add(name)
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in finished:
+                name, fingerprint = running.pop(future)
+                returncode, output = future.result()
+
+                if output.strip():
+                    print(f"\n----- {name} -----\n{output.rstrip()}\n")
+
+                if returncode != 0:
+                    print(f"[fail] {name} (exit code {returncode})")
+                    failed.add(name)
+                    manifest.pop(name, None)
+                    continue
+
+                print(f"[done] {name}")
+                done.add(name)
+                manifest[name] = {
+                    "fingerprint": fingerprint,
+                    "outputs": hash_files(STAGES[name]["outputs"]),
+                }
+
+            save_manifest(manifest)
+
+    return not failed
+
+
+# ======================================================
+# ENTRY POINT
+# ======================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the analysis stages, skipping up-to-date ones."
+    )
+    parser.add_argument(
+        "stages",
+        nargs="*",
+        help="Stages to run (default: all data stages)."
+    )
+    parser.add_argument(
+        "--figures",
+        action="store_true",
+        help="Also run the figure stages."
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run stages even if their outputs are up to date."
+    )
+    parser.add_argument(
+        "--headless",
+        metavar="FORMATS",
+        help="Write figures to outputs/figures (e.g. png or png,svg) "
+             "instead of showing them."
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FORMATS",
+        help="Record wall/CPU time, peak memory and row counts of every "
+             "stage and its major steps under outputs/traces "
+             "(jsonl, chrome or jsonl,chrome)."
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Maximum number of stages running at once."
+    )
+    args = parser.parse_args()
+
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    selected = args.stages or [
+        name for name, spec in STAGES.items()
+        if args.figures or not spec.get("figure")
+    ]
+
+    # Inherited by the stage subprocesses
+    if args.headless:
+        os.environ[FORMATS_ENV] = args.headless
+    if args.trace:
+        os.environ[TRACE_ENV] = args.trace
+        trace_script()
+        print(f"Tracing to {run_dir()}")
+
+    ok = run_pipeline(selected, force=args.force, jobs=args.jobs)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
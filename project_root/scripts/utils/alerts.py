@@ -0,0 +1,203 @@
+# utils/alerts.py
+
+from collections import OrderedDict
+
+from utils.drilldown import DrilldownIndex, behavior_proportions
+from utils.observations import ObservationDB, observation_db_enabled
+from utils.paths import ANOMALIES_DIR, DATA_DIR
+from utils.store import read_table
+from utils.translate import translate_series
+
+# ======================================================
+# Alert list + drill-down API
+# ======================================================
+
+FLAGS_PATH = ANOMALIES_DIR / "scan_anomaly_flags_with_severity.csv"
+
+SEVERITY_ORDER = {
+    "HIGH": 0,
+    "MEDIUM": 1,
+    "LOW": 2,
+}
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+# Cached query responses kept per store
+CACHE_SIZE = 512
+
+
+class AlertStore:
+    """
+    In-memory alert list with filtered, paginated queries and per-alert
+    drill-down.
+
+    Flags are loaded once and reloaded only when the flags file changes
+    on disk; query results are cached until then. Alert ids are the
+    1-based positions in the severity-ordered list (the numbers the
+    interactive explorer shows).
+    """
+
+    def __init__(self, flags_path=FLAGS_PATH,
+                 scans_path=DATA_DIR / "group_scan_observations.csv",
+                 ethogram_path=DATA_DIR / "ethogram_reference.csv"):
+        self.flags_path = flags_path
+        self.scans_path = scans_path
+        self.ethogram_path = ethogram_path
+
+        self.version = None
+        self.observations = None
+        self._cache = OrderedDict()
+        self.refresh()
+
+    # --------------------------------------------------
+    # Loading
+    # --------------------------------------------------
+
+    def refresh(self):
+        """Reload flags and drill-down index if their sources changed."""
+        stat = self.flags_path.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        if version == self.version:
+            return False
+
+        flags = read_table(self.flags_path)
+        flags["SeverityRank"] = flags["Severity"].map(SEVERITY_ORDER)
+
+        self.alerts = (
+            flags
+            .sort_values(["SeverityRank", "Day", "Scan"])
+            .reset_index(drop=True)
+        )
+        self.alerts["AlertId"] = self.alerts.index + 1
+        self.alerts["Category_EN"] = translate_series(
+            self.alerts["Category"]
+        )
+
+        # Drill-downs query the observation database when it is enabled
+        if self.observations is not None:
+            self.observations.sync(self.scans_path.parent)
+        elif observation_db_enabled():
+            self.observations = ObservationDB.open(self.scans_path.parent)
+        else:
+            self.drilldown_index = DrilldownIndex.open(
+                self.scans_path, self.ethogram_path
+            )
+
+        self.version = version
+        self._cache.clear()
+        return True
+
+    # --------------------------------------------------
+    # Queries
+    # --------------------------------------------------
+
+    def query(self, severity=None, day_min=None, day_max=None,
+              category=None, offset=0, limit=DEFAULT_PAGE_SIZE):
+        """
+        One page of alerts matching the filters.
+
+        severity: iterable of HIGH/MEDIUM/LOW; category: iterable of
+        labels (Spanish or English). Returns a JSON-ready dict.
+        """
+        severity = tuple(sorted(severity)) if severity else None
+        category = tuple(sorted(category)) if category else None
+        day_min = int(day_min) if day_min is not None else None
+        day_max = int(day_max) if day_max is not None else None
+        limit = max(0, min(int(limit), MAX_PAGE_SIZE))
+        offset = max(0, int(offset))
+
+        key = ("query", severity, day_min, day_max, category, offset, limit)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        alerts = self.alerts
+        mask = alerts["AlertId"] > 0
+
+        if severity:
+            mask &= alerts["Severity"].isin(severity)
+        if day_min is not None:
+            mask &= alerts["Day"] >= day_min
+        if day_max is not None:
+            mask &= alerts["Day"] <= day_max
+        if category:
+            mask &= (
+                alerts["Category"].isin(category)
+                | alerts["Category_EN"].isin(category)
+            )
+
+        matched = alerts[mask]
+        page = matched.iloc[offset:offset + limit]
+
+        result = {
+            "total": int(len(matched)),
+            "offset": offset,
+            "limit": limit,
+            "alerts": [_alert_record(row) for row in page.itertuples()],
+        }
+        return self._remember(key, result)
+
+    def alert(self, alert_id):
+        """Alert row for a 1-based id (None if out of range)."""
+        if not 1 <= alert_id <= len(self.alerts):
+            return None
+        return self.alerts.iloc[alert_id - 1]
+
+    def drilldown_table(self, alert_id):
+        """Behavior | Count | Proportion behind one alert."""
+        selected = self.alert(alert_id)
+        if selected is None:
+            return None
+        if self.observations is not None:
+            return behavior_proportions(self.observations.behavior_counts(
+                selected.Day, selected.Scan, selected.Category
+            ))
+        return self.drilldown_index.lookup(
+            selected.Day, selected.Scan, selected.Category
+        )
+
+    def drilldown(self, alert_id):
+        """JSON-ready alert + behavior breakdown (None if unknown id)."""
+        key = ("drilldown", alert_id)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        drill = self.drilldown_table(alert_id)
+        if drill is None:
+            return None
+
+        selected = self.alerts.iloc[alert_id - 1]
+        result = {
+            "alert": _alert_record(selected),
+            "behaviors": [
+                {
+                    "Behavior": row.Behavior,
+                    "Count": int(row.Count),
+                    "Proportion": float(row.Proportion),
+                }
+                for row in drill.itertuples()
+            ],
+        }
+        return self._remember(key, result)
+
+    def _remember(self, key, result):
+        self._cache[key] = result
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return result
+
+
+def _alert_record(row):
+    return {
+        "id": int(row.AlertId),
+        "Day": int(row.Day),
+        "Scan": int(row.Scan),
+        "Category": row.Category,
+        "Category_EN": row.Category_EN,
+        "Proportion": float(row.Proportion),
+        "Flag": row.Flag,
+        "Severity": row.Severity,
+    }
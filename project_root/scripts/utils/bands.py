@@ -0,0 +1,84 @@
+# utils/bands.py
+
+import numpy as np
+import pandas as pd
+
+# ======================================================
+# Category baseline bands
+# ======================================================
+
+# Normal range of a category: interquartile range of its scan proportions
+BAND_QUANTILES = (0.25, 0.75)
+
+# Automatic y-limits: largest |deviation| of the category plus headroom,
+# rounded up to this step
+LIMIT_STEP = 0.05
+LIMIT_HEADROOM = 1.1
+
+
+def deviation_series(scans, baseline):
+    """
+    Scan-level deviation from baseline for every Category and Day.
+
+    scans: Day | Scan | Category | Proportion
+    baseline: Category | Proportion
+    Returns Category | Day | Scan | Proportion | Deviation, sorted by
+    Category (baseline order), Day and Scan. Categories outside the
+    baseline are dropped.
+    """
+    baseline_by_category = baseline.set_index("Category")["Proportion"]
+
+    series = scans.assign(
+        Deviation=scans["Proportion"]
+        - scans["Category"].map(baseline_by_category).astype(float)
+    ).dropna(subset=["Deviation"])
+
+    order = pd.Categorical(
+        series["Category"], categories=baseline["Category"], ordered=True
+    )
+
+    return (
+        series
+        .assign(_order=order)
+        .sort_values(["_order", "Day", "Scan"], kind="stable")
+        .drop(columns="_order")
+        [["Category", "Day", "Scan", "Proportion", "Deviation"]]
+        .reset_index(drop=True)
+    )
+
+
+def category_bands(series, config=None):
+    """
+    IQR band of each category's deviations over all days (scans where
+    the category was observed), in one grouped pass:
+    Category | Q1_Deviation | Q3_Deviation | Limit.
+
+    Limit is the symmetric y-limit for plotting: taken from `config`
+    ({category: {"limit": x}}) when given there, otherwise the largest
+    |deviation| or band edge plus headroom, rounded up to LIMIT_STEP.
+    """
+    low, high = BAND_QUANTILES
+    deviation = series.groupby(
+        "Category", sort=False, observed=True
+    )["Deviation"]
+
+    quantiles = deviation.quantile(list(BAND_QUANTILES)).unstack()
+    bands = pd.DataFrame({
+        "Q1_Deviation": quantiles[low],
+        "Q3_Deviation": quantiles[high],
+    })
+
+    extent = pd.concat([
+        bands.abs(),
+        series["Deviation"].abs()
+        .groupby(series["Category"], observed=True)
+        .max(),
+    ], axis=1).max(axis=1)
+    steps = np.ceil(extent * LIMIT_HEADROOM / LIMIT_STEP).clip(lower=1)
+    bands["Limit"] = (steps * LIMIT_STEP).round(10)
+
+    for category, spec in (config or {}).items():
+        if category in bands.index and "limit" in spec:
+            bands.loc[category, "Limit"] = spec["limit"]
+
+    return bands.rename_axis("Category").reset_index()
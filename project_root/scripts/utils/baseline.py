@@ -0,0 +1,543 @@
+# utils/baseline.py
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from utils.ingest import AppendCursor, CHUNK_ROWS, attach_categories
+from utils.paths import BASELINES_DIR
+
+# ======================================================
+# Persistent baseline state
+# ======================================================
+
+# Directory holding the state: STATE_META plus one .npz segment per save
+STATE_PATH = BASELINES_DIR / "baseline_state"
+STATE_META = "state.json"
+
+# Rarity weights (1 / baseline proportion) for the social systems,
+# refreshed by every baseline update
+WEIGHTS_PATH = BASELINES_DIR / "social_category_weights.csv"
+
+STATE_VERSION = 3
+
+# Saved segments before the next save compacts them into one
+MAX_SEGMENTS = 16
+
+# Scans per batch when (re)writing the proportions CSV
+WRITE_BATCH_SCANS = 10_000
+
+# (Day, Scan) pairs are packed into one sortable int64 key
+SCAN_BITS = 32
+
+
+def file_hash(path) -> str:
+    """Content hash of a file (used to detect ethogram edits)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scan_keys(day, scan):
+    """Pack Day and Scan arrays into int64 keys sorted like the pairs."""
+    day = np.asarray(day, dtype=np.int64)
+    scan = np.asarray(scan, dtype=np.int64)
+    return (day << SCAN_BITS) | scan
+
+
+def split_scan_keys(keys):
+    """(Day, Scan) arrays of packed scan keys."""
+    keys = np.asarray(keys, dtype=np.int64)
+    return keys >> SCAN_BITS, keys & ((1 << SCAN_BITS) - 1)
+
+
+def key_days(keys):
+    """Sorted distinct days of packed scan keys, as a list."""
+    return np.unique(split_scan_keys(keys)[0]).tolist()
+
+
+class BaselineState:
+    """
+    Running counts behind the category baseline and the scan-level
+    category proportions.
+
+    The scan file is treated as append-only: the state remembers how many
+    bytes of it were already consumed, so each update only parses the rows
+    logged since the previous run. The proportions CSV is rewritten from
+    the first scan touched by the new rows onwards, never from the top.
+
+    Counts are kept as arrays, one row per scan (sorted by packed key)
+    and one column per category. Each save appends a segment with only
+    the scans changed since the state was loaded.
+    """
+
+    def __init__(self, ethogram_clean, ethogram_hash=None):
+        self.behavior_to_category = dict(
+            zip(ethogram_clean["Behavior"], ethogram_clean["Category"])
+        )
+        self.all_categories = (
+            ethogram_clean["Category"]
+            .dropna()
+            .unique()
+            .tolist()
+        )
+        self.categories = sorted(self.all_categories)
+        self.ethogram_hash = ethogram_hash
+        self.reset()
+
+    def reset(self):
+        """Drop all running counts (used when the scan file is replaced)."""
+        # Behavior -> total count (includes behaviors missing from ethogram)
+        self.behavior_counts = {}
+
+        # Scan x category counts; `observed` marks the cells seen at all
+        n_categories = len(self.categories)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.zeros((0, n_categories), dtype=np.int64)
+        self.observed = np.zeros((0, n_categories), dtype=bool)
+
+        # Scan file bookkeeping
+        self.cursor = AppendCursor()
+
+        # Proportions CSV bookkeeping: byte offset of each written scan block
+        self.block_keys = np.empty(0, dtype=np.int64)
+        self.block_offsets = np.empty(0, dtype=np.int64)
+        self.proportions_size = 0
+
+        # Saved segments; empty means the next save writes everything
+        self.segments = []
+        self.next_segment = 0
+
+        # Changes since load: touched scan keys, first rewritten block
+        self._dirty = []
+        self._blocks_from = None
+
+    # --------------------------------------------------
+    # Persistence
+    # --------------------------------------------------
+
+    @classmethod
+    def load(cls, path, ethogram_clean, ethogram_hash=None):
+        """Load a saved state, or start empty if missing or stale."""
+        state = cls(ethogram_clean, ethogram_hash)
+
+        meta_path = path / STATE_META
+        if not meta_path.exists():
+            return state
+
+        with open(meta_path, encoding="utf-8") as f:
+            saved = json.load(f)
+
+        if (
+            saved.get("version") != STATE_VERSION
+            or saved.get("ethogram_hash") != ethogram_hash
+            or saved.get("categories") != state.categories
+        ):
+            return state
+
+        state.behavior_counts = saved["behavior_counts"]
+
+        state.cursor = AppendCursor(
+            saved["source_offset"],
+            saved["source_columns"],
+            saved["source_size"]
+        )
+        state.proportions_size = saved["proportions_size"]
+
+        keys, counts, observed = [state.keys], [state.counts], [state.observed]
+        for name in saved["segments"]:
+            with np.load(path / name) as segment:
+                keys.append(segment["keys"])
+                counts.append(segment["counts"])
+                observed.append(segment["observed"])
+
+                start = int(segment["blocks_from"])
+                state.block_keys = np.concatenate(
+                    [state.block_keys[:start], segment["block_keys"]]
+                )
+                state.block_offsets = np.concatenate(
+                    [state.block_offsets[:start], segment["block_offsets"]]
+                )
+
+        # A scan saved in several segments: the latest one wins
+        keys = np.concatenate(keys)
+        _, last = np.unique(keys[::-1], return_index=True)
+        rows = len(keys) - 1 - last
+
+        state.keys = keys[rows]
+        state.counts = np.concatenate(counts)[rows]
+        state.observed = np.concatenate(observed)[rows]
+
+        state.segments = saved["segments"]
+        state.next_segment = saved["next_segment"]
+        return state
+
+    def save(self, path):
+        """
+        Append a segment with the scans and blocks changed since load
+        (or one with everything after a reset or every MAX_SEGMENTS
+        saves), then point the metadata at it.
+        """
+        path.mkdir(parents=True, exist_ok=True)
+
+        segments = list(self.segments)
+        if not segments or len(segments) >= MAX_SEGMENTS:
+            rows = slice(None)
+            blocks_from = 0
+            segments = []
+        else:
+            dirty = np.unique(np.concatenate(self._dirty or [self.keys[:0]]))
+            rows = np.searchsorted(self.keys, dirty)
+            blocks_from = self._blocks_from
+            if blocks_from is None:
+                blocks_from = len(self.block_keys)
+
+        if (
+            not segments
+            or not isinstance(rows, slice) and len(rows)
+            or blocks_from < len(self.block_keys)
+        ):
+            name = f"cells-{self.next_segment:06d}.npz"
+            self.next_segment += 1
+
+            with open(path / name, "wb") as f:
+                np.savez(
+                    f,
+                    keys=self.keys[rows],
+                    counts=self.counts[rows],
+                    observed=self.observed[rows],
+                    blocks_from=blocks_from,
+                    block_keys=self.block_keys[blocks_from:],
+                    block_offsets=self.block_offsets[blocks_from:],
+                )
+            segments.append(name)
+
+        saved = {
+            "version": STATE_VERSION,
+            "ethogram_hash": self.ethogram_hash,
+            "categories": self.categories,
+            "behavior_counts": self.behavior_counts,
+            "source_columns": self.cursor.columns,
+            "source_offset": self.cursor.offset,
+            "source_size": self.cursor.size,
+            "proportions_size": self.proportions_size,
+            "segments": segments,
+            "next_segment": self.next_segment,
+        }
+
+        tmp_path = path / (STATE_META + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(saved, f)
+        tmp_path.replace(path / STATE_META)
+
+        # Segments folded into a compacted one are no longer referenced
+        for stale in path.glob("cells-*.npz"):
+            if stale.name not in segments:
+                stale.unlink()
+
+        self.segments = segments
+        self._dirty = []
+        self._blocks_from = None
+
+    # --------------------------------------------------
+    # Ingestion
+    # --------------------------------------------------
+
+    def iter_new_chunks(self, scans_path, chunksize=CHUNK_ROWS):
+        """
+        Stream only the rows appended to the scan file since the last
+        update, in bounded-size chunks. A file that shrank is treated
+        as replaced.
+        """
+        if self.cursor.replaced(scans_path):
+            self.reset()
+
+        yield from self.cursor.iter_chunks(scans_path, chunksize)
+
+    def update(self, scans_path, chunksize=CHUNK_ROWS):
+        """
+        Stream new scan rows into the running counts.
+        Returns (rows ingested, sorted keys of the touched scans).
+        """
+        n_rows = 0
+        parts = []
+
+        # Chunks are reduced on their own and merged into the state once
+        for chunk in self.iter_new_chunks(scans_path, chunksize):
+            n_rows += len(chunk)
+            self._count_behaviors(chunk)
+            parts.append(self._reduce(chunk))
+
+        return n_rows, self._merge(parts)
+
+    def ingest(self, new_scans):
+        """
+        Add one chunk of (stripped) scan rows to the running counts.
+        Returns the sorted keys of the scans it touched.
+        """
+        self._count_behaviors(new_scans)
+        return self._merge([self._reduce(new_scans)])
+
+    def _count_behaviors(self, new_scans):
+        for behavior, count in (
+            new_scans.groupby("Behavior", observed=True)["Count"].sum().items()
+        ):
+            self.behavior_counts[behavior] = (
+                self.behavior_counts.get(behavior, 0) + int(count)
+            )
+
+    def _reduce(self, new_scans):
+        """
+        (keys, counts, observed) of one chunk, one row per scan. Rows
+        whose behavior has no category are dropped.
+        """
+        category = attach_categories(
+            new_scans, self.behavior_to_category
+        )["Category"]
+
+        # Chunk category codes -> state columns (-1: no category)
+        columns = np.append(
+            pd.Index(self.categories).get_indexer(category.cat.categories),
+            -1
+        )[category.cat.codes.to_numpy()]
+
+        keep = (
+            (columns >= 0)
+            & new_scans["Day"].notna().to_numpy()
+            & new_scans["Scan"].notna().to_numpy()
+        )
+        keys, inverse = np.unique(
+            scan_keys(
+                new_scans["Day"].to_numpy()[keep],
+                new_scans["Scan"].to_numpy()[keep]
+            ),
+            return_inverse=True
+        )
+
+        n_categories = len(self.categories)
+        cells = inverse * n_categories + columns[keep]
+        size = len(keys) * n_categories
+
+        counts = np.bincount(
+            cells,
+            weights=new_scans["Count"].fillna(0).to_numpy(np.float64)[keep],
+            minlength=size
+        )
+        observed = np.bincount(cells, minlength=size) > 0
+
+        return (
+            keys,
+            counts.round().astype(np.int64).reshape(-1, n_categories),
+            observed.reshape(-1, n_categories),
+        )
+
+    def _merge(self, parts):
+        """Add reduced chunks to the state; returns the touched keys."""
+        parts = [part for part in parts if len(part[0])]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+
+        touched = np.unique(np.concatenate([keys for keys, _, _ in parts]))
+
+        keys = np.concatenate([self.keys] + [p[0] for p in parts])
+        counts = np.concatenate([self.counts] + [p[1] for p in parts])
+        observed = np.concatenate([self.observed] + [p[2] for p in parts])
+
+        # Appended scans usually come after every known one: then the
+        # rows are already sorted and distinct
+        if np.any(keys[1:] <= keys[:-1]):
+            order = np.argsort(keys, kind="stable")
+            keys = keys[order]
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+            keys = keys[starts]
+            counts = np.add.reduceat(counts[order], starts, axis=0)
+            observed = np.logical_or.reduceat(
+                observed[order], starts, axis=0
+            )
+
+        self.keys, self.counts, self.observed = keys, counts, observed
+        self._dirty.append(touched)
+        return touched
+
+    # --------------------------------------------------
+    # Derived tables
+    # --------------------------------------------------
+
+    def category_baseline(self):
+        """Category baseline proportions (same layout as the full build)."""
+        baseline_counts = (
+            pd.Series(self.behavior_counts, name="Count", dtype="int64")
+            .rename_axis("Behavior")
+            .sort_index()
+        )
+
+        total_events = baseline_counts.sum()
+
+        baseline_df = baseline_counts.reset_index()
+        baseline_df["Category"] = baseline_df["Behavior"].map(
+            self.behavior_to_category
+        )
+
+        baseline_df["Proportion"] = baseline_df["Count"] / total_events
+
+        return (
+            baseline_df
+            .groupby("Category")["Proportion"]
+            .sum()
+            .reindex(self.all_categories, fill_value=0)
+            .reset_index()
+            .sort_values("Proportion", ascending=False)
+        )
+
+    def category_weights(self, categories):
+        """Category | Proportion | Weight, Weight = 1 / Proportion."""
+        weights = (
+            self.category_baseline()
+            .set_index("Category")
+            .reindex(categories)
+            .reset_index()
+        )
+
+        # A category never seen in the scans has no rarity weight
+        proportions = weights["Proportion"].to_numpy()
+        with np.errstate(divide="ignore"):
+            weights["Weight"] = np.where(
+                proportions > 0, 1 / proportions, np.nan
+            )
+        return weights
+
+    def scan_keys_for_days(self, days):
+        """Sorted scan keys belonging to the given days."""
+        days = np.unique(np.asarray(list(days), dtype=np.int64))
+        lo = np.searchsorted(self.keys, scan_keys(days, 0))
+        hi = np.searchsorted(self.keys, scan_keys(days + 1, 0))
+
+        return np.concatenate(
+            [self.keys[:0]] + [self.keys[a:b] for a, b in zip(lo, hi)]
+        )
+
+    def scan_proportions(self, keys=None):
+        """Day | Scan | Category | Proportion rows for the given scans."""
+        rows = slice(None)
+        if keys is not None:
+            rows = np.searchsorted(self.keys, keys)
+
+        counts = self.counts[rows]
+        totals = counts.sum(axis=1)
+
+        # Row-major: by scan, then category in sorted order
+        scan_rows, columns = np.nonzero(self.observed[rows])
+        day, scan = split_scan_keys(self.keys[rows][scan_rows])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            proportion = counts[scan_rows, columns] / totals[scan_rows]
+
+        category = pd.Categorical.from_codes(columns, self.categories)
+
+        return pd.DataFrame({
+            "Day": day,
+            "Scan": scan,
+            "Category": category.remove_unused_categories(),
+            "Proportion": proportion,
+        })
+
+    # --------------------------------------------------
+    # Output
+    # --------------------------------------------------
+
+    def write_scan_proportions(self, path, touched):
+        """
+        Update the proportions CSV in place. Only scans from the earliest
+        touched one onwards are rewritten; the rest of the file is kept.
+        """
+        full_rewrite = (
+            not path.exists()
+            or path.stat().st_size != self.proportions_size
+            or not len(self.block_keys)
+        )
+
+        if full_rewrite:
+            j = start = offset = 0
+        elif len(touched):
+            first = np.min(touched)
+            j = int(np.searchsorted(self.block_keys, first))
+            offset = (
+                int(self.block_offsets[j])
+                if j < len(self.block_keys)
+                else self.proportions_size
+            )
+            start = np.searchsorted(self.keys, first)
+        else:
+            return
+
+        self.block_keys = self.block_keys[:j]
+        self.block_offsets = self.block_offsets[:j]
+        if self._blocks_from is None or j < self._blocks_from:
+            self._blocks_from = j
+
+        tail_keys = self.keys[start:]
+
+        mode = "wb" if full_rewrite else "r+b"
+        with open(path, mode) as f:
+            f.seek(offset)
+            f.truncate()
+
+            if full_rewrite:
+                header = (
+                    self.scan_proportions(tail_keys[:0]).to_csv(index=False)
+                    .encode("utf-8")
+                )
+                f.write(header)
+                offset += len(header)
+
+            for i in range(0, len(tail_keys), WRITE_BATCH_SCANS):
+                batch = self.scan_proportions(
+                    tail_keys[i:i + WRITE_BATCH_SCANS]
+                )
+                offset = self._write_block(f, batch, offset)
+
+        self.proportions_size = offset
+
+    def _write_block(self, f, batch, offset):
+        """Append a batch of scan rows, recording each scan's offset."""
+        body = batch.to_csv(index=False, header=False).encode("utf-8")
+
+        # Byte offset where each scan block starts
+        line_lengths = np.fromiter(
+            (len(line) for line in body.splitlines(keepends=True)),
+            dtype=np.int64,
+            count=len(batch)
+        )
+        line_offsets = (
+            offset
+            + np.concatenate([[0], np.cumsum(line_lengths)[:-1]])
+        )
+
+        block_starts = np.flatnonzero(
+            (batch[["Day", "Scan"]].diff().fillna(1) != 0).any(axis=1)
+        )
+
+        self.block_keys = np.concatenate([
+            self.block_keys,
+            scan_keys(
+                batch["Day"].to_numpy()[block_starts],
+                batch["Scan"].to_numpy()[block_starts]
+            ),
+        ])
+        self.block_offsets = np.concatenate(
+            [self.block_offsets, line_offsets[block_starts]]
+        )
+
+        f.write(body)
+        return offset + len(body)
+
+
+def load_category_weights(path=WEIGHTS_PATH):
+    """Category → rarity weight, read back without float rounding."""
+    weights = pd.read_csv(path, float_precision="round_trip")
+    return dict(zip(weights["Category"], weights["Weight"]))
@@ -0,0 +1,10 @@
+# utils/categories.py
+
+# ======================================================
+# Behavior category groups
+# ======================================================
+
+# Categories of the directed social interaction systems. Kept out of
+# utils/social_graph.py so that stages only needing the labels do not
+# import scipy.
+SOCIAL_CATEGORIES = ["Agonista", "Apaciguamiento", "Afiliativa"]
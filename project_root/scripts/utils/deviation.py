@@ -0,0 +1,170 @@
+# utils/deviation.py
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from utils.baseline import file_hash
+from utils.paths import BASELINES_DIR, GROUP_SCANS_DIR
+from utils.store import read_table
+
+# ======================================================
+# Day × Scan × Category deviation tensor
+# ======================================================
+
+BASELINE_PATH = BASELINES_DIR / "category_baseline.csv"
+SCANS_PATH = GROUP_SCANS_DIR / "scans_category_proportions_all_days.csv"
+
+CACHE_PATH = GROUP_SCANS_DIR / "deviation_tensor.npz"
+
+TENSOR_VERSION = 1
+
+
+class DeviationTensor:
+    """
+    Scan-level deviation from baseline for every Day, Scan and Category
+    as one dense array (days × scans × categories), with label indices.
+
+    Scans absent from a day are NaN (`present` marks the real ones);
+    categories not observed in a present scan have proportion 0, as in
+    the per-day Scan × Category grid. Categories follow baseline order.
+    """
+
+    def __init__(self, days, scans, categories, values, present):
+        self.days = np.asarray(days)
+        self.scans = np.asarray(scans)
+        self.categories = list(categories)
+        self.values = values
+        self.present = present
+
+        self._day_pos = {int(d): i for i, d in enumerate(self.days)}
+
+    # --------------------------------------------------
+    # Build
+    # --------------------------------------------------
+
+    @classmethod
+    def build(cls, scans_df, baseline_df):
+        """
+        scans_df: Day | Scan | Category | Proportion
+        baseline_df: Category | Proportion (defines category order)
+        """
+        categories = baseline_df["Category"].tolist()
+        baseline = baseline_df["Proportion"].to_numpy(dtype=float)
+
+        days, day_idx = np.unique(scans_df["Day"], return_inverse=True)
+        scans, scan_idx = np.unique(scans_df["Scan"], return_inverse=True)
+        cat_idx = pd.Categorical(
+            scans_df["Category"], categories=categories
+        ).codes
+
+        shape = (len(days), len(scans), len(categories))
+        proportions = np.zeros(shape)
+        present = np.zeros(shape[:2], dtype=bool)
+        present[day_idx, scan_idx] = True
+
+        # Categories outside the baseline have no row to go to
+        known = cat_idx >= 0
+        proportions[day_idx[known], scan_idx[known], cat_idx[known]] = (
+            scans_df["Proportion"].to_numpy(dtype=float)[known]
+        )
+
+        values = proportions - baseline
+        values[~present] = np.nan
+
+        return cls(days, scans, categories, values, present)
+
+    # --------------------------------------------------
+    # Cache
+    # --------------------------------------------------
+
+    def save(self, path, source):
+        meta = {
+            "version": TENSOR_VERSION,
+            "categories": self.categories,
+            "source": source,
+        }
+
+        tmp_path = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp_path,
+            meta=np.array(json.dumps(meta)),
+            days=self.days,
+            scans=self.scans,
+            values=self.values,
+            present=self.present,
+        )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path, source):
+        """Cached tensor, or None if missing or built from other data."""
+        if not path.exists():
+            return None
+
+        with np.load(path) as cached:
+            meta = json.loads(str(cached["meta"]))
+            if meta.get("version") != TENSOR_VERSION:
+                return None
+            if meta.get("source") != source:
+                return None
+
+            return cls(
+                cached["days"],
+                cached["scans"],
+                meta["categories"],
+                cached["values"],
+                cached["present"],
+            )
+
+    @classmethod
+    def open(cls, scans_path=SCANS_PATH, baseline_path=BASELINE_PATH,
+             days=None, cache_path=CACHE_PATH):
+        """Load the cached tensor, rebuilding it if its sources changed."""
+        source = {
+            "scans_hash": file_hash(scans_path),
+            "baseline_hash": file_hash(baseline_path),
+            "days": sorted(days) if days is not None else None,
+        }
+
+        tensor = cls.load(cache_path, source)
+        if tensor is not None:
+            return tensor
+
+        baseline = read_table(baseline_path, columns=["Category", "Proportion"])
+        scans = read_table(
+            scans_path,
+            columns=["Day", "Scan", "Category", "Proportion"],
+            days=days,
+            categorical=True
+        )
+
+        tensor = cls.build(scans, baseline)
+        tensor.save(cache_path, source)
+        return tensor
+
+    # --------------------------------------------------
+    # Slices
+    # --------------------------------------------------
+
+    def day_heatmap(self, day):
+        """Category × Scan deviations for one day (its scans only)."""
+        i = self._day_pos[int(day)]
+        scan_mask = self.present[i]
+
+        return pd.DataFrame(
+            self.values[i][scan_mask].T,
+            index=pd.Index(self.categories, name="Category"),
+            columns=pd.Index(self.scans[scan_mask], name="Scan"),
+        )
+
+    def day_means(self):
+        """Day × Category mean deviation over each day's scans."""
+        means = np.nanmean(self.values, axis=1)
+
+        return pd.DataFrame(
+            means,
+            index=pd.Index(self.days, name="Day"),
+            columns=pd.Index(self.categories, name="Category"),
+        )
@@ -0,0 +1,180 @@
+# utils/drilldown.py
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from utils.baseline import file_hash, scan_keys
+from utils.ingest import read_scan_chunks, reduce_scan_counts
+from utils.paths import ANOMALIES_DIR
+
+# ======================================================
+# (Day, Scan, Category) → behavior counts index
+# ======================================================
+
+INDEX_DIR = ANOMALIES_DIR / "drilldown_index"
+
+INDEX_VERSION = 2
+
+
+def source_signature(scans_path, ethogram_path):
+    """Cheap staleness check: scan file size/mtime + ethogram content."""
+    stat = scans_path.stat()
+    return {
+        "version": INDEX_VERSION,
+        "scans_size": stat.st_size,
+        "scans_mtime_ns": stat.st_mtime_ns,
+        "ethogram_hash": file_hash(ethogram_path),
+    }
+
+
+class DrilldownIndex:
+    """
+    Precomputed behavior counts for every (Day, Scan, Category) cell.
+
+    Stored as flat NumPy arrays (memory-mapped on open): per-cell
+    [start, stop) offsets into behavior-code / count arrays, with entries
+    of a cell ordered by Behavior. Cells are sorted by packed (Day, Scan)
+    key, then category code, so a drill-down is a binary search on the
+    mapped keys plus a slice; opening the index reads no keys.
+    """
+
+    def __init__(self, index_dir, mmap_mode="r"):
+        with open(index_dir / "meta.json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        self.behaviors = np.asarray(self.meta["behaviors"], dtype=object)
+        self.category_codes = {
+            category: code
+            for code, category in enumerate(self.meta["categories"])
+        }
+
+        load = lambda name: np.load(index_dir / name, mmap_mode=mmap_mode)
+        self.bounds = load("bounds.npy")
+        self.behavior_codes = load("behavior_codes.npy")
+        self.counts = load("counts.npy")
+
+        self.scan_keys = load("scan_keys.npy")
+        self.cell_categories = load("cell_categories.npy")
+
+    # --------------------------------------------------
+    # Build
+    # --------------------------------------------------
+
+    @staticmethod
+    def build(scans_path, ethogram_path, index_dir=INDEX_DIR):
+        """Stream the scan file once and persist the index arrays."""
+        ethogram = pd.read_csv(ethogram_path)[["Behavior", "Category"]]
+        behavior_to_category = dict(
+            zip(ethogram["Behavior"], ethogram["Category"])
+        )
+
+        # Raw (unstripped) labels, as the explorer has always matched
+        # them against the ethogram
+        counts = reduce_scan_counts(
+            read_scan_chunks(scans_path, strip_behavior=False),
+            behavior_to_category,
+            keys=("Day", "Scan", "Category", "Behavior")
+        ).reset_index()
+
+        behaviors = sorted(counts["Behavior"].unique())
+        categories = sorted(counts["Category"].unique())
+
+        counts["BehaviorCode"] = pd.Categorical(
+            counts["Behavior"], categories=behaviors
+        ).codes
+        counts["CategoryCode"] = pd.Categorical(
+            counts["Category"], categories=categories
+        ).codes
+
+        # groupby output is already ordered by Day, Scan, Category, Behavior
+        cell_keys = counts[["Day", "Scan", "CategoryCode"]]
+        starts = np.flatnonzero(
+            (cell_keys.diff().fillna(1) != 0).any(axis=1)
+        )
+        stops = np.append(starts[1:], len(counts))
+
+        index_dir.mkdir(parents=True, exist_ok=True)
+
+        cells = cell_keys.iloc[starts]
+        np.save(
+            index_dir / "scan_keys.npy",
+            scan_keys(cells["Day"].to_numpy(), cells["Scan"].to_numpy())
+        )
+        np.save(
+            index_dir / "cell_categories.npy",
+            cells["CategoryCode"].to_numpy(dtype=np.int32)
+        )
+        np.save(index_dir / "bounds.npy", np.column_stack([starts, stops]))
+        np.save(
+            index_dir / "behavior_codes.npy",
+            counts["BehaviorCode"].to_numpy(dtype=np.int32)
+        )
+        np.save(
+            index_dir / "counts.npy",
+            counts["Count"].to_numpy(dtype=np.int64)
+        )
+
+        meta = {
+            "behaviors": behaviors,
+            "categories": categories,
+            "source": source_signature(scans_path, ethogram_path),
+        }
+        with open(index_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def open(cls, scans_path, ethogram_path, index_dir=INDEX_DIR):
+        """Open the persisted index, rebuilding it if the sources changed."""
+        meta_path = index_dir / "meta.json"
+
+        stale = True
+        if meta_path.exists():
+            with open(meta_path, encoding="utf-8") as f:
+                saved = json.load(f).get("source")
+            stale = saved != source_signature(scans_path, ethogram_path)
+
+        if stale:
+            cls.build(scans_path, ethogram_path, index_dir)
+
+        return cls(index_dir)
+
+    # --------------------------------------------------
+    # Lookup
+    # --------------------------------------------------
+
+    def lookup(self, day, scan, category):
+        """
+        Behavior | Count | Proportion for one cell, most frequent first
+        (same table the explorer used to build with merge + query).
+        """
+        start = stop = 0
+
+        # Cells of one scan are adjacent, at most one per category
+        key = scan_keys(int(day), int(scan))
+        lo = np.searchsorted(self.scan_keys, key, side="left")
+        hi = np.searchsorted(self.scan_keys, key, side="right")
+        code = self.category_codes.get(category)
+
+        if code is not None:
+            cell = lo + np.flatnonzero(self.cell_categories[lo:hi] == code)
+            if len(cell):
+                start, stop = self.bounds[cell[0]]
+
+        return behavior_proportions(pd.DataFrame({
+            "Behavior": self.behaviors[self.behavior_codes[start:stop]],
+            "Count": np.asarray(self.counts[start:stop]),
+        }))
+
+
+def behavior_proportions(counts):
+    """
+    Behavior | Count (ordered by Behavior) → Behavior | Count |
+    Proportion, most frequent first.
+    """
+    drill = counts.sort_values("Count", ascending=False)
+
+    total = drill["Count"].sum()
+    drill["Proportion"] = drill["Count"] / total
+    return drill
@@ -0,0 +1,121 @@
+# utils/flags.py
+
+import numpy as np
+import pandas as pd
+
+from utils.trace import traced
+
+# ======================================================
+# Per-category quantile thresholds
+# ======================================================
+
+QUANTILES = {
+    "low": [0.01, 0.02, 0.05],
+    "high": [0.95, 0.98, 0.99],
+}
+
+THRESHOLD_COLUMNS = [
+    "p01", "p02", "p05",
+    "p95", "p98", "p99",
+]
+
+# Checked in order; the first matching rule wins.
+# (threshold column, direction, Flag, Severity)
+SEVERITY_RULES = [
+    ("p99", "above", "HIGH_OUTLIER", "HIGH"),
+    ("p01", "below", "LOW_OUTLIER", "HIGH"),
+    ("p98", "above", "HIGH_OUTLIER", "MEDIUM"),
+    ("p02", "below", "LOW_OUTLIER", "MEDIUM"),
+    ("p95", "above", "HIGH_OUTLIER", "LOW"),
+    ("p05", "below", "LOW_OUTLIER", "LOW"),
+]
+
+
+def category_thresholds(scan_category):
+    """Category × p01…p99 table from the scan-level proportions."""
+    category_stats = (
+        scan_category
+        .groupby("Category", observed=True)["Proportion"]
+        .quantile(
+            QUANTILES["low"] + QUANTILES["high"]
+        )
+        .unstack()
+    )
+
+    category_stats.columns = THRESHOLD_COLUMNS
+    return category_stats
+
+
+# ======================================================
+# Flag + severity logic (batched)
+# ======================================================
+
+def severity_rules(scan_category, category_stats):
+    """
+    Position in SEVERITY_RULES of the first rule matching each
+    Day/Scan/Category row, -1 where none does (or the category has no
+    thresholds).
+
+    Thresholds are looked up per category code, so memory stays at a
+    few bytes per row however many rows there are.
+    """
+    categories = pd.Categorical(scan_category["Category"])
+    limits = category_stats.reindex(categories.categories).to_numpy()
+
+    # Code -1 (missing category) picks the trailing row of NaN limits
+    limits = np.vstack([limits, np.full(limits.shape[1], np.nan)])
+    codes = categories.codes
+    values = scan_category["Proportion"].to_numpy()
+
+    # Later rules first, so earlier matches overwrite them
+    rules = np.full(len(values), -1, dtype=np.int8)
+    for i in reversed(range(len(SEVERITY_RULES))):
+        column, direction, _, _ = SEVERITY_RULES[i]
+        limit = limits[codes, category_stats.columns.get_loc(column)]
+        if direction == "above":
+            rules[values > limit] = i
+        else:
+            rules[values < limit] = i
+
+    return rules
+
+
+@traced()
+def flag_with_severity(scan_category, category_stats, flagged_only=False):
+    """
+    Flag and Severity for every Day/Scan/Category row in one array pass;
+    rows with no rule matching (or a category without thresholds) get
+    None. With `flagged_only`, only the rows a rule matches are
+    returned (labels are then built for those rows alone).
+    """
+    rules = severity_rules(scan_category, category_stats)
+    index = scan_category.index
+
+    if flagged_only:
+        matched = rules >= 0
+        rules, index = rules[matched], index[matched]
+
+    # Rule -1 picks the trailing None
+    flags = np.array([rule[2] for rule in SEVERITY_RULES] + [None])
+    severities = np.array([rule[3] for rule in SEVERITY_RULES] + [None])
+
+    return pd.DataFrame(
+        {"Flag": flags[rules], "Severity": severities[rules]},
+        index=index,
+        dtype=object
+    )
+
+
+def severity_for_value(value, thresholds):
+    """
+    Flag and Severity for a single proportion, given a mapping of
+    p01…p99 thresholds (streaming counterpart of flag_with_severity).
+    """
+    for column, direction, flag, severity in SEVERITY_RULES:
+        limit = thresholds[column]
+        if direction == "above" and value > limit:
+            return flag, severity
+        if direction == "below" and value < limit:
+            return flag, severity
+
+    return None, None
@@ -0,0 +1,153 @@
+# utils/focal.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.paths import DATA_DIR
+
+# ======================================================
+# Focal-individual event deviation
+# ======================================================
+
+# <ID>_individual_observation.csv: Event | Behavior | Count
+FOCAL_SUFFIX = "_individual_observation.csv"
+
+# <ID>_event_markers.csv: Position | Label (Position between events,
+# e.g. 3.5 = between events 3 and 4)
+MARKERS_SUFFIX = "_event_markers.csv"
+
+
+def focal_files(data_dir=DATA_DIR):
+    return sorted(data_dir.glob(f"*{FOCAL_SUFFIX}"))
+
+
+def focal_id(path):
+    """Individual id from the file name (N2_individual_observation → N2)."""
+    name = path.name
+    if name.endswith(FOCAL_SUFFIX):
+        return name[:-len(FOCAL_SUFFIX)]
+    return path.stem
+
+
+def markers_path(focal_path):
+    return focal_path.with_name(focal_id(focal_path) + MARKERS_SUFFIX)
+
+
+def load_markers(path):
+    """{position: label}; no markers if the file does not exist."""
+    if path is None or not path.exists():
+        return {}
+
+    markers = pd.read_csv(path)
+    return dict(zip(markers["Position"], markers["Label"]))
+
+
+def event_deviation(focal, behavior_to_category, baseline):
+    """
+    Category × Event deviation of per-event category proportions from
+    the baseline, in one grouped pass.
+
+    focal: Event | Behavior | Count
+    baseline: Category | Proportion (defines row order)
+    Behaviors missing from the ethogram are dropped.
+    """
+    focal = focal.assign(Category=focal["Behavior"].map(behavior_to_category))
+    focal = focal.dropna(subset=["Category"])
+
+    return count_deviation(
+        focal.groupby(["Event", "Category"])["Count"].sum(), baseline
+    )
+
+
+def count_deviation(counts, baseline):
+    """
+    Category × Event deviation from summed counts indexed by
+    (Event, Category).
+    """
+    categories = baseline["Category"].tolist()
+
+    counts = (
+        counts
+        .unstack("Category", fill_value=0)
+        .reindex(columns=categories, fill_value=0)
+        .sort_index()
+    )
+
+    values = counts.to_numpy()
+    totals = values.sum(axis=1, keepdims=True)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        proportions = np.where(totals > 0, values / totals, 0)
+
+    deviation = proportions - baseline["Proportion"].to_numpy()
+
+    return pd.DataFrame(
+        deviation.T,
+        index=pd.Index(categories, name="Category"),
+        columns=counts.index,
+    )
+
+
+def _focal_job(focal_path, markers_file, behavior_to_category, baseline):
+    focal = pd.read_csv(focal_path)
+    return (
+        focal_id(focal_path),
+        event_deviation(focal, behavior_to_category, baseline),
+        load_markers(markers_file),
+    )
+
+
+def stored_focal_deviations(observations, baseline, data_dir=DATA_DIR,
+                            markers=None):
+    """
+    focal_deviations for every focal animal in the observation database,
+    with the Event × Category sums computed by the database.
+
+    markers: {individual: markers_path}; by default
+    <ID>_event_markers.csv in data_dir.
+    """
+    markers = markers or {}
+    return [
+        (
+            individual,
+            count_deviation(
+                observations.focal_category_counts(individual), baseline
+            ),
+            load_markers(markers.get(
+                individual, data_dir / f"{individual}{MARKERS_SUFFIX}"
+            )),
+        )
+        for individual in observations.focal_individuals()
+    ]
+
+
+def focal_deviations(focal_paths, behavior_to_category, baseline,
+                     markers=None, workers=None):
+    """
+    [(individual, Category × Event deviation, markers)] for every focal
+    file, animals spread across worker processes.
+
+    markers: {focal_path: markers_path}; by default each file's
+    <ID>_event_markers.csv next to it.
+    """
+    focal_paths = list(focal_paths)
+    markers = markers or {}
+    args = [
+        (
+            path,
+            markers.get(path, markers_path(path)),
+            behavior_to_category,
+            baseline,
+        )
+        for path in focal_paths
+    ]
+
+    workers = min(workers or os.cpu_count(), len(args))
+    if workers <= 1:
+        return [_focal_job(*a) for a in args]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_focal_job, *zip(*args)))
@@ -0,0 +1,165 @@
+# utils/graph_render.py
+
+import numpy as np
+
+# ======================================================
+# Batched edge drawing for large social graphs
+# ======================================================
+
+# Above this many edge rows, plot_graph switches to the collection path
+FAST_EDGE_THRESHOLD = 500
+
+# Dense graphs keep only the strongest aggregated edges per system
+MAX_DRAWN_EDGES = 20_000
+
+# Points sampled along each curved edge
+CURVE_POINTS = 16
+
+# Arrowhead size relative to the arrow size (as matplotlib's "-|>");
+# heads also grow with the edge width so thick edges keep visible heads
+HEAD_LENGTH = 0.4
+HEAD_WIDTH = 0.4
+
+
+def aggregate_edges(edges, max_edges=MAX_DRAWN_EDGES):
+    """
+    One row per (Source, Target, Category) with summed intensity.
+    If a system still has more than `max_edges` pairs, only the
+    strongest ones are kept.
+    """
+    aggregated = (
+        edges
+        .groupby(["Source", "Target", "Category"], sort=False)
+        ["Weighted_Intensity"]
+        .sum()
+        .reset_index()
+    )
+
+    if max_edges is None:
+        return aggregated
+
+    return (
+        aggregated
+        .sort_values("Weighted_Intensity", ascending=False, kind="stable")
+        .groupby("Category", sort=False)
+        .head(max_edges)
+    )
+
+
+def fit_limits(ax, pos, pad=0.12):
+    """Fix axis limits around the node positions (edge geometry is
+    computed in display space, so limits must not change afterwards)."""
+    xy = np.array(list(pos.values()), dtype=float)
+    low, high = xy.min(axis=0), xy.max(axis=0)
+    span = np.maximum(high - low, 1e-9)
+
+    ax.set_xlim(low[0] - pad * span[0], high[0] + pad * span[0])
+    ax.set_ylim(low[1] - pad * span[1], high[1] + pad * span[1])
+
+
+def edge_paths(src, tgt, rad, margin):
+    """
+    Polylines (edges × points × 2) for straight or arc3-style curved
+    edges, trimmed by `margin` at both ends, plus the end point and unit
+    direction at the target (for the arrowheads). All in display units.
+    """
+    delta = tgt - src
+    length = np.hypot(delta[:, 0], delta[:, 1])
+    length = np.where(length > 0, length, 1.0)
+
+    # Same control point as matplotlib's arc3 connection style
+    control = (src + tgt) / 2 + rad * np.column_stack(
+        [delta[:, 1], -delta[:, 0]]
+    )
+
+    trim = np.clip(margin / length, 0, 0.45)[:, None]
+    n_points = CURVE_POINTS if rad else 2
+    t = trim + (1 - 2 * trim) * np.linspace(0, 1, n_points)[None, :]
+    t = t[:, :, None]
+
+    paths = (
+        (1 - t) ** 2 * src[:, None, :]
+        + 2 * (1 - t) * t * control[:, None, :]
+        + t ** 2 * tgt[:, None, :]
+    )
+
+    # Tangent of the quadratic Bézier at the trimmed end
+    t_end = t[:, -1, :]
+    tangent = 2 * (1 - t_end) * (control - src) + 2 * t_end * (tgt - control)
+    norm = np.hypot(tangent[:, 0], tangent[:, 1])[:, None]
+    direction = tangent / np.where(norm > 0, norm, 1.0)
+
+    return paths, paths[:, -1, :], direction
+
+
+def arrowheads(tips, direction, length, width):
+    """Triangles (edges × 3 × 2) pointing along `direction`."""
+    normal = np.column_stack([-direction[:, 1], direction[:, 0]])
+    base = tips - direction * length
+
+    return np.stack([
+        tips,
+        base + normal * width / 2,
+        base - normal * width / 2,
+    ], axis=1)
+
+
+def draw_edge_collection(ax, pos, edges, color, width_scale, rad=0.0,
+                         alpha=1.0, margin_points=0.0, arrow_points=0.0):
+    """
+    Draw all `edges` (Source | Target | Weighted_Intensity) of one
+    system as one LineCollection plus one PolyCollection of arrowheads.
+    Axis limits must already be fixed (see fit_limits).
+    """
+    from matplotlib.collections import LineCollection, PolyCollection
+
+    if edges.empty:
+        return
+
+    to_display = ax.transData
+    to_data = ax.transData.inverted()
+    pixels_per_point = ax.figure.dpi / 72
+
+    src = to_display.transform(
+        np.array([pos[n] for n in edges["Source"]], dtype=float)
+    )
+    tgt = to_display.transform(
+        np.array([pos[n] for n in edges["Target"]], dtype=float)
+    )
+
+    # Self-loops have no direction to draw
+    keep = (src != tgt).any(axis=1)
+    src, tgt = src[keep], tgt[keep]
+    widths = edges["Weighted_Intensity"].to_numpy()[keep] * width_scale
+
+    paths, tips, direction = edge_paths(
+        src, tgt, rad, margin_points * pixels_per_point
+    )
+
+    def as_data(shapes):
+        flat = to_data.transform(shapes.reshape(-1, 2))
+        return flat.reshape(shapes.shape)
+
+    ax.add_collection(LineCollection(
+        as_data(paths),
+        colors=color,
+        linewidths=widths,
+        alpha=alpha,
+        capstyle="butt"
+    ))
+
+    if arrow_points:
+        head_points = arrow_points * np.array([HEAD_LENGTH, HEAD_WIDTH])
+        head_pixels = (head_points + widths[:, None]) * pixels_per_point
+
+        ax.add_collection(PolyCollection(
+            as_data(arrowheads(
+                tips,
+                direction,
+                head_pixels[:, :1],
+                head_pixels[:, 1:],
+            )),
+            facecolors=color,
+            edgecolors="none",
+            alpha=alpha
+        ))
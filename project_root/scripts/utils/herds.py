@@ -0,0 +1,103 @@
+# utils/herds.py
+
+import pandas as pd
+
+from utils.store import read_table
+
+# ======================================================
+# Multi-herd layout
+# ======================================================
+
+# A herd is a project root of its own: <herds dir>/<herd>/data/ holds
+# the shipped file set and the stages write to <herd>/outputs/
+HERD_MARKER = "data/group_scan_observations.csv"
+
+# Per-herd tables merged into the cross-herd summaries, relative to the
+# herd root
+HERD_BASELINE = "outputs/baselines/category_baseline.csv"
+HERD_FLAGS = "outputs/anomalies flags/scan_anomaly_flags_with_severity.csv"
+HERD_ROLES = "outputs/social roles/individual_roles_by_category.csv"
+
+
+def discover_herds(herds_dir):
+    """{herd name: root} of every sub-folder holding a herd data tree."""
+    return {
+        path.name: path
+        for path in sorted(herds_dir.iterdir())
+        if path.is_dir() and (path / HERD_MARKER).exists()
+    }
+
+
+def _read_herds(herds, relative, columns):
+    """One table per herd stacked with a leading Herd column."""
+    parts = []
+    for herd, root in herds.items():
+        path = root / relative
+        if not path.exists():
+            continue
+        part = read_table(path, columns=columns)
+        part.insert(0, "Herd", herd)
+        parts.append(part)
+
+    if not parts:
+        return pd.DataFrame(columns=["Herd", *columns])
+    return pd.concat(parts, ignore_index=True)
+
+# ------------------------------------------------------
+# Cross-herd summaries
+# ------------------------------------------------------
+
+def baseline_summary(herds):
+    """
+    Herd | Category | Proportion | Cross_Herd_Mean | Deviation:
+    each herd's category baseline against the mean over all herds.
+    """
+    baselines = _read_herds(herds, HERD_BASELINE, ["Category", "Proportion"])
+
+    baselines["Cross_Herd_Mean"] = (
+        baselines.groupby("Category")["Proportion"].transform("mean")
+    )
+    baselines["Deviation"] = (
+        baselines["Proportion"] - baselines["Cross_Herd_Mean"]
+    )
+    return baselines
+
+
+def flag_count_summary(herds):
+    """Herd | Category | Flag | Severity | Count of scan anomaly flags."""
+    flags = _read_herds(herds, HERD_FLAGS, ["Category", "Flag", "Severity"])
+
+    return (
+        flags
+        .groupby(["Herd", "Category", "Flag", "Severity"])
+        .size()
+        .reset_index(name="Count")
+    )
+
+
+def role_distribution_summary(herds):
+    """
+    Herd | System | Role | Individuals | Share: how many individuals of
+    each herd hold each role per interaction system, and their share of
+    the herd's individuals in that system.
+    """
+    roles = _read_herds(herds, HERD_ROLES, ["Individual", "System", "Role"])
+
+    counts = (
+        roles
+        .groupby(["Herd", "System", "Role"])
+        .size()
+        .reset_index(name="Individuals")
+    )
+    counts["Share"] = (
+        counts["Individuals"]
+        / counts.groupby(["Herd", "System"])["Individuals"].transform("sum")
+    )
+    return counts
+
+
+HERD_SUMMARIES = {
+    "herd_category_baselines.csv": baseline_summary,
+    "herd_flag_counts.csv": flag_count_summary,
+    "herd_role_distribution.csv": role_distribution_summary,
+}
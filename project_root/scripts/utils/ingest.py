@@ -0,0 +1,180 @@
+# utils/ingest.py
+
+import io
+
+import pandas as pd
+
+from utils.store import remap_labels
+
+# ======================================================
+# Streaming scan ingestion
+# ======================================================
+
+# Rows parsed per chunk. Peak memory of a streaming pass is bounded by
+# one chunk plus the reduced aggregates, regardless of input size.
+CHUNK_ROWS = 100_000
+
+
+def read_scan_chunks(source, chunksize=CHUNK_ROWS, strip_behavior=True,
+                     **read_csv_kwargs):
+    """
+    Stream a group scan CSV (path or open file) in bounded-size chunks.
+    Behavior is parsed as a dictionary-encoded (categorical) column; its
+    labels are stripped on the way in unless `strip_behavior` is False.
+    """
+    read_csv_kwargs.setdefault("dtype", {"Behavior": "category"})
+    reader = pd.read_csv(source, chunksize=chunksize, **read_csv_kwargs)
+
+    with reader:
+        for chunk in reader:
+            if strip_behavior:
+                chunk["Behavior"] = remap_labels(chunk["Behavior"], str.strip)
+            yield chunk
+
+
+def attach_categories(chunk, behavior_to_category):
+    """Map Behavior → Category (NaN for behaviors missing from ethogram)."""
+    chunk["Category"] = remap_labels(chunk["Behavior"], behavior_to_category)
+    return chunk
+
+
+def reduce_scan_counts(chunks, behavior_to_category,
+                       keys=("Day", "Scan", "Category")):
+    """
+    Reduce streamed scan chunks into summed counts per `keys`.
+    Rows whose behavior has no category are dropped, as in the
+    in-memory ethogram merge + groupby.
+
+    Per-chunk partials are only combined once they outgrow the
+    combined totals, so each cell is re-summed a bounded number of
+    times and memory stays within about twice the result.
+    """
+    keys = list(keys)
+    parts = []
+    combined = pending = 0
+
+    for chunk in chunks:
+        chunk = attach_categories(chunk, behavior_to_category)
+
+        part = (
+            chunk
+            .dropna(subset=["Category"])
+            .groupby(keys, observed=True)["Count"]
+            .sum()
+        )
+        parts.append(part)
+        pending += len(part)
+
+        if len(parts) > 1 and pending > combined:
+            parts = [_combine_counts(parts, len(keys))]
+            combined, pending = len(parts[0]), 0
+
+    if not parts:
+        return pd.Series(
+            dtype="int64",
+            name="Count",
+            index=pd.MultiIndex.from_arrays(
+                [[] for _ in keys], names=keys
+            )
+        )
+
+    return _combine_counts(parts, len(keys))
+
+
+def _combine_counts(parts, n_keys):
+    if len(parts) == 1:
+        return parts[0]
+    return pd.concat(parts).groupby(level=list(range(n_keys))).sum()
+
+
+# ======================================================
+# Append-only sources
+# ======================================================
+
+class AppendCursor:
+    """
+    How far an append-only CSV has been consumed: byte offset of the
+    first unread row, the header columns and the file size at the last
+    pass. Lets incremental stages parse only the rows added since their
+    previous run.
+
+    A last line without a line break may still be being written, so it
+    is left for the next run while the file keeps growing. It is
+    consumed once it is stable: on a first read (including --rebuild)
+    or when the file size has not changed since the previous pass.
+    """
+
+    def __init__(self, offset=0, columns=None, size=None):
+        self.offset = offset
+        self.columns = columns
+        self.size = size
+
+    def replaced(self, path):
+        """True if the file shrank, i.e. it was rewritten, not appended."""
+        return path.stat().st_size < self.offset
+
+    def iter_chunks(self, path, chunksize=CHUNK_ROWS, strip_behavior=True):
+        """Stream the rows appended since the cursor, then advance it."""
+        with open(path, "rb") as f:
+            # Rows appended while this pass runs are left for the next one
+            size = f.seek(0, io.SEEK_END)
+            end = _complete_end(f, self.offset, size)
+            if self.offset == 0 or size == self.size:
+                end = size
+            f.seek(self.offset)
+
+            if self.offset == 0:
+                if end == 0:
+                    # Empty file
+                    self.size = size
+                    return
+
+                header = f.readline()
+                self.columns = (
+                    pd.read_csv(io.BytesIO(header)).columns.tolist()
+                )
+                self.offset = f.tell()
+
+            try:
+                yield from read_scan_chunks(
+                    io.BufferedReader(_FileRange(f, end - self.offset)),
+                    chunksize=chunksize,
+                    strip_behavior=strip_behavior,
+                    header=None,
+                    names=self.columns
+                )
+            except pd.errors.EmptyDataError:
+                # Nothing (or only a line break) appended yet
+                pass
+
+            self.offset = end
+            self.size = size
+
+
+def _complete_end(f, start, end, block_size=1 << 16):
+    """Offset just past the last line break in f[start:end] (or start)."""
+    pos = end
+    while pos > start:
+        size = min(block_size, pos - start)
+        f.seek(pos - size)
+        i = f.read(size).rfind(b"\n")
+        if i >= 0:
+            return pos - size + i + 1
+        pos -= size
+    return start
+
+
+class _FileRange(io.RawIOBase):
+    """The next `size` bytes of an open binary file, as a stream."""
+
+    def __init__(self, f, size):
+        self.f = f
+        self.left = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self.f.readinto(memoryview(buffer)[:min(len(buffer), self.left)])
+        self.left -= n
+        return n
@@ -0,0 +1,188 @@
+# utils/layout.py
+
+import hashlib
+import json
+
+import numpy as np
+
+from utils.paths import SOCIAL_ROLES_DIR
+
+# ======================================================
+# Persistent node layout for the social graphs
+# ======================================================
+
+LAYOUT_PATH = SOCIAL_ROLES_DIR / "node_layout.json"
+
+LAYOUT_VERSION = 1
+LAYOUT_SEED = 42
+
+# Spring iterations when only part of the graph changed
+WARM_ITERATIONS = 20
+
+# Above this share of changed nodes the whole layout is relaxed again
+# (still starting from the cached positions)
+MAX_WARM_CHANGE = 0.5
+
+
+def layout_key(nodes, edge_pairs):
+    """Hash of the node set and the (unweighted) directed edge set."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(sorted(nodes)).encode("utf-8"))
+    digest.update(json.dumps(sorted(edge_pairs)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_graph(individuals, edges):
+    import networkx as nx
+
+    G = nx.DiGraph()
+    G.add_nodes_from(individuals)
+    G.add_edges_from(zip(edges["Source"], edges["Target"]))
+    return G
+
+
+def _load(path):
+    if not path.exists():
+        return None
+
+    with open(path, encoding="utf-8") as f:
+        cached = json.load(f)
+
+    if cached.get("version") != LAYOUT_VERSION:
+        return None
+    return cached
+
+
+def _as_tuples(pos):
+    return {node: (float(x), float(y)) for node, (x, y) in pos.items()}
+
+
+def _save(path, key, G, pos):
+    cached = {
+        "version": LAYOUT_VERSION,
+        "key": key,
+        "nodes": list(G.nodes),
+        "edges": [list(edge) for edge in G.edges],
+        "positions": {
+            node: [float(x), float(y)] for node, (x, y) in pos.items()
+        },
+    }
+
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cached, f)
+    tmp_path.replace(path)
+
+
+def _free_spots(pos, nodes, spacing):
+    """
+    Positions for `nodes` evenly spread on a circle just outside the
+    placed nodes `pos`, so that none of them has to move.
+    """
+    if not nodes:
+        return {}
+
+    xy = np.array(list(pos.values())) if pos else np.zeros((1, 2))
+    center = xy.mean(axis=0)
+    radius = np.hypot(*(xy - center).T).max() + spacing
+
+    angles = 2 * np.pi * np.arange(len(nodes)) / len(nodes)
+    return {
+        node: (
+            float(center[0] + radius * np.cos(angle)),
+            float(center[1] + radius * np.sin(angle)),
+        )
+        for node, angle in zip(nodes, angles)
+    }
+
+
+def cached_layout(individuals, edges, path=LAYOUT_PATH, seed=LAYOUT_SEED):
+    """
+    Spring layout positions {node: (x, y)}, reused across runs.
+
+    - Same node and edge sets as the cached layout: cached positions.
+    - A few nodes/edges changed: only nodes that are new or touch a
+      changed edge move, relaxed against their (pinned) neighbours and
+      warm-started from the cached positions; all other nodes keep
+      their place. New nodes with no placed neighbour go to free spots
+      around the layout.
+    - No cache (or most of the graph changed): full spring layout,
+      warm-started from whatever positions are cached.
+    """
+    import networkx as nx
+
+    G = build_graph(individuals, edges)
+    edge_pairs = [list(edge) for edge in G.edges]
+    key = layout_key(list(G.nodes), edge_pairs)
+
+    cached = _load(path)
+
+    if cached is not None and cached["key"] == key:
+        return _as_tuples(cached["positions"])
+
+    if cached is None:
+        pos = nx.spring_layout(G, seed=seed)
+        _save(path, key, G, pos)
+        return _as_tuples(pos)
+
+    old_pos = {
+        node: tuple(xy)
+        for node, xy in cached["positions"].items()
+        if node in G
+    }
+    old_edges = {tuple(edge) for edge in cached["edges"]}
+    new_edges = {tuple(edge) for edge in edge_pairs}
+
+    changed = {node for node in G if node not in old_pos}
+    for source, target in old_edges ^ new_edges:
+        changed.update(n for n in (source, target) if n in G)
+
+    # Changed nodes relax among their neighbours; the neighbours that
+    # did not change are pinned, and the rest of the graph is untouched
+    neighbours = {
+        n for node in changed for n in nx.all_neighbors(G, node)
+    }
+    anchors = [n for n in neighbours - changed if n in old_pos]
+
+    if len(changed) <= MAX_WARM_CHANGE * G.number_of_nodes():
+        local = G.subgraph(changed | set(anchors))
+        # Same optimal distance as a layout of the full graph
+        k = 1 / G.number_of_nodes() ** 0.5
+
+        # New nodes start at the centroid of their placed neighbours;
+        # those without one at free spots around the cached layout
+        init = {n: old_pos[n] for n in local if n in old_pos}
+        for node in changed - set(old_pos):
+            placed = [
+                old_pos[n] for n in nx.all_neighbors(G, node) if n in old_pos
+            ]
+            if placed:
+                init[node] = tuple(
+                    sum(c) / len(placed) for c in zip(*placed)
+                )
+        init.update(_free_spots(
+            old_pos, [n for n in sorted(changed) if n not in init], k
+        ))
+
+        # Without unchanged neighbours, the changed nodes that have a
+        # place keep it; with nothing pinned the spring layout would
+        # rescale the positions, so the starting spots are kept as is
+        pinned = anchors or [n for n in local if n in old_pos]
+
+        pos = dict(old_pos)
+        if pinned:
+            pos.update(nx.spring_layout(
+                local,
+                k=k,
+                pos=init,
+                fixed=pinned,
+                iterations=WARM_ITERATIONS,
+                seed=seed
+            ))
+        else:
+            pos.update(init)
+    else:
+        pos = nx.spring_layout(G, pos=old_pos or None, seed=seed)
+
+    _save(path, key, G, pos)
+    return _as_tuples(pos)
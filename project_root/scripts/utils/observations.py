@@ -0,0 +1,382 @@
+# utils/observations.py
+
+import json
+import os
+import sqlite3
+
+import pandas as pd
+
+from utils.baseline import file_hash
+from utils.focal import focal_files, focal_id
+from utils.ingest import CHUNK_ROWS, AppendCursor
+from utils.paths import DATA_DIR, OUTPUTS_DIR
+from utils.store import remap_labels
+
+# ======================================================
+# SQLite observation store
+# ======================================================
+
+# "sqlite": stages query the raw observations (scans, focal files,
+# interactions, ethogram) from DB_PATH instead of re-reading the CSVs
+DB_ENV = "BEHAVIOR_OBSERVATION_DB"
+
+DB_PATH = OUTPUTS_DIR / "observations.sqlite"
+
+# Bumped when the schema changes; an older database is rebuilt
+SCHEMA_VERSION = 3
+
+# Seconds a process waits for another one syncing the same database
+LOCK_TIMEOUT = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    Name TEXT PRIMARY KEY,
+    Offset INTEGER NOT NULL,
+    Columns TEXT,
+    Size INTEGER,
+    Hash TEXT
+);
+CREATE TABLE IF NOT EXISTS ethogram (
+    Behavior TEXT PRIMARY KEY,
+    Category TEXT
+);
+CREATE TABLE IF NOT EXISTS scans (
+    Day INTEGER,
+    Scan INTEGER,
+    Behavior TEXT,
+    Label TEXT,
+    Count INTEGER
+);
+CREATE TABLE IF NOT EXISTS focal (
+    Individual TEXT,
+    Event INTEGER,
+    Behavior TEXT,
+    Count INTEGER
+);
+CREATE TABLE IF NOT EXISTS interactions (
+    Day INTEGER,
+    Behavior TEXT,
+    Category TEXT,
+    Count INTEGER,
+    Actor TEXT,
+    Target TEXT
+);
+CREATE INDEX IF NOT EXISTS scans_day_scan ON scans (Day, Scan);
+CREATE INDEX IF NOT EXISTS scans_behavior ON scans (Behavior);
+CREATE INDEX IF NOT EXISTS scans_label ON scans (Label);
+CREATE INDEX IF NOT EXISTS focal_individual_event ON focal (Individual, Event);
+CREATE INDEX IF NOT EXISTS focal_behavior ON focal (Behavior);
+CREATE INDEX IF NOT EXISTS interactions_behavior ON interactions (Behavior);
+CREATE INDEX IF NOT EXISTS interactions_actor_target ON interactions (Actor, Target);
+"""
+
+# Append-only observation files: table and columns stored
+OBSERVATION_TABLES = {
+    "scans": ["Day", "Scan", "Behavior", "Label", "Count"],
+    "focal": ["Individual", "Event", "Behavior", "Count"],
+    "interactions": [
+        "Day", "Behavior", "Category", "Count", "Actor", "Target",
+    ],
+}
+
+
+def observation_db_enabled():
+    return os.environ.get(DB_ENV, "").lower() == "sqlite"
+
+
+def _rows(df):
+    """Rows as tuples of Python values (None for missing)."""
+    values = df.astype(object)
+    return values.where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def _in_clause(column, values):
+    values = list(values)
+    return f"{column} IN ({', '.join('?' * len(values))})", values
+
+
+class ObservationDB:
+    """
+    Indexed copy of the raw observation files.
+
+    Labels are stored as recorded; scans also keep them stripped with
+    str.strip() (as the CSV reader does) in Label. Each file is synced
+    through an AppendCursor: only rows appended since the last sync are
+    inserted, and a file that shrank is reloaded. The ethogram is
+    reloaded whenever its content changes; categories are joined in at
+    query time.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.con = sqlite3.connect(
+            path, timeout=LOCK_TIMEOUT, isolation_level=None
+        )
+
+        if self._version() != SCHEMA_VERSION:
+            self._create()
+
+    @classmethod
+    def open(cls, data_dir=DATA_DIR, path=DB_PATH, chunksize=CHUNK_ROWS):
+        """Open the database, bringing it up to date with `data_dir`."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = cls(path)
+        db.sync(data_dir, chunksize)
+        return db
+
+    def close(self):
+        self.con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _version(self):
+        return self.con.execute("PRAGMA user_version").fetchone()[0]
+
+    def _create(self):
+        """
+        (Re)create the schema under the write lock. Another process may
+        have created it while this one waited, so the version is read
+        again inside the transaction.
+        """
+        self.con.execute("BEGIN IMMEDIATE")
+        try:
+            if self._version() != SCHEMA_VERSION:
+                tables = [
+                    name for (name,) in self.con.execute(
+                        "SELECT name FROM sqlite_master WHERE type = 'table'"
+                    )
+                ]
+                for name in tables:
+                    self.con.execute(f'DROP TABLE "{name}"')
+
+                # executescript() would commit first: one statement at
+                # a time keeps them in this transaction
+                for statement in SCHEMA.split(";"):
+                    if statement.strip():
+                        self.con.execute(statement)
+                self.con.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        except BaseException:
+            self.con.execute("ROLLBACK")
+            raise
+        self.con.execute("COMMIT")
+
+    # --------------------------------------------------
+    # Sync
+    # --------------------------------------------------
+
+    def sync(self, data_dir=DATA_DIR, chunksize=CHUNK_ROWS):
+        """
+        Load what changed in the data files. Runs as one write
+        transaction, so concurrent stages never insert the same rows.
+        """
+        focal = {
+            f"focal:{focal_id(path)}": path for path in focal_files(data_dir)
+        }
+
+        self.con.execute("BEGIN IMMEDIATE")
+        try:
+            self._sync_ethogram(data_dir / "ethogram_reference.csv")
+            self._sync_file(
+                "scans", data_dir / "group_scan_observations.csv", chunksize
+            )
+            self._sync_file(
+                "interactions",
+                data_dir / "directed_social_interactions.csv",
+                chunksize
+            )
+
+            for name, path in focal.items():
+                self._sync_file(
+                    "focal", path, chunksize, individual=focal_id(path)
+                )
+
+            # Focal files that were removed
+            for (name,) in self.con.execute(
+                "SELECT Name FROM sources WHERE Name LIKE 'focal:%'"
+            ).fetchall():
+                if name not in focal:
+                    self._forget("focal", name, name.split(":", 1)[1])
+        except BaseException:
+            self.con.execute("ROLLBACK")
+            raise
+        self.con.execute("COMMIT")
+
+    def _source(self, name):
+        return self.con.execute(
+            "SELECT Offset, Columns, Hash, Size FROM sources WHERE Name = ?",
+            (name,)
+        ).fetchone()
+
+    def _save_source(self, name, offset, columns=None, digest=None,
+                     size=None):
+        self.con.execute(
+            "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+            (name, offset, json.dumps(columns), size, digest)
+        )
+
+    def _forget(self, table, name, individual=None):
+        """Delete the rows loaded from one source."""
+        if individual is None:
+            self.con.execute(f"DELETE FROM {table}")
+        else:
+            self.con.execute(
+                f"DELETE FROM {table} WHERE Individual = ?", (individual,)
+            )
+        self.con.execute("DELETE FROM sources WHERE Name = ?", (name,))
+
+    def _sync_ethogram(self, path):
+        digest = file_hash(path)
+        saved = self._source("ethogram")
+        if saved is not None and saved[2] == digest:
+            return
+
+        ethogram = pd.read_csv(path)[["Behavior", "Category"]]
+
+        # Later rows win for duplicated behaviors, as in a dict mapping
+        self.con.execute("DELETE FROM ethogram")
+        self.con.executemany(
+            "INSERT OR REPLACE INTO ethogram VALUES (?, ?)", _rows(ethogram)
+        )
+        self._save_source("ethogram", 0, digest=digest)
+
+    def _sync_file(self, table, path, chunksize, individual=None):
+        name = table if individual is None else f"focal:{individual}"
+
+        if not path.exists():
+            if self._source(name) is not None:
+                self._forget(table, name, individual)
+            return
+
+        saved = self._source(name)
+        cursor = AppendCursor()
+        if saved is not None:
+            cursor = AppendCursor(saved[0], json.loads(saved[1]), saved[3])
+
+        if cursor.replaced(path):
+            self._forget(table, name, individual)
+            cursor = AppendCursor()
+
+        columns = OBSERVATION_TABLES[table]
+        insert = (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})"
+        )
+        for chunk in cursor.iter_chunks(path, chunksize, strip_behavior=False):
+            if individual is not None:
+                chunk["Individual"] = individual
+            if "Label" in columns:
+                chunk["Label"] = remap_labels(chunk["Behavior"], str.strip)
+            self.con.executemany(insert, _rows(chunk[columns]))
+
+        self._save_source(
+            name, cursor.offset, cursor.columns, size=cursor.size
+        )
+
+    # --------------------------------------------------
+    # Queries
+    # --------------------------------------------------
+
+    def query(self, sql, params=()):
+        return pd.read_sql_query(sql, self.con, params=list(params))
+
+    def ethogram(self):
+        """Behavior | Category."""
+        return self.query("SELECT Behavior, Category FROM ethogram")
+
+    def scan_counts(self, keys=("Day", "Scan", "Category"), days=None,
+                    strip=True):
+        """
+        Summed scan counts per `keys` (Day, Scan, Category, Behavior),
+        aggregated in the database; same result as reduce_scan_counts
+        over the scan file. Behaviors without a category are dropped.
+        With `strip`, the stripped labels (Label) are looked up in the
+        ethogram and reported.
+        """
+        behavior = "s.Label" if strip else "s.Behavior"
+
+        columns = {
+            "Day": "s.Day", "Scan": "s.Scan",
+            "Category": "e.Category", "Behavior": behavior,
+        }
+        keys = list(keys)
+        selected = ", ".join(f"{columns[k]} AS {k}" for k in keys)
+        # Grouped by position: the key names are also table columns
+        positions = ", ".join(str(i + 1) for i in range(len(keys)))
+
+        where, params = ["e.Category IS NOT NULL"], []
+        if days is not None:
+            clause, values = _in_clause("s.Day", days)
+            where.append(clause)
+            params += values
+
+        counts = self.query(
+            f"SELECT {selected}, SUM(s.Count) AS Count "
+            f"FROM scans s JOIN ethogram e ON e.Behavior = {behavior} "
+            f"WHERE {' AND '.join(where)} "
+            f"GROUP BY {positions} ORDER BY {positions}",
+            params
+        )
+        return counts.set_index(keys)["Count"]
+
+    def behavior_counts(self, day, scan, category):
+        """
+        Behavior | Count of one (Day, Scan, Category) cell, labels as
+        recorded, ordered by Behavior.
+        """
+        return self.query(
+            "SELECT s.Behavior AS Behavior, SUM(s.Count) AS Count "
+            "FROM scans s JOIN ethogram e ON e.Behavior = s.Behavior "
+            "WHERE s.Day = ? AND s.Scan = ? AND e.Category = ? "
+            "GROUP BY s.Behavior ORDER BY s.Behavior",
+            (int(day), int(scan), category)
+        )
+
+    def focal_individuals(self):
+        return [
+            individual for (individual,) in self.con.execute(
+                "SELECT DISTINCT Individual FROM focal ORDER BY Individual"
+            )
+        ]
+
+    def focal_category_counts(self, individual):
+        """
+        Summed counts per (Event, Category) for one focal animal, labels
+        as recorded; behaviors missing from the ethogram are dropped.
+        """
+        counts = self.query(
+            "SELECT f.Event AS Event, e.Category AS Category, "
+            "SUM(f.Count) AS Count "
+            "FROM focal f JOIN ethogram e ON e.Behavior = f.Behavior "
+            "WHERE f.Individual = ? AND e.Category IS NOT NULL "
+            "GROUP BY f.Event, e.Category ORDER BY f.Event, e.Category",
+            (individual,)
+        )
+        return counts.set_index(["Event", "Category"])["Count"]
+
+    def interactions(self, days=None, categories=None, actors=None,
+                     targets=None):
+        """
+        Directed interaction rows (file order) matching every given
+        filter: Day | Behavior | Category | Count | Actor | Target.
+        """
+        where, params = [], []
+        for column, values in (
+            ("Day", days), ("Category", categories),
+            ("Actor", actors), ("Target", targets),
+        ):
+            if values is not None:
+                clause, values = _in_clause(column, values)
+                where.append(clause)
+                params += values
+
+        sql = (
+            "SELECT Day, Behavior, Category, Count, Actor, Target "
+            "FROM interactions"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self.query(sql + " ORDER BY rowid", params)
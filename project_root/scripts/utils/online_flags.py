@@ -0,0 +1,132 @@
+# utils/online_flags.py
+
+import json
+import math
+
+from utils.flags import QUANTILES, THRESHOLD_COLUMNS, severity_for_value
+from utils.paths import ANOMALIES_DIR
+from utils.sketch import DEFAULT_K, KLLSketch
+
+# ======================================================
+# Streaming anomaly detector
+# ======================================================
+
+STATE_PATH = ANOMALIES_DIR / "online_detector_state.json"
+
+# Below this many observations a category's thresholds are too unstable
+# to alert on; its values are still added to the sketch.
+MIN_OBSERVATIONS = 20
+
+
+class OnlineAnomalyDetector:
+    """
+    Live HIGH/MEDIUM/LOW flags for scan-level category proportions.
+
+    Keeps one bounded-memory quantile sketch per category. Each incoming
+    Day/Scan/Category proportion is scored against the current p01…p99
+    estimates and then added to the sketch, so an event is never
+    compared against itself.
+    """
+
+    def __init__(self, k=DEFAULT_K, min_observations=MIN_OBSERVATIONS):
+        self.k = k
+        self.min_observations = min_observations
+        self.sketches = {}
+        self._thresholds = {}
+
+    # --------------------------------------------------
+    # Sketch maintenance
+    # --------------------------------------------------
+
+    def observe(self, category, proportion):
+        if category not in self.sketches:
+            self.sketches[category] = KLLSketch(k=self.k)
+
+        self.sketches[category].update(proportion)
+        self._thresholds.pop(category, None)
+
+    def merge(self, other):
+        """Fold another detector (e.g. from another worker) into this one."""
+        for category, sketch in other.sketches.items():
+            if category in self.sketches:
+                self.sketches[category].merge(sketch)
+            else:
+                self.sketches[category] = sketch
+            self._thresholds.pop(category, None)
+        return self
+
+    def thresholds(self, category):
+        """Current p01…p99 estimates, or None while history is too short."""
+        sketch = self.sketches.get(category)
+        if sketch is None or sketch.n < self.min_observations:
+            return None
+
+        if category not in self._thresholds:
+            values = sketch.quantiles(QUANTILES["low"] + QUANTILES["high"])
+            self._thresholds[category] = dict(zip(THRESHOLD_COLUMNS, values))
+
+        return self._thresholds[category]
+
+    # --------------------------------------------------
+    # Scoring
+    # --------------------------------------------------
+
+    def score(self, category, proportion):
+        thresholds = self.thresholds(category)
+        if thresholds is None:
+            return None, None
+        return severity_for_value(proportion, thresholds)
+
+    def process(self, category, proportion):
+        """Score one new proportion, then add it to the history."""
+        # A NaN or infinite value would corrupt the category's sketch
+        if not math.isfinite(proportion):
+            raise ValueError(f"proportion must be finite, got {proportion}")
+
+        flag, severity = self.score(category, proportion)
+        self.observe(category, proportion)
+        return flag, severity
+
+    # --------------------------------------------------
+    # Construction / persistence
+    # --------------------------------------------------
+
+    @classmethod
+    def from_history(cls, scan_category, **kwargs):
+        """Warm-start from a Day | Scan | Category | Proportion table."""
+        detector = cls(**kwargs)
+        for category, proportion in zip(
+            scan_category["Category"], scan_category["Proportion"]
+        ):
+            detector.observe(category, proportion)
+        return detector
+
+    def save(self, path=STATE_PATH):
+        saved = {
+            "k": self.k,
+            "min_observations": self.min_observations,
+            "sketches": {
+                category: sketch.to_dict()
+                for category, sketch in self.sketches.items()
+            },
+        }
+
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(saved, f)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+
+        detector = cls(
+            k=saved["k"],
+            min_observations=saved["min_observations"]
+        )
+        detector.sketches = {
+            category: KLLSketch.from_dict(sketch)
+            for category, sketch in saved["sketches"].items()
+        }
+        return detector
@@ -1,6 +1,13 @@
+import os
 from pathlib import Path
 
-ROOT = Path(__file__).resolve().parents[2]
+# Project root holding data/ and outputs/. BEHAVIOR_PROJECT_ROOT points
+# the scripts at another tree (e.g. a synthetic herd for benchmarks).
+ROOT_ENV = "BEHAVIOR_PROJECT_ROOT"
+
+ROOT = Path(
+    os.environ.get(ROOT_ENV) or Path(__file__).resolve().parents[2]
+).resolve()
 
 DATA_DIR = ROOT / "data"
 OUTPUTS_DIR = ROOT / "outputs"
@@ -10,10 +17,15 @@ GROUP_SCANS_DIR = OUTPUTS_DIR / "group scans"
 ANOMALIES_DIR = OUTPUTS_DIR / "anomalies flags"
 SOCIAL_ROLES_DIR = OUTPUTS_DIR / "social roles"
 
-for d in [
+OUTPUT_DIRS = [
     BASELINES_DIR,
     GROUP_SCANS_DIR,
     ANOMALIES_DIR,
     SOCIAL_ROLES_DIR,
-]:
-    d.mkdir(parents=True, exist_ok=True)
+]
+
+
+def ensure_output_dirs():
+    """Create the output folders (called by the scripts, not on import)."""
+    for d in OUTPUT_DIRS:
+        d.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,184 @@
+# utils/render.py
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from utils.paths import OUTPUTS_DIR
+
+# ======================================================
+# Figure rendering (interactive or headless batch)
+# ======================================================
+
+FIGURES_DIR = OUTPUTS_DIR / "figures"
+
+# Comma-separated output formats, e.g. "png" or "png,svg".
+# Unset: figures are shown interactively with plt.show().
+FORMATS_ENV = "BEHAVIOR_FIGURE_FORMATS"
+
+# Worker processes for headless rendering (default: one per CPU)
+WORKERS_ENV = "BEHAVIOR_FIGURE_WORKERS"
+
+DPI = 150
+
+# Modules shared by the scripts: a change here can change any output
+UTILS_DIR = Path(__file__).resolve().parent
+
+
+def figure_formats():
+    value = os.environ.get(FORMATS_ENV, "")
+    return [f.strip().lower() for f in value.split(",") if f.strip()]
+
+
+def headless():
+    return bool(figure_formats())
+
+
+def data_hash(*values):
+    """
+    Content hash of the data a figure is drawn from. DataFrames, Series
+    and arrays are hashed by value; anything else by its repr.
+    """
+    import numpy as np
+    import pandas as pd
+
+    digest = hashlib.sha256()
+
+    for value in values:
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            digest.update(repr(list(getattr(value, "columns", []))).encode())
+            digest.update(
+                pd.util.hash_pandas_object(value, index=True)
+                .to_numpy()
+                .tobytes()
+            )
+        elif isinstance(value, np.ndarray):
+            digest.update(repr((value.dtype, value.shape)).encode())
+            digest.update(np.ascontiguousarray(value).tobytes())
+        else:
+            digest.update(repr(value).encode("utf-8"))
+
+    return digest.hexdigest()
+
+
+class FigureJob:
+    """One figure: `draw(*args)` plots it onto a new pyplot figure."""
+
+    def __init__(self, name, draw, *args):
+        self.name = name
+        self.draw = draw
+        self.args = args
+
+
+# ------------------------------------------------------
+# Headless batch
+# ------------------------------------------------------
+
+def _file_hash(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def utils_hash():
+    """One content hash over every utils module."""
+    digest = hashlib.sha256()
+    for path in sorted(UTILS_DIR.glob("*.py")):
+        digest.update(path.name.encode("utf-8"))
+        digest.update(_file_hash(path).encode("ascii"))
+    return digest.hexdigest()
+
+
+def _figure_paths(out_dir, name, formats):
+    return [out_dir / f"{name}.{fmt}" for fmt in formats]
+
+
+def _render_job(job, paths):
+    """Worker: draw one figure and save it in every format."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    job.draw(*job.args)
+
+    for path in paths:
+        plt.savefig(path, dpi=DPI)
+    plt.close("all")
+
+
+def _load_manifest(path):
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(path, manifest):
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    tmp_path.replace(path)
+
+
+def render_figures(script, jobs):
+    """
+    Show the figures of `script` (the caller's __file__), or in headless
+    mode write them to outputs/figures/<script>/<name>.<format>.
+
+    Headless figures are rendered in parallel worker processes. A figure
+    is skipped when its files exist and the hash of its data, of the
+    script that draws it and of the utils modules matches the previous
+    render.
+    """
+    if not headless():
+        import matplotlib.pyplot as plt
+
+        for job in jobs:
+            job.draw(*job.args)
+            plt.show()
+        return
+
+    formats = figure_formats()
+    out_dir = FIGURES_DIR / Path(script).stem
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest_path = out_dir / "manifest.json"
+    manifest = _load_manifest(manifest_path)
+    script_hash = _file_hash(script)
+    shared_hash = utils_hash()
+
+    pending = []
+    for job in jobs:
+        key = data_hash(script_hash, shared_hash, formats, DPI, *job.args)
+        paths = _figure_paths(out_dir, job.name, formats)
+
+        if manifest.get(job.name) == key and all(p.exists() for p in paths):
+            print(f"[skip] {job.name} (unchanged)")
+            continue
+
+        pending.append((job, paths, key))
+
+    workers = int(os.environ.get(WORKERS_ENV, 0)) or os.cpu_count()
+    workers = min(workers, len(pending))
+
+    def rendered(job, key):
+        print(f"[save] {job.name}")
+        manifest[job.name] = key
+
+    # Figures finished before a failure stay recorded
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(_render_job, job, paths): (job, key)
+                    for job, paths, key in pending
+                }
+                for future in as_completed(futures):
+                    future.result()
+                    rendered(*futures[future])
+        else:
+            for job, paths, key in pending:
+                _render_job(job, paths)
+                rendered(job, key)
+    finally:
+        _save_manifest(manifest_path, manifest)
@@ -0,0 +1,142 @@
+# utils/sketch.py
+
+import random
+
+import numpy as np
+
+# ======================================================
+# KLL quantile sketch
+# ======================================================
+
+# Accuracy/memory trade-off: the sketch keeps O(k) items (about 3k at
+# most) and has rank error of roughly 1.7 / k for any stream length.
+DEFAULT_K = 200
+
+
+class KLLSketch:
+    """
+    Mergeable streaming quantile sketch (Karnin–Lang–Liberty).
+
+    Items live in a stack of compactors; an item at level h stands for
+    2**h original observations. Memory stays bounded by k regardless of
+    how many values are added. While fewer than k values have been seen
+    no compaction happens and quantiles are exact (same linear
+    interpolation as pandas/numpy).
+    """
+
+    C = 2 / 3
+
+    def __init__(self, k=DEFAULT_K, seed=0):
+        self.k = k
+        self.n = 0
+        self.compactors = [[]]
+        self._rng = random.Random(seed)
+        self._sorted = None
+
+    # --------------------------------------------------
+    # Updates
+    # --------------------------------------------------
+
+    def update(self, value):
+        self.compactors[0].append(float(value))
+        self.n += 1
+        self._sorted = None
+        self._compress()
+
+    def merge(self, other):
+        """Fold another sketch into this one (in place)."""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+
+        self.n += other.n
+        self._sorted = None
+        self._compress()
+        return self
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, int(np.ceil(self.k * self.C ** depth)))
+
+    def _size(self):
+        return sum(len(items) for items in self.compactors)
+
+    def _max_size(self):
+        return sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _compress(self):
+        while self._size() >= self._max_size():
+            for level, items in enumerate(self.compactors):
+                if len(items) < self._capacity(level):
+                    continue
+
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+
+                items.sort()
+                # An odd item out stays at this level
+                keep = [items.pop()] if len(items) % 2 else []
+                offset = self._rng.randint(0, 1)
+
+                self.compactors[level + 1].extend(items[offset::2])
+                self.compactors[level] = keep
+                break
+
+    # --------------------------------------------------
+    # Queries
+    # --------------------------------------------------
+
+    def _sorted_view(self):
+        if self._sorted is None:
+            values = np.concatenate([
+                np.asarray(items, dtype=float)
+                for items in self.compactors
+            ])
+            weights = np.concatenate([
+                np.full(len(items), 2 ** level, dtype=np.int64)
+                for level, items in enumerate(self.compactors)
+            ])
+
+            order = np.argsort(values, kind="stable")
+            self._sorted = (values[order], np.cumsum(weights[order]))
+
+        return self._sorted
+
+    def quantiles(self, qs):
+        """
+        Estimated quantiles, linearly interpolated between ranks as if
+        every item were repeated by its weight.
+        """
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+
+        values, cum_weights = self._sorted_view()
+        total = cum_weights[-1]
+
+        positions = np.asarray(qs, dtype=float) * (total - 1)
+        lower = np.floor(positions)
+        frac = positions - lower
+
+        lo = values[np.searchsorted(cum_weights, lower, side="right")]
+        hi = values[
+            np.searchsorted(
+                cum_weights, np.minimum(lower + 1, total - 1), side="right"
+            )
+        ]
+        return lo + (hi - lo) * frac
+
+    # --------------------------------------------------
+    # Persistence
+    # --------------------------------------------------
+
+    def to_dict(self):
+        return {"k": self.k, "n": self.n, "compactors": self.compactors}
+
+    @classmethod
+    def from_dict(cls, saved, seed=0):
+        sketch = cls(k=saved["k"], seed=seed)
+        sketch.n = saved["n"]
+        sketch.compactors = [list(items) for items in saved["compactors"]]
+        return sketch
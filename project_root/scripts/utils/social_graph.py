@@ -0,0 +1,337 @@
+# utils/social_graph.py
+
+import json
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utils.categories import SOCIAL_CATEGORIES
+from utils.ingest import AppendCursor, CHUNK_ROWS
+from utils.paths import BASELINES_DIR
+from utils.temporal_graph import WindowExport
+
+# ======================================================
+# Sparse social interaction systems
+# ======================================================
+
+# Herd roster: every known individual, including ones never seen
+# interacting. New actors/targets found in the data are appended.
+REGISTRY_PATH = BASELINES_DIR / "individual_registry.csv"
+
+# Running sparse counts + read position in the interactions file
+STATE_PATH = BASELINES_DIR / "social_state.npz"
+
+
+class SocialAdjacency:
+    """
+    Sparse actor × target counts per interaction system, as one COO
+    table per system with a Day column.
+
+    Individuals are mapped to row/column numbers through a registry
+    (their position in `individuals`), so herds of thousands of animals
+    stay compact: only observed (actor, target) pairs are stored.
+    Ledger quantities are row sums (OUT) and column sums (IN).
+    """
+
+    def __init__(self, individuals, systems=SOCIAL_CATEGORIES):
+        self.individuals = list(individuals)
+        self.systems = list(systems)
+        self.codes = {ind: i for i, ind in enumerate(self.individuals)}
+
+        # System -> list of (day, src, tgt, count) array parts; merged
+        # into one part whenever the triplets are read
+        self._parts = {system: [] for system in self.systems}
+
+    @property
+    def n(self):
+        return len(self.individuals)
+
+    # --------------------------------------------------
+    # Construction
+    # --------------------------------------------------
+
+    def add_interactions(self, social_df):
+        """Accumulate interaction rows into the per-system triplets."""
+        social_df = social_df[social_df["Category"].isin(self.systems)]
+
+        src = self._encode(social_df["Actor"])
+        tgt = self._encode(social_df["Target"])
+        known = (src >= 0) & (tgt >= 0)
+
+        category = social_df["Category"].to_numpy()[known]
+        day = social_df["Day"].to_numpy(dtype=np.int64)[known]
+        count = social_df["Count"].to_numpy(dtype=np.int64)[known]
+        src, tgt = src[known], tgt[known]
+
+        for system in self.systems:
+            rows = category == system
+            if rows.any():
+                self.add_triplets(
+                    system, day[rows], src[rows], tgt[rows], count[rows]
+                )
+
+    def add_triplets(self, system, day, src, tgt, count):
+        self._parts[system].append((day, src, tgt, count))
+
+    def add_individuals(self, individuals):
+        """Extend the registry; existing codes and counts are kept."""
+        new = [ind for ind in individuals if ind not in self.codes]
+        for ind in new:
+            self.codes[ind] = len(self.individuals)
+            self.individuals.append(ind)
+        return new
+
+    def _encode(self, labels):
+        return (
+            labels.map(self.codes)
+            .fillna(-1)
+            .to_numpy(dtype=np.int64)
+        )
+
+    # --------------------------------------------------
+    # Queries
+    # --------------------------------------------------
+
+    def triplets(self, system):
+        """
+        (day, src, tgt, count) arrays of one system, sorted by day,
+        actor and target, with one entry per (day, actor, target).
+        """
+        parts = self._parts[system]
+        if not parts:
+            return tuple(np.empty(0, dtype=np.int64) for _ in range(4))
+
+        if len(parts) > 1:
+            merged = _sum_duplicates(
+                *(np.concatenate(arrays) for arrays in zip(*parts))
+            )
+            self._parts[system] = parts = [merged]
+        return parts[0]
+
+    @property
+    def days(self):
+        days = [self.triplets(system)[0] for system in self.systems]
+        return np.unique(np.concatenate(days)).tolist()
+
+    def system_matrix(self, system, days=None):
+        """Counts for one system, summed over `days` (default: all)."""
+        day, src, tgt, count = self.triplets(system)
+
+        if days is not None:
+            rows = np.isin(day, list(days))
+            src, tgt, count = src[rows], tgt[rows], count[rows]
+
+        # Entries of different days for one pair are summed on conversion
+        return sparse.csr_array(
+            (count, (src, tgt)), shape=(self.n, self.n), dtype=np.int64
+        )
+
+    def out_in(self, days=None):
+        """
+        OUT and IN counts as (individuals × systems) arrays: row and
+        column sums of each system matrix.
+        """
+        out_counts = np.zeros((self.n, len(self.systems)), dtype=np.int64)
+        in_counts = np.zeros((self.n, len(self.systems)), dtype=np.int64)
+
+        for j, system in enumerate(self.systems):
+            matrix = self.system_matrix(system, days)
+            out_counts[:, j] = matrix.sum(axis=1)
+            in_counts[:, j] = matrix.sum(axis=0)
+
+        return out_counts, in_counts
+
+    def ledger(self, days=None):
+        """
+        Individual | Category | OUT | IN | NET, one row per individual and
+        system (individual-major, same layout as build_ledgers).
+        """
+        out_counts, in_counts = self.out_in(days)
+
+        ledger = pd.DataFrame({
+            "Individual": np.repeat(self.individuals, len(self.systems)),
+            "Category": np.tile(self.systems, self.n),
+            "OUT": out_counts.ravel(),
+            "IN": in_counts.ravel(),
+        })
+        ledger["NET"] = ledger["OUT"] - ledger["IN"]
+        return ledger
+
+
+def _sum_duplicates(day, src, tgt, count):
+    """Sort triplets by (day, src, tgt) and sum repeated entries."""
+    order = np.lexsort((tgt, src, day))
+    day, src, tgt, count = day[order], src[order], tgt[order], count[order]
+
+    starts = np.flatnonzero(np.r_[
+        True,
+        (day[1:] != day[:-1]) | (src[1:] != src[:-1]) | (tgt[1:] != tgt[:-1])
+    ])
+    return (
+        day[starts], src[starts], tgt[starts],
+        np.add.reduceat(count, starts),
+    )
+
+
+# ======================================================
+# Registry + incremental ledger state
+# ======================================================
+
+def load_registry(path=REGISTRY_PATH):
+    if not path.exists():
+        return []
+    return pd.read_csv(path)["Individual"].tolist()
+
+
+def save_registry(individuals, path=REGISTRY_PATH):
+    pd.DataFrame({"Individual": individuals}).to_csv(path, index=False)
+
+
+class SocialLedgerState:
+    """
+    Persistent sparse interaction counts for the social pipeline.
+
+    Only interaction rows appended since the previous run are read;
+    individuals not yet in the registry are added as they appear.
+    Ledgers are then row/column sums of the stored counts, so a new
+    batch of interactions never triggers a full recomputation.
+    """
+
+    def __init__(self, individuals, systems=SOCIAL_CATEGORIES):
+        self.adjacency = SocialAdjacency(individuals, systems)
+        self.cursor = AppendCursor()
+
+        # Weights used for the last edge export (see 5_social_summary.py)
+        self.edge_weights = None
+
+        # Layout of the last window roles export
+        self.windows = WindowExport()
+
+    @property
+    def individuals(self):
+        return self.adjacency.individuals
+
+    # --------------------------------------------------
+    # Updates
+    # --------------------------------------------------
+
+    def update(self, interactions_path, chunksize=CHUNK_ROWS):
+        """
+        Stream new interaction rows into the counts.
+        Returns the new rows belonging to the social systems.
+        """
+        if self.cursor.replaced(interactions_path):
+            self.adjacency = SocialAdjacency(
+                self.individuals, self.adjacency.systems
+            )
+            self.cursor = AppendCursor()
+            self.edge_weights = None
+            self.windows = WindowExport()
+
+        new_rows = []
+        for chunk in self.cursor.iter_chunks(
+            interactions_path, chunksize, strip_behavior=False
+        ):
+            chunk = chunk[chunk["Category"].isin(self.adjacency.systems)]
+
+            discovered = pd.unique(
+                pd.concat([chunk["Actor"], chunk["Target"]])
+            )
+            self.adjacency.add_individuals(sorted(discovered))
+            self.adjacency.add_interactions(chunk)
+            new_rows.append(chunk)
+
+        if not new_rows:
+            return pd.DataFrame(columns=self.cursor.columns)
+        return pd.concat(new_rows, ignore_index=True)
+
+    # --------------------------------------------------
+    # Persistence
+    # --------------------------------------------------
+
+    def save(self, path=STATE_PATH):
+        systems = self.adjacency.systems
+        triplets = {"system": [], "day": [], "src": [], "tgt": [], "count": []}
+
+        for code, system in enumerate(systems):
+            day, src, tgt, count = self.adjacency.triplets(system)
+            triplets["system"].append(np.full(len(day), code, dtype=np.int64))
+            triplets["day"].append(day)
+            triplets["src"].append(src)
+            triplets["tgt"].append(tgt)
+            triplets["count"].append(count)
+
+        arrays = {
+            name: np.concatenate(parts).astype(np.int64)
+            for name, parts in triplets.items()
+        }
+
+        meta = {
+            "individuals": self.individuals,
+            "systems": systems,
+            "offset": self.cursor.offset,
+            "size": self.cursor.size,
+            "columns": self.cursor.columns,
+            "edge_weights": self.edge_weights,
+            "window_settings": self.windows.settings,
+            "window_size": self.windows.size,
+        }
+        arrays["window_ends"] = self.windows.ends
+        arrays["window_offsets"] = self.windows.offsets
+
+        tmp_path = path.with_suffix(".tmp.npz")
+        np.savez_compressed(tmp_path, meta=np.array(json.dumps(meta)), **arrays)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, individuals, path=STATE_PATH, systems=SOCIAL_CATEGORIES):
+        """
+        Load the saved state (or start empty); registry individuals
+        missing from it are added.
+        """
+        if not path.exists():
+            return cls(individuals, systems)
+
+        with np.load(path) as saved:
+            meta = json.loads(str(saved["meta"]))
+            arrays = {
+                name: saved[name]
+                for name in ["system", "day", "src", "tgt", "count"]
+            }
+            if "window_ends" in saved:
+                windows = WindowExport(
+                    meta["window_settings"],
+                    saved["window_ends"],
+                    saved["window_offsets"],
+                    meta["window_size"],
+                )
+            else:
+                windows = WindowExport()
+
+        if meta["systems"] != list(systems):
+            return cls(individuals, systems)
+
+        state = cls(meta["individuals"], systems)
+        state.cursor = AppendCursor(
+            meta["offset"], meta["columns"], meta.get("size")
+        )
+        state.edge_weights = meta["edge_weights"]
+        state.windows = windows
+
+        # Triplets are stored system after system: one slice per system
+        order = np.argsort(arrays["system"], kind="stable")
+        bounds = np.searchsorted(
+            arrays["system"][order], np.arange(len(systems) + 1)
+        )
+        for code, system in enumerate(systems):
+            rows = order[bounds[code]:bounds[code + 1]]
+            if len(rows):
+                state.adjacency.add_triplets(
+                    system,
+                    *(arrays[name][rows]
+                      for name in ["day", "src", "tgt", "count"])
+                )
+
+        state.adjacency.add_individuals(individuals)
+        return state
@@ -0,0 +1,273 @@
+# utils/store.py
+
+import os
+import shutil
+import warnings
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# ======================================================
+# Intermediate table store
+# ======================================================
+
+# Format used between pipeline stages: "csv" (default) or "parquet".
+# Parquet needs pyarrow. CSVs are always written as the export format.
+STORE_FORMAT = os.environ.get("BEHAVIOR_STORE_FORMAT", "csv").lower()
+
+# Tables with this column are partitioned by it in the columnar store
+PARTITION_COLUMN = "Day"
+
+# Appends to an unpartitioned columnar copy are stored as extra part
+# files; past this many the copy is rewritten as one
+MAX_APPEND_PARTS = 16
+
+# Low-cardinality label columns stored dictionary-encoded
+DICTIONARY_COLUMNS = ["Category", "Behavior"]
+
+
+@lru_cache(maxsize=None)
+def columnar_enabled() -> bool:
+    """True if the columnar store is requested and pyarrow is available."""
+    if STORE_FORMAT != "parquet":
+        return False
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        warnings.warn(
+            "BEHAVIOR_STORE_FORMAT=parquet requires pyarrow; "
+            "falling back to CSV intermediates."
+        )
+        return False
+
+    return True
+
+
+def columnar_path(csv_path):
+    """Location of the columnar copy of a CSV intermediate."""
+    return csv_path.with_suffix(".parquet")
+
+
+# ======================================================
+# Dictionary-encoded labels
+# ======================================================
+
+def encode_labels(df, columns=DICTIONARY_COLUMNS):
+    """Convert the label columns of `df` to Categoricals (in place)."""
+    for col in columns:
+        if col in df.columns and not isinstance(
+            df[col].dtype, pd.CategoricalDtype
+        ):
+            df[col] = df[col].astype("category")
+    return df
+
+
+def remap_labels(values, mapping):
+    """
+    Relabel a Series through `mapping` (dict or function) by mapping
+    its distinct labels only: rows keep their codes, so the cost does
+    not grow with the number of rows. Returns a categorical Series.
+
+    Labels missing from a dict mapping become NaN; labels mapped to the
+    same value are merged into one category.
+    """
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype("category")
+
+    labels = values.cat.categories.map(mapping)
+    label_codes, categories = pd.factorize(labels, sort=True)
+
+    # Code -1 (missing) stays missing
+    lookup = np.append(label_codes, -1)
+    codes = lookup[values.cat.codes.to_numpy()]
+
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=categories),
+        index=values.index,
+        name=values.name
+    )
+
+
+# ======================================================
+# Writing
+# ======================================================
+
+def write_table(df, csv_path, days=None):
+    """
+    Write an intermediate table: CSV export, plus the columnar copy when
+    enabled. `days` restricts the columnar rewrite to those partitions.
+    """
+    df.to_csv(csv_path, index=False)
+
+    if columnar_enabled():
+        write_columnar(df, csv_path, days=days)
+
+
+def append_table(df, csv_path):
+    """
+    Append rows to an intermediate table. The columnar copy, when
+    enabled, only takes in the new rows: the Day partitions they fall
+    in are rewritten, or an unpartitioned copy gets them as one more
+    part file (compacted every MAX_APPEND_PARTS appends).
+    """
+    df.to_csv(csv_path, mode="a", header=False, index=False)
+
+    if not columnar_enabled() or df.empty:
+        return
+
+    path = columnar_path(csv_path)
+
+    if not path.is_dir():
+        # No columnar copy yet (or a single-file one): build it in full
+        write_columnar(
+            pd.read_csv(csv_path, float_precision="round_trip"),
+            csv_path
+        )
+    elif PARTITION_COLUMN in df.columns:
+        days = set(df[PARTITION_COLUMN].unique())
+        existing = read_table(csv_path, days=days)
+        write_columnar(
+            pd.concat([existing, df[existing.columns]], ignore_index=True),
+            csv_path,
+            days=days
+        )
+    else:
+        parts = sorted(path.glob("part-*.parquet"))
+        if len(parts) >= MAX_APPEND_PARTS:
+            write_columnar(
+                pd.concat([read_table(csv_path), df], ignore_index=True),
+                csv_path
+            )
+        else:
+            _write_part(
+                encode_labels(df.copy()),
+                path / f"part-{len(parts):06d}.parquet"
+            )
+
+
+def write_columnar(df, csv_path, days=None):
+    """
+    Write `df` to the columnar store. Tables with a Day column are
+    partitioned by Day; with `days` given, only those partitions are
+    replaced and every other partition is left untouched.
+    """
+    path = columnar_path(csv_path)
+
+    df = encode_labels(df.copy())
+
+    if PARTITION_COLUMN not in df.columns:
+        # A directory of part files, so that appends add a file
+        _remove(path)
+        path.mkdir(parents=True)
+        _write_part(df, path / "part-000000.parquet")
+        return
+
+    if days is None or not path.is_dir():
+        _remove(path)
+        days = df[PARTITION_COLUMN].unique()
+
+    for day, part in df.groupby(PARTITION_COLUMN, sort=False):
+        day_dir = path / f"{PARTITION_COLUMN}={day}"
+        day_dir.mkdir(parents=True, exist_ok=True)
+        _write_part(
+            part.drop(columns=PARTITION_COLUMN),
+            day_dir / "part-0.parquet"
+        )
+
+    # Requested days that no longer have rows
+    for day in set(days) - set(df[PARTITION_COLUMN].unique()):
+        _remove(path / f"{PARTITION_COLUMN}={day}")
+
+
+def _write_part(df, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pq.write_table(
+        pa.Table.from_pandas(df, preserve_index=False),
+        path
+    )
+
+
+def _remove(path):
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+# ======================================================
+# Reading
+# ======================================================
+
+def read_table(csv_path, columns=None, days=None, where=None,
+               categorical=False):
+    """
+    Load an intermediate table, restricted to `columns`, to the given
+    `days` and to rows whose column values are in `where[column]`.
+
+    Uses the columnar store when enabled (only the selected partitions
+    and columns are read); otherwise parses the CSV.
+    Dictionary-encoded labels are decoded unless `categorical=True`.
+    """
+    filters = {}
+    if days is not None:
+        filters[PARTITION_COLUMN] = list(days)
+    for col, values in (where or {}).items():
+        filters[col] = list(values)
+
+    path = columnar_path(csv_path)
+
+    if columnar_enabled() and path.exists():
+        df = pd.read_parquet(
+            path,
+            columns=columns,
+            filters=[(c, "in", v) for c, v in filters.items()] or None
+        )
+
+        if PARTITION_COLUMN in df.columns and path.is_dir():
+            # Partition keys come back as a categorical; restore them
+            # as the leading integer column they are in the CSV,
+            # in Day order
+            df[PARTITION_COLUMN] = df[PARTITION_COLUMN].astype("int64")
+            df = df.sort_values(PARTITION_COLUMN, kind="stable")
+            if columns is None:
+                df = df[
+                    [PARTITION_COLUMN]
+                    + [c for c in df.columns if c != PARTITION_COLUMN]
+                ]
+
+        df = df.reset_index(drop=True)
+    else:
+        usecols = None
+        if columns is not None:
+            usecols = list(dict.fromkeys(list(columns) + list(filters)))
+
+        # Labels are parsed straight into categoricals: no string
+        # object per row
+        dtype = None
+        if categorical:
+            dtype = {col: "category" for col in DICTIONARY_COLUMNS}
+
+        df = pd.read_csv(csv_path, usecols=usecols, dtype=dtype)
+
+        for col, values in filters.items():
+            df = df[df[col].isin(values)]
+
+        if filters:
+            df = df.reset_index(drop=True)
+
+    if columns is not None:
+        df = df[list(columns)]
+
+    for col in DICTIONARY_COLUMNS:
+        if col not in df.columns:
+            continue
+        if categorical and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+        elif not categorical and isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+
+    return df
@@ -0,0 +1,265 @@
+# utils/synthetic.py
+
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from utils.categories import SOCIAL_CATEGORIES
+
+# ======================================================
+# Synthetic herd data
+# ======================================================
+
+# Observation days in the shipped data
+SHIPPED_DAYS = 3
+
+# Scans generated (and written) per block of whole days, so memory
+# stays bounded for large herds and long observation periods
+BLOCK_SCANS = 100_000
+
+# Concentration of the behavior frequencies (small = a few behaviors
+# dominate, as in the real scans)
+BEHAVIOR_CONCENTRATION = 0.05
+
+# Extra behaviors per animal and scan (Poisson mean), and per focal event
+EXTRA_BEHAVIORS_PER_ANIMAL = 0.7
+FOCAL_BEHAVIORS_PER_EVENT = 3.8
+
+# Success probability of the (geometric) count of one interaction row
+INTERACTION_COUNT_P = 0.6
+
+
+class HerdConfig:
+    """
+    Size and schedule of a synthetic herd. The defaults are about the
+    size of the shipped data: 8 animals, 3 days of 12 scans, about 10
+    directed interaction rows a day and 28 focal events.
+
+    With `scan_group` set, the herd is scanned in groups of that many
+    animals (one scan per group and scan time) rather than as a whole.
+    """
+
+    def __init__(self, animals=8, days=SHIPPED_DAYS, scans_per_day=12,
+                 interactions_per_day=10, focal_events=28, seed=0,
+                 scan_group=None):
+        self.animals = animals
+        self.days = days
+        self.scans_per_day = scans_per_day
+        self.interactions_per_day = interactions_per_day
+        self.focal_events = focal_events
+        self.seed = seed
+        self.scan_group = scan_group
+
+    @classmethod
+    def scaled(cls, scale, animals=8, days=SHIPPED_DAYS,
+               interactions_per_day=10, **kwargs):
+        """
+        About `scale` times the shipped data: the herd and the
+        observation period each grow by sqrt(scale), and the
+        interactions per day with the herd, so the interaction log (and
+        the day × animal window tables built from it) grows about
+        `scale` times. The herd is scanned in groups of `animals`, each
+        scan looking like one of the shipped ones, so the scan table
+        (and the scan × category proportions) grows about `scale` times
+        too.
+        """
+        growth = np.sqrt(scale)
+        herd = max(2, round(animals * growth))
+
+        return cls(
+            animals=herd,
+            days=max(1, round(days * growth)),
+            interactions_per_day=round(interactions_per_day * herd / animals),
+            scan_group=animals,
+            **kwargs
+        )
+
+    def scan_groups(self):
+        """Animals in each group scanned separately (one group: the herd)."""
+        if not self.scan_group or self.scan_group >= self.animals:
+            return np.array([self.animals])
+
+        n_groups = -(-self.animals // self.scan_group)
+        return np.diff(
+            np.linspace(0, self.animals, n_groups + 1).round().astype(int)
+        )
+
+    def individuals(self):
+        return [f"N{i + 1}" for i in range(self.animals)]
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def behavior_weights(rng, n):
+    """Skewed frequencies over `n` behaviors."""
+    return rng.dirichlet(np.full(n, BEHAVIOR_CONCENTRATION))
+
+
+def category_seeds(ethogram, weights, rng):
+    """
+    One behavior code per ethogram category, drawn by its frequency
+    within the category. Placed in the first scans, so that no category
+    has a zero baseline proportion (and so no rarity weight).
+    """
+    seeds = []
+    for positions in ethogram.groupby("Category").indices.values():
+        within = weights[positions]
+        total = within.sum()
+        seeds.append(
+            rng.choice(positions, p=within / total if total > 0 else None)
+        )
+    return np.array(seeds, dtype=np.int64)
+
+
+def collapse_draws(groups, codes, n_codes):
+    """
+    Count repeated draws: (group, code, count) for every distinct pair,
+    ordered by group and code. `codes` are below `n_codes`.
+    """
+    combined = groups.astype(np.int64) * n_codes + codes
+    unique, counts = np.unique(combined, return_counts=True)
+    return unique // n_codes, unique % n_codes, counts
+
+
+# ------------------------------------------------------
+# Tables
+# ------------------------------------------------------
+
+def scan_blocks(config, ethogram, rng):
+    """
+    Day | Scan | Behavior | Count rows, one DataFrame per block of about
+    BLOCK_SCANS scans. Every animal shows one behavior per scan, plus a
+    Poisson number of extra ones; every category is shown at least once.
+    The groups (see HerdConfig.scan_groups) are scanned one after
+    another at each scan time, each as a Scan of its own.
+    """
+    behaviors = ethogram["Behavior"].to_numpy()
+    weights = behavior_weights(rng, len(behaviors))
+    seeds = category_seeds(ethogram, weights, rng)
+
+    groups = config.scan_groups()
+    scans_per_day = config.scans_per_day * len(groups)
+    block_days = max(1, BLOCK_SCANS // scans_per_day)
+
+    for first_day in range(1, config.days + 1, block_days):
+        n_days = min(block_days, config.days + 1 - first_day)
+        n_scans = n_days * scans_per_day
+
+        animals = np.resize(groups, n_scans)
+        draws = animals + rng.poisson(animals * EXTRA_BEHAVIORS_PER_ANIMAL)
+        scan_index = np.repeat(np.arange(n_scans), draws)
+        codes = rng.choice(len(behaviors), size=draws.sum(), p=weights)
+        if first_day == 1:
+            codes[:len(seeds)] = seeds[:len(codes)]
+
+        scan_index, codes, counts = collapse_draws(
+            scan_index, codes, len(behaviors)
+        )
+
+        yield pd.DataFrame({
+            "Day": first_day + scan_index // scans_per_day,
+            "Scan": 1 + scan_index % scans_per_day,
+            "Behavior": behaviors[codes],
+            "Count": counts,
+        })
+
+
+def interactions_table(config, ethogram, rng):
+    """Day | Behavior | Category | Count | Actor | Target rows."""
+    social = ethogram[ethogram["Category"].isin(SOCIAL_CATEGORIES)]
+    behaviors = social["Behavior"].to_numpy()
+    categories = social["Category"].to_numpy()
+    weights = behavior_weights(rng, len(behaviors))
+
+    per_day = rng.poisson(config.interactions_per_day, size=config.days)
+    n = per_day.sum()
+
+    actor = rng.integers(config.animals, size=n)
+    target = (actor + rng.integers(1, config.animals, size=n)) % config.animals
+    codes = rng.choice(len(behaviors), size=n, p=weights)
+
+    names = np.array(config.individuals())
+    rows = pd.DataFrame({
+        "Day": np.repeat(np.arange(1, config.days + 1), per_day),
+        "Behavior": behaviors[codes],
+        "Category": categories[codes],
+        "Count": rng.geometric(INTERACTION_COUNT_P, size=n),
+        "Actor": names[actor],
+        "Target": names[target],
+    })
+
+    return (
+        rows
+        .groupby(
+            ["Day", "Behavior", "Category", "Actor", "Target"], sort=False
+        )["Count"]
+        .sum()
+        .reset_index()
+        [["Day", "Behavior", "Category", "Count", "Actor", "Target"]]
+    )
+
+
+def focal_table(config, ethogram, rng):
+    """Event | Behavior | Count rows for one focal animal."""
+    behaviors = ethogram["Behavior"].to_numpy()
+    weights = behavior_weights(rng, len(behaviors))
+
+    draws = 1 + rng.poisson(
+        FOCAL_BEHAVIORS_PER_EVENT - 1, size=config.focal_events
+    )
+    event_index = np.repeat(np.arange(config.focal_events), draws)
+    codes = rng.choice(len(behaviors), size=draws.sum(), p=weights)
+
+    event_index, codes, counts = collapse_draws(
+        event_index, codes, len(behaviors)
+    )
+
+    return pd.DataFrame({
+        "Event": 1 + event_index,
+        "Behavior": behaviors[codes],
+        "Count": counts,
+    })
+
+
+# ------------------------------------------------------
+# Writing
+# ------------------------------------------------------
+
+def write_herd(root, config, ethogram_path):
+    """
+    Write a synthetic data/ tree under `root` with the schemas of the
+    shipped files (the ethogram itself is copied). Returns the number
+    of rows written per file.
+    """
+    data_dir = root / "data"
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    shutil.copyfile(ethogram_path, data_dir / ethogram_path.name)
+    ethogram = pd.read_csv(ethogram_path)[["Behavior", "Category"]]
+
+    rng = np.random.default_rng(config.seed)
+    rows = {}
+
+    scans_path = data_dir / "group_scan_observations.csv"
+    rows[scans_path.name] = 0
+    for i, block in enumerate(scan_blocks(config, ethogram, rng)):
+        block.to_csv(
+            scans_path, mode="w" if i == 0 else "a", header=i == 0,
+            index=False
+        )
+        rows[scans_path.name] += len(block)
+
+    interactions = interactions_table(config, ethogram, rng)
+    interactions.to_csv(
+        data_dir / "directed_social_interactions.csv", index=False
+    )
+    rows["directed_social_interactions.csv"] = len(interactions)
+
+    focal_name = f"{config.individuals()[0]}_individual_observation.csv"
+    focal = focal_table(config, ethogram, rng)
+    focal.to_csv(data_dir / focal_name, index=False)
+    rows[focal_name] = len(focal)
+
+    return rows
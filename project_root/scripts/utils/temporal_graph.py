@@ -0,0 +1,210 @@
+# utils/temporal_graph.py
+
+import numpy as np
+import pandas as pd
+
+from utils.store import columnar_enabled, write_columnar
+
+# ======================================================
+# Sliding-window social ledgers
+# ======================================================
+
+WINDOW_COLUMNS = ["Window_Start", "Window_End"]
+
+
+class TemporalLedger:
+    """
+    Per-day OUT / IN counts for every individual and system, taken from
+    the (day, actor, target) triplets of a SocialAdjacency.
+
+    Windows of consecutive days are differences of one cumulative sum
+    over the day axis, so all windows are produced at once and the cost
+    per window does not depend on its length. Windows start on the
+    first observed day and every `step` days after it. Days without
+    interactions inside the observed range count as zeros.
+    """
+
+    def __init__(self, adjacency):
+        self.adjacency = adjacency
+        self.individuals = list(adjacency.individuals)
+        self.systems = list(adjacency.systems)
+        self.observed = adjacency.days
+
+    def window_bounds(self, size, step=1):
+        """
+        Start and end days of every window of `size` days, `step` days
+        apart. Fewer observed days than `size` give a single window over
+        all of them.
+        """
+        if size < 1 or step < 1:
+            raise ValueError("window size and step must be >= 1")
+
+        if not self.observed:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        first, last = self.observed[0], self.observed[-1]
+        size = min(size, last - first + 1)
+
+        starts = np.arange(first, last - size + 2, step, dtype=np.int64)
+        return starts, starts + size - 1
+
+    def day_counts(self, first, last):
+        """OUT and IN of days first..last, (days × individuals × systems)."""
+        shape = (last - first + 1, len(self.individuals), len(self.systems))
+        out_counts = np.zeros(shape, dtype=np.int64)
+        in_counts = np.zeros(shape, dtype=np.int64)
+
+        for j, system in enumerate(self.systems):
+            day, src, tgt, count = self.adjacency.triplets(system)
+            rows = (day >= first) & (day <= last)
+
+            i = day[rows] - first
+            np.add.at(out_counts, (i, src[rows], j), count[rows])
+            np.add.at(in_counts, (i, tgt[rows], j), count[rows])
+
+        return out_counts, in_counts
+
+    def windows(self, size, step=1, min_end=None):
+        """
+        (starts, ends, OUT, IN) of the windows ending on or after
+        `min_end` (default: every window). OUT and IN are
+        (windows × individuals × systems) arrays.
+        """
+        starts, ends = self.window_bounds(size, step)
+        if min_end is not None:
+            keep = ends >= min_end
+            starts, ends = starts[keep], ends[keep]
+
+        if not len(starts):
+            shape = (0, len(self.individuals), len(self.systems))
+            empty = np.zeros(shape, dtype=np.int64)
+            return starts, ends, empty, empty.copy()
+
+        # Only the days covered by the requested windows are counted
+        first = starts[0]
+        sums = []
+        for counts in self.day_counts(first, ends[-1]):
+            running = np.zeros(
+                (len(counts) + 1,) + counts.shape[1:], dtype=np.int64
+            )
+            np.cumsum(counts, axis=0, out=running[1:])
+            sums.append(running[ends - first + 1] - running[starts - first])
+
+        return starts, ends, sums[0], sums[1]
+
+    def window_ledgers(self, size, step=1, min_end=None):
+        """
+        Window_Start | Window_End | Individual | Category | OUT | IN | NET
+        for every window ending on or after `min_end`, in the same
+        individual-major layout as SocialAdjacency.ledger.
+        """
+        starts, ends, out_counts, in_counts = self.windows(
+            size, step, min_end
+        )
+
+        n_individuals, n_systems = len(self.individuals), len(self.systems)
+        n_rows = n_individuals * n_systems
+
+        ledgers = pd.DataFrame({
+            "Window_Start": np.repeat(starts, n_rows),
+            "Window_End": np.repeat(ends, n_rows),
+            "Individual": np.tile(
+                np.repeat(self.individuals, n_systems), len(starts)
+            ),
+            "Category": np.tile(self.systems, n_individuals * len(starts)),
+            "OUT": out_counts.ravel(),
+            "IN": in_counts.ravel(),
+        })
+        ledgers["NET"] = ledgers["OUT"] - ledgers["IN"]
+        return ledgers
+
+
+# ======================================================
+# Incremental window table export
+# ======================================================
+
+class WindowExport:
+    """
+    Where each window starts in an exported window-major table (byte
+    offset of its first row), and the settings the windows were
+    computed with.
+
+    Windows only depend on the days they cover, so a run with the same
+    settings rewrites the table from the first window touched by new
+    interactions onwards; any change of settings rewrites all of it.
+    """
+
+    def __init__(self, settings=None, ends=(), offsets=(), size=0):
+        self.settings = settings
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.size = size
+
+    def first_stale(self, path, settings, min_end):
+        """
+        Position of the first saved window to rewrite: the first one
+        ending on or after `min_end` (None: no new interactions), or
+        None if the whole table has to be written again.
+        """
+        if (
+            settings != self.settings
+            or not path.exists()
+            or path.stat().st_size != self.size
+        ):
+            return None
+
+        if min_end is None:
+            return len(self.ends)
+        return int(np.searchsorted(self.ends, min_end))
+
+    def write(self, table, path, rows_per_window, settings, first=None):
+        """
+        Write `table` (window-major, `rows_per_window` rows per window)
+        as the windows from position `first` on; None writes the whole
+        table.
+        """
+        body = table.to_csv(index=False, header=False).encode("utf-8")
+
+        if first is None:
+            first = 0
+            mode = "wb"
+            offset = 0
+        else:
+            mode = "r+b"
+            offset = (
+                int(self.offsets[first])
+                if first < len(self.offsets)
+                else self.size
+            )
+
+        with open(path, mode) as f:
+            f.seek(offset)
+            f.truncate()
+
+            if mode == "wb":
+                header = table.head(0).to_csv(index=False).encode("utf-8")
+                f.write(header)
+                offset += len(header)
+
+            f.write(body)
+
+        # Rows never contain line breaks: row k starts after break k - 1
+        breaks = np.flatnonzero(np.frombuffer(body, dtype=np.uint8) == 10)
+        row_offsets = offset + np.r_[0, breaks[:-1] + 1]
+
+        window_rows = np.arange(0, len(table), max(rows_per_window, 1))
+        self.ends = np.r_[
+            self.ends[:first],
+            table["Window_End"].to_numpy(dtype=np.int64)[window_rows],
+        ]
+        self.offsets = np.r_[
+            self.offsets[:first], row_offsets[window_rows]
+        ].astype(np.int64)
+        self.size = offset + len(body)
+        self.settings = settings
+
+        # The columnar copy is not partitioned by window: write it whole
+        if columnar_enabled():
+            if first:
+                table = pd.read_csv(path, float_precision="round_trip")
+            write_columnar(table, path)
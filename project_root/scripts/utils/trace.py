@@ -0,0 +1,264 @@
+# utils/trace.py
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from utils.paths import OUTPUTS_DIR
+
+# ======================================================
+# Opt-in timing / memory instrumentation
+# ======================================================
+
+TRACES_DIR = OUTPUTS_DIR / "traces"
+
+# Comma-separated trace formats: "jsonl" and/or "chrome".
+# Unset: tracing is off and the wrappers below cost one env lookup.
+TRACE_ENV = "BEHAVIOR_TRACE"
+
+# Run id shared by every process of one run (pipeline stages, figure
+# workers); set automatically by the first traced process
+TRACE_RUN_ENV = "BEHAVIOR_TRACE_RUN"
+
+TRACE_FORMATS = ("jsonl", "chrome")
+
+# ru_maxrss is in KiB on Linux, bytes on macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def trace_formats():
+    value = os.environ.get(TRACE_ENV, "")
+    return [
+        f.strip().lower() for f in value.split(",")
+        if f.strip().lower() in TRACE_FORMATS
+    ]
+
+
+def tracing():
+    return bool(trace_formats())
+
+
+def peak_rss_mb():
+    """
+    High-water mark of this process's resident memory; None where the
+    resource module does not exist (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT / 2**20
+
+
+def run_dir():
+    """outputs/traces/<run id>/, created on first use."""
+    run_id = os.environ.get(TRACE_RUN_ENV)
+    if not run_id:
+        run_id = datetime.now().strftime("%Y%m%d-%H%M%S-") + str(os.getpid())
+        os.environ[TRACE_RUN_ENV] = run_id
+
+    path = TRACES_DIR / run_id
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def row_count(value):
+    """Rows of a DataFrame/Series/array, else None."""
+    if hasattr(value, "shape") and getattr(value, "ndim", 0) >= 1:
+        return int(value.shape[0])
+    return None
+
+
+# ------------------------------------------------------
+# Spans
+# ------------------------------------------------------
+
+class Span:
+    """One timed region; `rows` may be set inside the block."""
+
+    def __init__(self, name, rows=None, **args):
+        self.name = name
+        self.rows = rows
+        self.args = args
+
+
+class _Recorder:
+    """Per-process event sink: one JSON line per finished span."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stack = threading.local()
+        self.path = None
+        self.pid = None
+
+    def open(self):
+        # Forked workers get their own file
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            script = Path(sys.argv[0]).stem or "python"
+            self.path = run_dir() / f"{script}.{self.pid}.jsonl"
+        return self.path
+
+    def parents(self):
+        if not hasattr(self.stack, "names"):
+            self.stack.names = []
+        return self.stack.names
+
+    def write(self, event):
+        path = self.open()
+        with self.lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event, default=str) + "\n")
+
+
+_recorder = _Recorder()
+
+
+@contextmanager
+def span(name, rows=None, **args):
+    """
+    Time a block when tracing is on: wall time, CPU time, peak RSS at
+    exit and its growth during the block, plus optional row counts.
+    """
+    item = Span(name, rows, **args)
+
+    if not tracing():
+        yield item
+        return
+
+    parents = _recorder.parents()
+    parent = parents[-1] if parents else None
+    parents.append(name)
+
+    rss_before = peak_rss_mb()
+    start = time.time()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    try:
+        yield item
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        peak = peak_rss_mb()
+        parents.pop()
+
+        _recorder.write({
+            "name": name,
+            "parent": parent,
+            "script": Path(sys.argv[0]).stem,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "start": start,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "peak_rss_mb": None if peak is None else round(peak, 1),
+            "rss_growth_mb": (
+                None if peak is None else round(peak - rss_before, 1)
+            ),
+            "rows": item.rows,
+            **item.args,
+        })
+
+
+def traced(name=None):
+    """
+    Decorator: trace every call of the function as a span. Rows are
+    taken from the first argument with a length (DataFrame, Series,
+    array) and from the result.
+    """
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracing():
+                return func(*args, **kwargs)
+
+            rows_in = next(
+                (n for n in map(row_count, args) if n is not None), None
+            )
+            with span(label, rows=rows_in) as item:
+                result = func(*args, **kwargs)
+                item.args["rows_out"] = row_count(result)
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+def trace_script():
+    """
+    Trace the whole calling script as one span (from this call to
+    interpreter exit), and write the Chrome trace of the run at exit.
+    """
+    if not tracing():
+        return
+
+    context = span(Path(sys.argv[0]).stem, kind="script")
+    context.__enter__()
+
+    def finish():
+        context.__exit__(None, None, None)
+        if "chrome" in trace_formats():
+            write_chrome_trace(run_dir())
+
+    atexit.register(finish)
+
+
+# ------------------------------------------------------
+# Chrome trace
+# ------------------------------------------------------
+
+def load_events(path):
+    events = []
+    for jsonl in sorted(path.glob("*.jsonl")):
+        with open(jsonl, encoding="utf-8") as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+    return events
+
+
+def write_chrome_trace(path):
+    """
+    Merge the JSON-lines events of a run directory into trace.json
+    (Chrome trace event format; open in chrome://tracing or Perfetto).
+    """
+    events = [
+        {
+            "name": e["name"],
+            "cat": e.get("kind", "span"),
+            "ph": "X",
+            "ts": e["start"] * 1e6,
+            "dur": e["wall_s"] * 1e6,
+            "pid": e["pid"],
+            "tid": e["tid"],
+            "args": {
+                k: v for k, v in e.items()
+                if k not in ("name", "start", "pid", "tid")
+            },
+        }
+        for e in load_events(path)
+    ]
+
+    # One named track per process
+    for pid, script in {(e["pid"], e["args"]["script"]) for e in events}:
+        events.append({
+            "name": "process_name",
+            "ph": "M",
+            "pid": pid,
+            "args": {"name": f"{script} ({pid})"},
+        })
+
+    # Every process of the run writes the merged trace at exit: each
+    # one writes its own temporary file and the last replace wins
+    tmp_path = path / f"trace.json.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    tmp_path.replace(path / "trace.json")
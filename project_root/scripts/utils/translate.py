@@ -47,10 +47,33 @@ def translate_behavior(label: str) -> str:
     return BEHAVIOR_TRANSLATIONS.get(label, label)
 
 
+TRANSLATIONS = {
+    "category": CATEGORY_TRANSLATIONS,
+    "behavior": BEHAVIOR_TRANSLATIONS,
+}
+
+
+def translate_categorical(series, kind="category"):
+    """
+    Translate a Series of labels as a Categorical: only its distinct
+    labels are translated, rows keep their codes.
+    """
+    # pandas is only needed here; importing the label helpers is cheap
+    from utils.store import remap_labels
+
+    translations = TRANSLATIONS[kind]
+    return remap_labels(series, lambda x: translations.get(x, x))
+
+
 def translate_series(series, kind="category"):
-    """Translate a pandas Series of labels."""
-    if kind == "category":
-        return series.map(lambda x: CATEGORY_TRANSLATIONS.get(x, x))
-    if kind == "behavior":
-        return series.map(lambda x: BEHAVIOR_TRANSLATIONS.get(x, x))
-    return series
+    """
+    Translate a pandas Series of labels. Categorical Series stay
+    categorical; other Series keep their dtype.
+    """
+    if kind not in TRANSLATIONS:
+        return series
+
+    translated = translate_categorical(series, kind)
+    if series.dtype.name == "category":
+        return translated
+    return translated.astype(series.dtype)